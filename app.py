@@ -9,4 +9,8 @@ config_name = os.environ.get('FLASK_ENV', 'development')
 app = create_app(config_name)
 
 if __name__ == '__main__':
+    # 开发服务器启动前把数据库升级到最新迁移版本（部署时使用 flask upgrade-db，应用启动时不建表）
+    from app.cli import upgrade_database
+    with app.app_context():
+        upgrade_database(app)
     app.run(debug=True)
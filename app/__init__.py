@@ -7,7 +7,6 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_babel import Babel
 from flask_wtf.csrf import CSRFProtect
 from config import config
-from flask_babel import get_translations
 
 # 初始化扩展
 db = SQLAlchemy()
@@ -24,62 +23,17 @@ def create_app(config_name='default'):
     app.config.from_object(config[config_name])
     
     app.config['BABEL_TRANSLATION_DIRECTORIES'] = 'translations'
-    print('translation directories:', app.config['BABEL_TRANSLATION_DIRECTORIES'])
-    print('get_translations:', get_translations())
-
-     # 配置Flask-Babel语言选择器（Flask-Babel 4.0兼容方式）
-    # 在Flask-Babel 4.0中，需要使用Babel.localeselector作为类方法装饰器
-    def get_locale():
-        print("get_locale called")
-        print('language from request:', request.accept_languages.best_match(app.config['LANGUAGES'].keys()))
-        print('language from default:', app.config['BABEL_DEFAULT_LOCALE'])
-        print('translation directories:', app.config['BABEL_TRANSLATION_DIRECTORIES'])
-
-        # 优先从session获取语言设置
-        if 'language' in session:
-            print('language in session:', session['language'])
-            return session['language']
-        # 从请求头获取语言
-  
-        return request.accept_languages.best_match(app.config['LANGUAGES'].keys()) or app.config['BABEL_DEFAULT_LOCALE']
 
     # 初始化扩展
     db.init_app(app)
     login_manager.init_app(app)
-    babel.init_app(app, locale_selector=get_locale)
+    # 语言选择器按session和Accept-Language缓存结果（Flask-Babel 4.0需在init_app中传入）
+    from app.utils.i18n import select_locale, preload_translations
+    babel.init_app(app, locale_selector=select_locale)
+    if app.config.get('TRANSLATIONS_PRELOAD', True):
+        preload_translations(app)
     csrf.init_app(app)
     
-    # 配置安全中间件
-    @app.after_request
-    def add_security_headers(response):
-        """添加安全头"""
-        security_headers = app.config.get('SECURITY_HEADERS', {})
-        for header, value in security_headers.items():
-            response.headers[header] = value
-        
-        # 添加HSTS头（仅HTTPS）
-        if request.is_secure and app.config.get('HSTS_MAX_AGE', 0) > 0:
-            hsts_value = f"max-age={app.config['HSTS_MAX_AGE']}"
-            if app.config.get('HSTS_INCLUDE_SUBDOMAINS'):
-                hsts_value += "; includeSubDomains"
-            if app.config.get('HSTS_PRELOAD'):
-                hsts_value += "; preload"
-            response.headers['Strict-Transport-Security'] = hsts_value
-        
-        # 添加CSP头
-        csp_policy = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com; "
-            "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://fonts.googleapis.com; "
-            "font-src 'self' https://fonts.gstatic.com https://cdnjs.cloudflare.com; "
-            "img-src 'self' data: https:; "
-            "connect-src 'self' https://api.github.com https://cdn.jsdelivr.net; "
-            "frame-ancestors 'none';"
-        )
-        response.headers['Content-Security-Policy'] = csp_policy
-        
-        return response
-    
     @app.before_request
     def enforce_https():
         """强制HTTPS重定向"""
@@ -88,10 +42,11 @@ def create_app(config_name='default'):
                 url = request.url.replace('http://', 'https://', 1)
                 return redirect(url, code=301)
     
-    # 配置Flask-Login
-    from flask_babel import gettext as _
+    # 配置Flask-Login（提示消息在闪现时按当前请求的语言翻译）
+    from flask_babel import gettext
     login_manager.login_view = 'auth.login'  # 未登录时重定向到登录页
-    login_manager.login_message = _('Please login first')
+    login_manager.login_message = 'Please login first'
+    login_manager.localize_callback = gettext
     login_manager.login_message_category = 'info'
     
   
@@ -99,18 +54,31 @@ def create_app(config_name='default'):
     @app.context_processor
     def inject_locale():
         from flask_wtf.csrf import generate_csrf
+        from app.utils.i18n import get_language
         return dict(
-            get_locale=get_locale,
+            get_locale=get_language,
             csrf_token=generate_csrf
         )
     
+    # 加载静态资源清单（带指纹的文件名）
+    from app.utils.assets import init_assets
+    init_assets(app)
+
+    # 配置Markdown渲染
+    from app.utils.markdown import init_markdown
+    init_markdown(app)
+
+    # 注册模板片段缓存
+    from app.utils.fragment_cache import init_fragment_cache
+    init_fragment_cache(app)
+
     @login_manager.user_loader
     def load_user(user_id):
         """加载用户"""
         from app.models.user import User
         return User.query.get(int(user_id))
     
-    # 初始化OAuth（需要在app context中）
+    # 初始化OAuth（客户端在首次登录时创建）
     from app.services.oauth_service import init_oauth
     init_oauth(app)
     
@@ -120,12 +88,14 @@ def create_app(config_name='default'):
     from app.routes.user import user_bp
     from app.routes.memo import memo_bp
     from app.routes.health import health_bp
+    from app.api.memo_api import memo_api_bp
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(index_bp)
     app.register_blueprint(user_bp, url_prefix='/user')
     app.register_blueprint(memo_bp, url_prefix='/memo')
     app.register_blueprint(health_bp)
+    app.register_blueprint(memo_api_bp, url_prefix='/api')
     
     # 注册语言切换路由
     @app.route('/set_language/<language>')
@@ -138,13 +108,45 @@ def create_app(config_name='default'):
     # 注册错误处理器
     register_error_handlers(app)
 
+    # 注册运行指标（请求、缓存、数据库查询）
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+
+    # 配置响应压缩（静态文件优先发送预压缩的 .gz 副本）
+    from app.middleware.compression import GzipMiddleware, send_static_file
+    app.view_functions['static'] = send_static_file(app)
+    if app.config.get('COMPRESS_ENABLED', True):
+        app.wsgi_app = GzipMiddleware(
+            app.wsgi_app,
+            minimum_size=app.config.get('COMPRESS_MIN_SIZE', 500),
+            compress_level=app.config.get('COMPRESS_LEVEL', 6)
+        )
+
+    # 配置安全响应头（最外层WSGI中间件，响应头按配置预先生成）
+    from app.middleware.security import init_security_headers
+    init_security_headers(app)
+
+    # 注册CLI命令
+    from app.cli import register_commands
+    register_commands(app)
+
     # 配置日志
     from app.utils.logging_config import setup_logging
     setup_logging(app)
 
-    # 创建数据库表（开发环境）
-    with app.app_context():
-        db.create_all()
+    # 请求追踪（未启用时不注册钩子）
+    from app.utils.tracing import init_tracing
+    init_tracing(app)
+
+    # 按需请求分析（未启用时不注册钩子）
+    from app.utils.profiler import init_profiler
+    init_profiler(app)
+
+    # 模板字节码缓存和预编译（避免首个请求承担编译耗时）
+    from app.utils.templating import init_template_cache, precompile_templates
+    init_template_cache(app)
+    if app.config.get('TEMPLATE_PRECOMPILE', True):
+        precompile_templates(app)
 
     return app
 
@@ -199,7 +201,7 @@ def register_error_handlers(app):
         from app import db
 
         # 记录错误日志
-        current_app.logger.error(f'Unexpected error: {error}', exc_info=True)
+        current_app.logger.error('Unexpected error: %s', error, exc_info=True)
 
         # 回滚数据库会话
         db.session.rollback()
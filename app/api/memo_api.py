@@ -1,4 +1,161 @@
 """
 备忘录API端点
 """
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, current_app
+from flask_login import login_required, current_user
+from app.services.memo_service import MemoService
+from app.services.memo_events import hub, stream_events, ensure_relay
+from app.models.memo import MemoStatus
+from app.utils.conditional import conditional
+from app.utils.validators import get_content_sanitizer, is_valid_title
 
+memo_api_bp = Blueprint('memo_api', __name__)
+
+
+def parse_batch_operation(raw, sanitizer=None):
+    """
+    校验并规范化单个批量操作，非法时抛出ValueError
+
+    标题和内容的检查与MemoForm一致，sanitizer默认为拒绝模式的共享实例。
+    """
+    sanitizer = sanitizer or get_content_sanitizer()
+    if not isinstance(raw, dict):
+        raise ValueError("操作必须是JSON对象")
+
+    action = raw.get('action')
+    if action not in MemoService.BATCH_ACTIONS:
+        raise ValueError(f"不支持的操作: {action}")
+
+    operation = {'action': action}
+
+    if action != 'create':
+        memo_id = raw.get('id')
+        if not isinstance(memo_id, int) or isinstance(memo_id, bool):
+            raise ValueError("缺少有效的备忘录ID")
+        operation['id'] = memo_id
+
+    for field, max_length in (('title', 200), ('content', 10000)):
+        value = raw.get(field)
+        if value is None:
+            if action == 'create':
+                raise ValueError(f"缺少字段: {field}")
+            continue
+        if not isinstance(value, str) or not value.strip() or len(value) > max_length:
+            raise ValueError(f"字段无效: {field}")
+        if field == 'title' and not is_valid_title(value):
+            raise ValueError("标题包含无效字符")
+        if field == 'content' and not sanitizer.is_safe(value):
+            raise ValueError("内容包含潜在危险的HTML标签")
+        operation[field] = value
+
+    status = raw.get('status')
+    if status is not None:
+        if status not in MemoStatus.get_all_statuses():
+            raise ValueError(f"无效的状态: {status}")
+        operation['status'] = status
+    elif action == 'status':
+        raise ValueError("缺少字段: status")
+
+    expired_at = raw.get('expired_at')
+    if expired_at is not None:
+        try:
+            operation['expired_at'] = datetime.fromisoformat(expired_at)
+        except (TypeError, ValueError):
+            raise ValueError("字段无效: expired_at")
+
+    return operation
+
+
+class BatchRequestError(ValueError):
+    """批量请求格式错误，status为响应状态码，body为响应内容"""
+
+    def __init__(self, status, body):
+        super().__init__(body['error'])
+        self.status = status
+        self.body = body
+
+
+def parse_batch_request(payload, config):
+    """
+    校验整个批量请求（WSGI和ASGI端共用），返回 (operations, atomic)
+
+    先整体校验请求格式，格式错误不进入事务；非法时抛出BatchRequestError。
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get('operations'), list):
+        raise BatchRequestError(400, {'error': 'operations must be a list'})
+
+    raw_operations = payload['operations']
+    max_operations = config.get('BATCH_MAX_OPERATIONS', 500)
+    if len(raw_operations) > max_operations:
+        raise BatchRequestError(413, {'error': f'too many operations (max {max_operations})'})
+
+    atomic = payload.get('atomic', config.get('BATCH_ATOMIC', True))
+    if not isinstance(atomic, bool):
+        raise BatchRequestError(400, {'error': 'atomic must be a boolean'})
+
+    sanitizer = get_content_sanitizer(config.get('CONTENT_SANITIZER_MODE', 'deny'))
+    operations = []
+    for index, raw in enumerate(raw_operations):
+        try:
+            operations.append(parse_batch_operation(raw, sanitizer))
+        except ValueError as e:
+            raise BatchRequestError(400, {'error': str(e), 'index': index})
+    return operations, atomic
+
+
+@memo_api_bp.route('/batch', methods=['POST'])
+@login_required
+def batch():
+    """批量执行备忘录操作（单事务，单次缓存失效）"""
+    try:
+        operations, atomic = parse_batch_request(request.get_json(silent=True), current_app.config)
+    except BatchRequestError as e:
+        return jsonify(e.body), e.status
+
+    results, committed = MemoService.apply_batch(operations, atomic=atomic)
+
+    return jsonify({
+        'atomic': atomic,
+        'committed': committed,
+        'results': results
+    }), 200 if committed else 409
+
+
+@memo_api_bp.route('/memos/changes')
+@login_required
+@conditional(MemoService.get_change_state, last_modified=True)
+def memo_changes():
+    """增量同步：返回序列号since之后的变更和删除记录"""
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', 500, type=int), current_app.config.get('SYNC_MAX_CHANGES', 500))
+    if since < 0 or limit < 1:
+        return jsonify({'error': 'invalid since or limit'}), 400
+
+    changes = MemoService.get_changes(since=since, limit=limit)
+    if changes is None:
+        # 墓碑已被压缩，客户端需要从 since=0 重新全量同步
+        return jsonify({'error': 'resync required', 'since': 0}), 410
+
+    return jsonify(changes)
+
+
+@memo_api_bp.route('/memos/stream')
+@login_required
+def memo_stream():
+    """SSE推送当前用户的备忘录变更事件"""
+    config = current_app.config
+    if config.get('SSE_RELAY_ENABLED', True):
+        ensure_relay(current_app._get_current_object())
+
+    subscription = hub.subscribe(current_user.id, queue_size=config.get('SSE_QUEUE_SIZE', 100))
+    # 生成器不持有请求上下文和数据库会话，只等待进程内队列
+    events = stream_events(
+        subscription,
+        heartbeat=config.get('SSE_HEARTBEAT_INTERVAL', 15),
+        max_seconds=config.get('SSE_MAX_STREAM_SECONDS', 300)
+    )
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,408 @@
+"""
+ASGI入口
+
+API和推送路由（/api/batch、/api/memos/changes、/api/memos/stream）由原生协程处理，
+数据库访问走异步SQLAlchemy（aiosqlite），长连接不再占用worker线程；
+其余HTML路由通过 asgiref.WsgiToAsgi 转交原有的Flask应用处理。
+
+原生路由不经过WSGI中间件和Flask请求钩子，由 AsgiApplication 补充同样的处理：
+安全响应头、X-Request-ID、请求指标、请求日志和追踪。
+"""
+import asyncio
+import hmac
+import json
+import logging
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from flask_login import decode_cookie
+from flask_login.config import COOKIE_NAME
+from itsdangerous import BadData, URLSafeTimedSerializer
+from werkzeug import http
+from app.api.memo_api import BatchRequestError, parse_batch_request
+from app.services.async_memo_service import AsyncDatabase, AsyncMemoService
+from app.services.memo_events import hub, stream_events_async, ensure_relay
+from app.utils import metrics, tracing
+from app.utils.conditional import csrf_secret, make_etag
+from app.utils.logging_config import request_id_from
+
+# scope中保存已认证用户ID的键（用于请求日志和追踪）
+USER_ID_KEY = 'memo.user_id'
+
+
+class HttpError(Exception):
+    """请求处理中需要直接返回的错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class AsgiApplication:
+    """ASGI应用：异步API路由 + WSGI回退"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.config = flask_app.config
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.database = None
+        # 端点名称与WSGI端相同，指标和追踪按端点汇总时两端一致
+        self.routes = {
+            ('POST', '/api/batch'): ('memo_api.batch', self.batch),
+            ('GET', '/api/memos/changes'): ('memo_api.memo_changes', self.memo_changes),
+            ('GET', '/api/memos/stream'): ('memo_api.memo_stream', self.memo_stream),
+        }
+        self.access_logger = logging.getLogger(f'{flask_app.logger.name}.access')
+
+        # 安全响应头：未启用nonce时与WSGI中间件一样预先生成（HTTP、HTTPS各一份）
+        self.security = flask_app.extensions.get('security_headers')
+        self._security_headers = {}
+        if self.security is not None and not self.security.nonce:
+            self._security_headers = {
+                https: self._encode_headers(self.security.headers_for(https)) for https in (False, True)
+            }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        route = None
+        if scope['type'] == 'http':
+            route = self.routes.get((scope['method'], scope['path']))
+        if route is None:
+            await self.wsgi(scope, receive, send)
+            return
+
+        await self._handle(*route, scope, receive, send)
+
+    async def _handle(self, endpoint, handler, scope, receive, send):
+        """执行原生路由，并完成WSGI端由中间件和请求钩子完成的处理"""
+        headers = self._headers(scope)
+        request_id = request_id_from(headers.get('x-request-id'))
+        https = scope.get('scheme') == 'https'
+        start = time.perf_counter()
+        response = {'status': 500}
+        root = None
+        if tracing.tracer.enabled:
+            root = tracing.tracer.start_trace(endpoint, trace_id=request_id,
+                                              method=scope['method'], path=scope['path'])
+
+        async def send_with_headers(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                message = {**message, 'headers': [
+                    *message.get('headers', []),
+                    *self._security_headers_for(https, message['status']),
+                    (b'x-request-id', request_id.encode('latin-1')),
+                ]}
+            await send(message)
+
+        try:
+            try:
+                await handler(scope, receive, send_with_headers)
+            except HttpError as e:
+                await self._send_json(send_with_headers, {'error': e.message}, e.status)
+        except Exception as e:
+            if root is not None:
+                root.attributes['error'] = type(e).__name__
+            raise
+        finally:
+            user_id = scope.get(USER_ID_KEY)
+            if root is not None:
+                if user_id is not None:
+                    root.attributes['user_id'] = str(user_id)
+                tracing.tracer.finish(root)
+            self._record_request(endpoint, scope, response['status'], time.perf_counter() - start,
+                                 request_id, user_id)
+
+    def _security_headers_for(self, https, status):
+        if self.security is None:
+            return []
+        if not self.security.nonce:
+            return self._security_headers[https]
+        return self._encode_headers(self.security.headers_for(https, status))
+
+    @staticmethod
+    def _encode_headers(headers):
+        return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    def _record_request(self, endpoint, scope, status, elapsed, request_id, user_id):
+        """记录请求指标和请求日志（同WSGI端的after_request钩子）"""
+        config = self.config
+        method, path = scope['method'], scope['path']
+        if config.get('METRICS_ENABLED', True):
+            metrics.http_request_duration.observe(elapsed, endpoint)
+            metrics.http_requests.inc(endpoint, method, str(status))
+            store = self.flask_app.extensions.get('metrics_store')
+            if store is not None:
+                store.maybe_flush()
+        if config.get('LOG_REQUESTS', True):
+            self.access_logger.info('%s %s %s', method, path, status, extra={
+                'request_id': request_id,
+                'user_id': str(user_id) if user_id is not None else None,
+                'method': method,
+                'path': path,
+                'status': status,
+                'latency_ms': round(elapsed * 1000, 2),
+            })
+
+    async def _lifespan(self, receive, send):
+        """处理启动/关闭事件：创建和释放异步引擎"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._get_database()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.database is not None:
+                    await self.database.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _get_database(self):
+        if self.database is None:
+            self.database = AsyncDatabase(self.flask_app)
+            # 语句耗时指标和SQL span，同WSGI端的同步引擎
+            sync_engine = self.database.engine.sync_engine
+            if self.config.get('METRICS_ENABLED', True):
+                metrics.instrument_engine(sync_engine)
+            if tracing.tracer.enabled:
+                tracing.instrument_engine(sync_engine)
+        return self.database
+
+    # ---- 请求辅助方法 ----
+
+    @staticmethod
+    def _headers(scope):
+        return {name.decode('latin-1').lower(): value.decode('latin-1')
+                for name, value in scope.get('headers', [])}
+
+    @staticmethod
+    def _cookies(headers):
+        cookie = SimpleCookie()
+        cookie.load(headers.get('cookie', ''))
+        return cookie
+
+    def _load_session(self, headers):
+        """解析Flask会话cookie（与WSGI端共享同一签名方式）"""
+        morsel = self._cookies(headers).get(self.config.get('SESSION_COOKIE_NAME', 'session'))
+        if morsel is None:
+            return {}
+        serializer = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+        max_age = int(self.flask_app.permanent_session_lifetime.total_seconds())
+        try:
+            return serializer.loads(morsel.value, max_age=max_age)
+        except BadData:
+            return {}
+
+    def _remembered_user_id(self, headers, session_data):
+        """
+        Flask-Login“记住我”cookie中的用户ID，签名无效或已退出登录时返回None
+
+        与Flask-Login一致：会话中标记了 _remember=clear（已退出登录）时不使用该cookie。
+        """
+        if session_data.get('_remember') == 'clear':
+            return None
+        morsel = self._cookies(headers).get(self.config.get('REMEMBER_COOKIE_NAME', COOKIE_NAME))
+        if morsel is None:
+            return None
+        # decode_cookie 使用 current_app 的密钥校验签名
+        with self.flask_app.app_context():
+            return decode_cookie(morsel.value)
+
+    async def _load_user(self, session, user_id):
+        if user_id is None or not str(user_id).isdigit():
+            return None
+        return await AsyncMemoService.get_user(session, int(user_id))
+
+    async def _authenticate(self, session, scope, headers):
+        """
+        返回 (用户ID, 会话数据)，未登录时抛出401
+
+        加载顺序同Flask-Login：先取会话中的 _user_id，没有（或用户不存在）时使用“记住我”cookie。
+        """
+        data = self._load_session(headers)
+        user = await self._load_user(session, data.get('_user_id'))
+        if user is None:
+            user = await self._load_user(session, self._remembered_user_id(headers, data))
+        if user is None:
+            raise HttpError(401, 'login required')
+        scope[USER_ID_KEY] = user.id
+        return user.id, data
+
+    def _check_csrf(self, headers, session_data):
+        """校验X-CSRFToken请求头，规则同Flask-WTF的validate_csrf"""
+        if not self.config.get('WTF_CSRF_ENABLED', True):
+            return
+        token = headers.get('x-csrftoken') or headers.get('x-csrf-token')
+        field_name = self.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')
+        if not token or field_name not in session_data:
+            raise HttpError(400, 'The CSRF token is missing.')
+        secret_key = self.config.get('WTF_CSRF_SECRET_KEY') or self.flask_app.secret_key
+        serializer = URLSafeTimedSerializer(secret_key, salt='wtf-csrf-token')
+        try:
+            expected = serializer.loads(token, max_age=self.config.get('WTF_CSRF_TIME_LIMIT', 3600))
+        except BadData:
+            raise HttpError(400, 'The CSRF token is invalid.')
+        if not hmac.compare_digest(session_data[field_name], expected):
+            raise HttpError(400, 'The CSRF tokens do not match.')
+
+    async def _read_json(self, receive):
+        """读取并解析JSON请求体"""
+        max_length = self.config.get('MAX_CONTENT_LENGTH') or 16 * 1024 * 1024
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.extend(message.get('body', b''))
+            more_body = message.get('more_body', False)
+            if len(body) > max_length:
+                raise HttpError(413, 'request body too large')
+        try:
+            return json.loads(body or b'null')
+        except ValueError:
+            return None
+
+    @staticmethod
+    async def _send_json(send, payload, status=200, extra_headers=()):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('latin-1')),
+                *extra_headers,
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    # ---- 路由 ----
+
+    async def batch(self, scope, receive, send):
+        """批量执行备忘录操作，语义同WSGI端 /api/batch"""
+        headers = self._headers(scope)
+        payload = await self._read_json(receive)
+
+        async with self._get_database().session() as session:
+            user_id, session_data = await self._authenticate(session, scope, headers)
+            self._check_csrf(headers, session_data)
+
+            try:
+                operations, atomic = parse_batch_request(payload, self.config)
+            except BatchRequestError as e:
+                await self._send_json(send, e.body, e.status)
+                return
+
+            results, committed = await AsyncMemoService.apply_batch(
+                session, user_id, operations, atomic=atomic
+            )
+
+        await self._send_json(send, {
+            'atomic': atomic,
+            'committed': committed,
+            'results': results
+        }, 200 if committed else 409)
+
+    async def memo_changes(self, scope, receive, send):
+        """增量同步，语义同WSGI端 /api/memos/changes"""
+        headers = self._headers(scope)
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        try:
+            since = int(query.get('since', ['0'])[0])
+            limit = int(query.get('limit', ['500'])[0])
+        except ValueError:
+            raise HttpError(400, 'invalid since or limit')
+        limit = min(limit, self.config.get('SYNC_MAX_CHANGES', 500))
+        if since < 0 or limit < 1:
+            raise HttpError(400, 'invalid since or limit')
+
+        async with self._get_database().session() as session:
+            user_id, session_data = await self._authenticate(session, scope, headers)
+
+            # 条件请求：校验器命中时不执行变更查询
+            state = await AsyncMemoService.get_change_state(session, user_id)
+            etag = make_etag(scope['path'], since, limit, user_id, csrf_secret(session_data, self.config),
+                             state.generation, state.overdue)
+            validators = [
+                (b'etag', http.quote_etag(etag, weak=True).encode('latin-1')),
+                (b'cache-control', b'private, no-cache'),
+            ]
+            if state.last_modified:
+                validators.append((b'last-modified', http.http_date(state.last_modified).encode('latin-1')))
+            if self._not_modified(headers, etag, state.last_modified):
+                await send({'type': 'http.response.start', 'status': 304, 'headers': validators})
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+
+            changes = await AsyncMemoService.get_changes(session, user_id, since=since, limit=limit)
+
+        if changes is None:
+            await self._send_json(send, {'error': 'resync required', 'since': 0}, 410)
+            return
+        await self._send_json(send, changes, extra_headers=validators)
+
+    @staticmethod
+    def _not_modified(headers, etag, last_modified):
+        """判断If-None-Match / If-Modified-Since是否命中"""
+        if_none_match = headers.get('if-none-match')
+        if if_none_match:
+            return http.parse_etags(if_none_match).contains_weak(etag)
+        if_modified_since = http.parse_date(headers.get('if-modified-since'))
+        if last_modified and if_modified_since:
+            return last_modified.replace(microsecond=0) <= if_modified_since.replace(tzinfo=None)
+        return False
+
+    async def memo_stream(self, scope, receive, send):
+        """SSE推送当前用户的备忘录变更事件（等待期间不占用线程）"""
+        headers = self._headers(scope)
+        async with self._get_database().session() as session:
+            user_id, _ = await self._authenticate(session, scope, headers)
+
+        if self.config.get('SSE_RELAY_ENABLED', True):
+            ensure_relay(self.flask_app)
+
+        subscription = hub.subscribe_async(user_id, queue_size=self.config.get('SSE_QUEUE_SIZE', 100))
+        events = stream_events_async(
+            subscription,
+            heartbeat=self.config.get('SSE_HEARTBEAT_INTERVAL', 15),
+            max_seconds=self.config.get('SSE_MAX_STREAM_SECONDS', 300)
+        )
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        # 客户端断开后在下一条事件或心跳时结束生成器
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            async for chunk in events:
+                if disconnected.done():
+                    break
+                await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+            else:
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            await events.aclose()
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+
+def create_asgi_app(config_name='default'):
+    """创建ASGI应用"""
+    from app import create_app
+    return AsgiApplication(create_app(config_name))
@@ -0,0 +1,161 @@
+"""
+命令行工具（flask <command>）
+"""
+import os
+import click
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+# 引入迁移之前由create_all创建的数据库按memos表已有的列确定对应的迁移版本（从新到旧）
+LEGACY_REVISIONS = (
+    ('rendered_html', '2ff32ecae5f6'),
+    ('change_seq', '6ce6d6dd5806'),
+    ('id', '7f1c7d202a7c'),  # 基线：users、memos
+)
+
+
+def detect_legacy_revision(inspector):
+    """没有版本记录的已有数据库对应的迁移版本，不是旧数据库时返回None"""
+    tables = set(inspector.get_table_names())
+    if 'memos' not in tables or 'alembic_version' in tables:
+        return None
+    columns = {column['name'] for column in inspector.get_columns('memos')}
+    return next(revision for column, revision in LEGACY_REVISIONS if column in columns)
+
+
+def init_migrate(app):
+    """注册Flask-Migrate（flask db ...）；重复调用时不重复注册"""
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+        from app import db
+        # SQLite不支持大部分ALTER TABLE，用batch模式（复制表）修改列
+        Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+
+
+def upgrade_database(app):
+    """
+    把数据库升级到最新迁移版本（新增列、表、索引并回填数据）
+
+    引入迁移之前创建的数据库先标记为已有表结构对应的版本，再执行之后的迁移。
+    返回标记的版本，不是旧数据库时返回None。
+    """
+    from flask_migrate import stamp, upgrade
+    from app import db
+    init_migrate(app)
+    revision = detect_legacy_revision(db.inspect(db.engine))
+    if revision:
+        stamp(directory=MIGRATIONS_DIR, revision=revision)
+    upgrade(directory=MIGRATIONS_DIR)
+    return revision
+
+
+def register_commands(app):
+    """注册自定义CLI命令"""
+
+    # Flask-Migrate会导入alembic（较慢），只在通过flask命令行加载应用时注册
+    from flask.cli import ScriptInfo
+    ctx = click.get_current_context(silent=True)
+    if ctx is not None and ctx.find_object(ScriptInfo) is not None:
+        init_migrate(app)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """创建数据库表并标记为最新迁移版本（新数据库；已有数据库使用 flask upgrade-db）"""
+        from flask_migrate import stamp
+        from app import db
+        init_migrate(app)
+        db.create_all()
+        stamp(directory=MIGRATIONS_DIR)
+        click.echo('Database tables created')
+
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """把数据库升级到最新迁移版本（已有数据库更新代码后运行）"""
+        revision = upgrade_database(app)
+        if revision:
+            click.echo(f'Stamped existing database as revision {revision}')
+        click.echo('Database upgraded')
+
+    @app.cli.command('compact-tombstones')
+    @click.option('--days', type=int, default=None, help='保留天数，默认读取TOMBSTONE_RETENTION_DAYS')
+    def compact_tombstones(days):
+        """清理过期的备忘录墓碑记录"""
+        from app.services.memo_service import MemoService
+        if days is None:
+            days = app.config.get('TOMBSTONE_RETENTION_DAYS', 30)
+        deleted = MemoService.compact_tombstones(older_than_days=days)
+        click.echo(f'Compacted {deleted} tombstones older than {days} days')
+
+    @app.cli.command('render-markdown')
+    @click.option('--batch-size', type=int, default=200, help='每次提交的备忘录数量')
+    def render_markdown_command(batch_size):
+        """为尚无渲染结果的备忘录生成rendered_html（内容预览；启用MARKDOWN_PERSIST后的回填）"""
+        from app import db
+        from app.models.memo import Memo
+        from app.utils.markdown import render_preview
+        total = 0
+        while True:
+            memos = Memo.query.filter(Memo.rendered_html.is_(None)).limit(batch_size).all()
+            if not memos:
+                break
+            for memo in memos:
+                memo.rendered_html = render_preview(memo.content)
+            db.session.commit()
+            total += len(memos)
+        click.echo(f'Rendered {total} memos')
+
+    @app.cli.command('seed-data')
+    @click.option('--users', type=int, default=100, help='生成的用户数')
+    @click.option('--memos', type=int, default=50, help='每个用户的备忘录数')
+    @click.option('--seed', type=int, default=None, help='随机种子（相同种子生成相同内容）')
+    @click.option('--batch-size', type=int, default=5000, help='每次批量INSERT的行数')
+    def seed_data_command(users, memos, seed, batch_size):
+        """生成合成数据集（用于本地压测和性能分析）"""
+        import time
+        from app.utils.dataset import generate_dataset
+        start = time.perf_counter()
+        user_ids, total = generate_dataset(users, memos, seed=seed, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        if user_ids:
+            click.echo(f'Created {len(user_ids)} users (ids {user_ids[0]}-{user_ids[-1]}) '
+                       f'and {total} memos in {elapsed:.1f}s')
+        else:
+            click.echo('No users created')
+
+    @app.cli.command('build-assets')
+    @click.option('--no-minify', is_flag=True, help='只生成指纹文件，不压缩代码')
+    def build_assets_command(no_minify):
+        """压缩css/js并生成带内容指纹的文件和清单（static/dist/manifest.json）"""
+        from app.utils.assets import build_assets
+        output_dir = app.config.get('ASSETS_OUTPUT_DIR', 'dist')
+        manifest = build_assets(app.static_folder, output_dir, minify=not no_minify)
+        for source, hashed in sorted(manifest.items()):
+            click.echo(f'{source} -> {hashed}')
+        click.echo(f'Built {len(manifest)} assets into {output_dir}/')
+
+    @app.cli.command('diagnostics-token')
+    def diagnostics_token_command():
+        """生成诊断令牌（用于请求分析和诊断端点）"""
+        from app.utils.diagnostics import DIAGNOSTICS_HEADER, make_diagnostics_token
+        from app.utils.profiler import PROFILE_HEADER
+        token = make_diagnostics_token(app)
+        max_age = app.config.get('DIAGNOSTICS_TOKEN_MAX_AGE', 3600)
+        click.echo(token)
+        click.echo(f'Send as {PROFILE_HEADER} to profile a request (PROFILER_ENABLED), '
+                   f'or as {DIAGNOSTICS_HEADER} for /health diagnostics endpoints')
+        click.echo(f'Valid for {max_age} seconds')
+
+    @app.cli.command('compress-static')
+    def compress_static():
+        """为app/static下的文件生成 .gz 预压缩副本"""
+        import time
+        from app.middleware.compression import precompress_static
+        start = time.perf_counter()
+        results = precompress_static(app.static_folder)
+        elapsed = (time.perf_counter() - start) * 1000
+        original = sum(size for _, size, _ in results)
+        compressed = sum(size for _, _, size in results)
+        for path, size, gz_size in results:
+            click.echo(f'{path}: {size} -> {gz_size} bytes')
+        click.echo(f'Compressed {len(results)} files, saved {original - compressed} bytes '
+                   f'in {elapsed:.1f} ms')
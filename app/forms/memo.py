@@ -1,70 +1,67 @@
 """
 备忘录表单
 """
+from flask import current_app
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, SelectField, DateTimeLocalField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Length, Optional, ValidationError
-from flask_babel import gettext as _
+from flask_babel import gettext as _, lazy_gettext as _l
 from app.models.memo import MemoStatus
-import re
+from app.utils.validators import get_content_sanitizer, is_valid_title
 
 
 class MemoForm(FlaskForm):
     """备忘录表单"""
     title = StringField(
-        _('Title'),
+        _l('Title'),
         validators=[
-            DataRequired(message=_('Title is required')),
-            Length(min=1, max=200, message=_('Title must be between 1 and 200 characters'))
+            DataRequired(message=_l('Title is required')),
+            Length(min=1, max=200, message=_l('Title must be between 1 and 200 characters'))
         ],
-        render_kw={"placeholder": _("Enter a descriptive title for your memo")}
+        render_kw={"placeholder": _l("Enter a descriptive title for your memo")}
     )
 
     content = TextAreaField(
-        _('Content'),
+        _l('Content'),
         validators=[
-            DataRequired(message=_('Content is required')),
-            Length(min=1, max=10000, message=_('Content must be less than 10,000 characters'))
+            DataRequired(message=_l('Content is required')),
+            Length(min=1, max=10000, message=_l('Content must be less than 10,000 characters'))
         ],
-        render_kw={"placeholder": _("Write your memo content here..."), "rows": 8}
+        render_kw={"placeholder": _l("Write your memo content here..."), "rows": 8}
     )
 
     status = SelectField(
-        _('Status'),
-        choices=[(status, _(status.replace('_', ' ').title())) for status in MemoStatus.get_all_statuses()],
+        _l('Status'),
+        choices=[(status, _l(status.replace('_', ' ').title())) for status in MemoStatus.get_all_statuses()],
         default=MemoStatus.PENDING
     )
 
     expired_at = DateTimeLocalField(
-        _('Expiration Date'),
+        _l('Expiration Date'),
         validators=[Optional()],
-        render_kw={"placeholder": _("Select expiration date and time")}
+        render_kw={"placeholder": _l("Select expiration date and time")}
     )
 
-    no_expiry = BooleanField(_('No expiration'), default=True)
+    no_expiry = BooleanField(_l('No expiration'), default=True)
 
-    submit = SubmitField(_('Save Memo'))
+    submit = SubmitField(_l('Save Memo'))
 
     def validate_content(self, field):
         """验证内容不包含危险的HTML标签"""
-        dangerous_tags = ['<script', '<iframe', '<object', '<embed', '<form', '<input', '<button']
-        content_lower = field.data.lower()
-
-        for tag in dangerous_tags:
-            if tag in content_lower:
-                raise ValidationError(_('Content contains potentially dangerous HTML tags'))
+        sanitizer = get_content_sanitizer(current_app.config.get('CONTENT_SANITIZER_MODE', 'deny'))
+        if not sanitizer.is_safe(field.data):
+            raise ValidationError(_('Content contains potentially dangerous HTML tags'))
 
     def validate_title(self, field):
         """验证标题不包含特殊字符"""
-        # 允许字母、数字、中文字符、空格和基本标点符号
-        if not re.match(r'^[\w\s\u4e00-\u9fff.,!?-]+$', field.data):
+        if not is_valid_title(field.data):
             raise ValidationError(_('Title contains invalid characters'))
 
 
 class MemoStatusForm(FlaskForm):
     """备忘录状态更新表单"""
-    new_status = SelectField(_('New Status'), validators=[DataRequired()])
-    submit = SubmitField(_('Update Status'))
+    new_status = SelectField(_l('New Status'), validators=[DataRequired()])
+    submit = SubmitField(_l('Update Status'))
 
     def __init__(self, current_status=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -0,0 +1,3 @@
+"""
+WSGI中间件
+"""
@@ -0,0 +1,221 @@
+"""
+响应压缩中间件
+"""
+import gzip
+import itertools
+import mimetypes
+import os
+import zlib
+from flask import request
+from werkzeug.security import safe_join
+from app.utils.assets import IMMUTABLE_MAX_AGE
+
+# 默认压缩的内容类型（SSE等流式推送不在其中）
+COMPRESSIBLE_MIMETYPES = frozenset([
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/xml',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+])
+
+# 不允许带消息体或不应压缩的状态码
+_SKIP_STATUS = ('204', '206', '304')
+
+
+def accepts_gzip(accept_encoding):
+    """Accept-Encoding是否接受gzip（忽略q=0）"""
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding.strip().lower() in ('gzip', '*'):
+            params = params.replace(' ', '')
+            return params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def _add_vary(headers):
+    """在Vary头中追加Accept-Encoding"""
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == 'vary':
+            if 'accept-encoding' not in value.lower():
+                headers[index] = (name, f'{value}, Accept-Encoding')
+            return
+    headers.append(('Vary', 'Accept-Encoding'))
+
+
+class GzipMiddleware:
+    """
+    对文本响应进行gzip压缩的WSGI中间件
+
+    - 已有Content-Length且小于minimum_size的响应不压缩
+    - 已带Content-Encoding的响应（如预压缩静态文件）原样透传
+    - 没有Content-Length的流式响应逐块压缩并同步刷新，不缓冲整个响应
+    """
+
+    def __init__(self, app, minimum_size=500, compress_level=6, compressible=COMPRESSIBLE_MIMETYPES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compress_level = compress_level
+        self.compressible = frozenset(compressible)
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        client_accepts = accepts_gzip(environ.get('HTTP_ACCEPT_ENCODING'))
+        state = {}
+
+        def capture(status, headers, exc_info=None):
+            state['status'] = status
+            state['headers'] = headers
+            state['exc_info'] = exc_info
+            # 延迟调用start_response，直到确定是否压缩
+            return lambda data: state.setdefault('early_writes', []).append(data)
+
+        app_iter = self.app(environ, capture)
+        status = state['status']
+        headers = list(state['headers'])
+
+        mode = self._choose_mode(status, headers)
+        if mode is not None:
+            _add_vary(headers)
+        if mode is None or not client_accepts:
+            write = start_response(status, headers, state['exc_info'])
+            for data in state.get('early_writes', ()):
+                write(data)
+            return app_iter
+
+        headers = [(name, value) for name, value in headers if name.lower() != 'content-length']
+        headers.append(('Content-Encoding', 'gzip'))
+        headers = [
+            (name, self._weaken_etag(value) if name.lower() == 'etag' else value)
+            for name, value in headers
+        ]
+
+        if mode == 'buffered':
+            body = b''.join(state.get('early_writes', ()))
+            try:
+                body += b''.join(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            compressed = gzip.compress(body, compresslevel=self.compress_level)
+            headers.append(('Content-Length', str(len(compressed))))
+            start_response(status, headers, state['exc_info'])
+            return [compressed]
+
+        start_response(status, headers, state['exc_info'])
+        return self._stream(state.get('early_writes', ()), app_iter)
+
+    def _choose_mode(self, status, headers):
+        """返回 None（不压缩）、'buffered'（整体压缩）或 'stream'（逐块压缩）"""
+        if status[:3] in _SKIP_STATUS:
+            return None
+
+        content_type = content_length = None
+        for name, value in headers:
+            lower = name.lower()
+            if lower == 'content-encoding':
+                return None
+            if lower == 'content-type':
+                content_type = value.split(';', 1)[0].strip().lower()
+            elif lower == 'content-length':
+                content_length = value
+
+        if content_type not in self.compressible:
+            return None
+        if content_length is None:
+            return 'stream'
+        if int(content_length) < self.minimum_size:
+            return None
+        return 'buffered'
+
+    def _stream(self, early_writes, app_iter):
+        """逐块压缩，每块后同步刷新，保证客户端能立即收到已生成的内容"""
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        try:
+            for chunk in itertools.chain(early_writes, app_iter):
+                if chunk:
+                    yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    @staticmethod
+    def _weaken_etag(value):
+        """压缩后内容字节变化，强ETag需降级为弱ETag"""
+        return value if value.startswith('W/') else f'W/{value}'
+
+
+def send_static_file(app):
+    """
+    静态文件视图：客户端接受gzip且存在不旧于源文件的 .gz 预压缩副本时直接发送副本，
+    请求时零压缩开销（预压缩副本由 `flask compress-static` 生成）；
+    资源清单中带指纹的文件使用长期immutable缓存
+    """
+    def static(filename):
+        response = _send(filename)
+        assets = app.extensions.get('asset_manifest')
+        if assets is not None and assets.is_fingerprinted(filename):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    def _send(filename):
+        if accepts_gzip(request.headers.get('Accept-Encoding')):
+            source = safe_join(app.static_folder, filename)
+            try:
+                fresh = source is not None and os.path.getmtime(source + '.gz') >= os.path.getmtime(source)
+            except OSError:
+                fresh = False
+            if fresh:
+                response = app.send_static_file(filename + '.gz')
+                response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                response.headers['Content-Encoding'] = 'gzip'
+                response.vary.add('Accept-Encoding')
+                return response
+
+        response = app.send_static_file(filename)
+        if response.mimetype in COMPRESSIBLE_MIMETYPES:
+            response.vary.add('Accept-Encoding')
+        return response
+
+    return static
+
+
+def precompress_static(static_folder, compress_level=9, minimum_size=0):
+    """
+    为静态目录下的文件生成 .gz 副本
+
+    Returns:
+        列表，每项为 (相对路径, 原始字节数, 压缩后字节数)；压缩后不更小的文件会跳过
+    """
+    results = []
+    for root, _, files in os.walk(static_folder):
+        for name in sorted(files):
+            if name.endswith('.gz'):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < minimum_size:
+                continue
+            compressed = gzip.compress(data, compresslevel=compress_level, mtime=0)
+            target = path + '.gz'
+            if len(compressed) >= len(data):
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+            with open(target, 'wb') as f:
+                f.write(compressed)
+            stat = os.stat(path)
+            os.utime(target, (stat.st_atime, stat.st_mtime))
+            results.append((os.path.relpath(path, static_folder), len(data), len(compressed)))
+    return results
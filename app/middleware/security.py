@@ -0,0 +1,120 @@
+"""
+安全响应头中间件
+"""
+import secrets
+from flask import request
+
+# 本次请求的CSP nonce在environ中的键，模板通过 csp_nonce() 读取
+NONCE_ENVIRON_KEY = 'memo.csp_nonce'
+
+_NONCE_MARK = '\0'
+
+
+def build_csp(directives, nonce=False):
+    """
+    由指令字典生成CSP字符串
+
+    nonce为True时，script-src中的'unsafe-inline'替换为 'nonce-<标记>'，
+    由中间件在每个响应中把标记换成本次请求的nonce。
+    """
+    parts = []
+    for name, value in directives.items():
+        if nonce and name == 'script-src':
+            value = value.replace("'unsafe-inline'", f"'nonce-{_NONCE_MARK}'")
+        parts.append(f'{name} {value};' if value else f'{name};')
+    return ' '.join(parts)
+
+
+def build_hsts(config):
+    """由配置生成HSTS头的值，HSTS_MAX_AGE为0时返回None"""
+    max_age = config.get('HSTS_MAX_AGE', 0)
+    if max_age <= 0:
+        return None
+    value = f'max-age={max_age}'
+    if config.get('HSTS_INCLUDE_SUBDOMAINS'):
+        value += '; includeSubDomains'
+    if config.get('HSTS_PRELOAD'):
+        value += '; preload'
+    return value
+
+
+class SecurityHeadersMiddleware:
+    """
+    添加安全响应头的WSGI中间件
+
+    响应头列表在创建时按配置一次性生成（HTTP、HTTPS各一份，HSTS只用于HTTPS），
+    每个响应先去掉视图或扩展已设置的同名头（不区分大小写），再追加预先生成的列表，
+    与直接赋值一样以配置为准，不会出现重复的头（浏览器会对多个CSP取交集）。
+
+    nonce模式下为每个请求生成nonce写入environ，CSP的script-src使用该nonce代替
+    'unsafe-inline'；304响应不发送CSP，浏览器继续使用缓存页面原有的CSP，
+    保证其中的nonce与缓存的页面内容一致。
+    """
+
+    def __init__(self, app, headers, csp_directives, hsts=None, nonce=False):
+        self.app = app
+        self.nonce = nonce
+
+        http_headers = list(headers.items())
+        https_headers = http_headers + [('Strict-Transport-Security', hsts)] if hsts else http_headers
+        if nonce:
+            # CSP按请求拼接，这里只保存前后两段
+            self.csp_prefix, self.csp_suffix = build_csp(csp_directives, nonce=True).split(_NONCE_MARK)
+        else:
+            csp = ('Content-Security-Policy', build_csp(csp_directives))
+            http_headers = http_headers + [csp]
+            https_headers = https_headers + [csp]
+        self.http_headers = http_headers
+        self.https_headers = https_headers
+        # 中间件负责的所有头名（小写），响应中已有的同名头会被替换
+        self.header_names = frozenset(
+            name.lower() for name, _ in https_headers + [('Content-Security-Policy', None)]
+        )
+
+    def _without_managed(self, headers):
+        """去掉响应中由本中间件负责的头"""
+        return [(name, value) for name, value in headers if name.lower() not in self.header_names]
+
+    def __call__(self, environ, start_response):
+        extra = self.https_headers if environ.get('wsgi.url_scheme') == 'https' else self.http_headers
+
+        if not self.nonce:
+            def _start_response(status, headers, exc_info=None):
+                headers = self._without_managed(headers) + extra
+                return start_response(status, headers, exc_info)
+            return self.app(environ, _start_response)
+
+        nonce = environ[NONCE_ENVIRON_KEY] = secrets.token_urlsafe(16)
+
+        def _start_response(status, headers, exc_info=None):
+            headers = self._without_managed(headers) + extra
+            if not status.startswith('304'):
+                headers.append(('Content-Security-Policy', self.csp_prefix + nonce + self.csp_suffix))
+            return start_response(status, headers, exc_info)
+        return self.app(environ, _start_response)
+
+    def headers_for(self, https, status_code=200):
+        """不经过WSGI的响应（ASGI原生路由）要追加的安全头，与WSGI响应相同"""
+        headers = self.https_headers if https else self.http_headers
+        if self.nonce and status_code != 304:
+            nonce = secrets.token_urlsafe(16)
+            headers = headers + [('Content-Security-Policy', self.csp_prefix + nonce + self.csp_suffix)]
+        return headers
+
+
+def csp_nonce():
+    """模板函数：本次请求的CSP nonce（未启用nonce模式时为空字符串）"""
+    return request.environ.get(NONCE_ENVIRON_KEY, '')
+
+
+def init_security_headers(app):
+    """按配置包装安全响应头中间件并注册模板函数 csp_nonce()"""
+    config = app.config
+    app.wsgi_app = app.extensions['security_headers'] = SecurityHeadersMiddleware(
+        app.wsgi_app,
+        headers=config.get('SECURITY_HEADERS', {}),
+        csp_directives=config.get('CSP_DIRECTIVES', {}),
+        hsts=build_hsts(config),
+        nonce=config.get('CSP_NONCE_ENABLED', False)
+    )
+    app.add_template_global(csp_nonce)
@@ -2,6 +2,6 @@
 数据模型层
 """
 from app.models.user import User
-from app.models.memo import Memo
+from app.models.memo import Memo, MemoTombstone, ChangeSequence
 
-__all__ = ['User', 'Memo']
+__all__ = ['User', 'Memo', 'MemoTombstone', 'ChangeSequence']
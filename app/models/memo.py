@@ -1,8 +1,12 @@
 """
 备忘录模型
 """
+import itertools
 from datetime import datetime
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
 from app import db
+from app.utils.markdown import persist_enabled, render_preview
 from flask_login import current_user
 
 
@@ -50,6 +54,10 @@ class Memo(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)  # 完成时间（状态变为completed时记录）
     expired_at = db.Column(db.DateTime, nullable=True)    # 过期时间（可选）
+    change_seq = db.Column(db.Integer, nullable=True)     # 变更序列号（每次写入时递增，用于增量同步）
+    created_seq = db.Column(db.Integer, nullable=True)    # 创建时的变更序列号（change_seq等于它表示本次变更为创建）
+    expired_seq = db.Column(db.Integer, nullable=True)    # 标记过期时的变更序列号（change_seq等于它表示本次变更为过期）
+    rendered_html = db.Column(db.Text, nullable=True)     # content预览（列表卡片）的Markdown渲染结果（内容变化时更新，可选）
 
     # 关联用户
     user = db.relationship('User', backref=db.backref('memos', lazy='dynamic'))
@@ -59,6 +67,8 @@ class Memo(db.Model):
         db.Index('idx_memo_user_status', 'user_id', 'status'),
         db.Index('idx_memo_user_updated', 'user_id', 'updated_at'),
         db.Index('idx_memo_expired', 'expired_at'),
+        db.Index('idx_memo_user_change_seq', 'user_id', 'change_seq'),
+        db.Index('idx_memo_change_seq', 'change_seq'),  # 跨用户按序列号轮询（ChangeFeedRelay）
     )
 
     def __repr__(self):
@@ -75,7 +85,8 @@ class Memo(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'expired_at': self.expired_at.isoformat() if self.expired_at else None
+            'expired_at': self.expired_at.isoformat() if self.expired_at else None,
+            'change_seq': self.change_seq
         }
 
     def can_change_status(self, new_status):
@@ -97,6 +108,43 @@ class Memo(db.Model):
         """检查是否过期"""
         return self.expired_at and datetime.utcnow() > self.expired_at
 
+    @classmethod
+    def change_state_query(cls, user_id, now=None):
+        """
+        构造查询用户备忘录变更状态的语句（单条SQL，全部走索引）
+
+        结果列：最大变更序列号、最大墓碑序列号、已到期但未标记过期的数量、
+        最后修改时间、最后删除时间。用于生成ETag/Last-Modified。
+        """
+        now = now or datetime.utcnow()
+        return select(
+            select(db.func.max(cls.change_seq)).where(cls.user_id == user_id).scalar_subquery(),
+            select(db.func.max(MemoTombstone.change_seq))
+            .where(MemoTombstone.user_id == user_id).scalar_subquery(),
+            select(db.func.count(cls.id)).where(
+                cls.user_id == user_id,
+                cls.expired_at <= now,
+                cls.status.notin_([MemoStatus.EXPIRED, MemoStatus.CLOSED])
+            ).scalar_subquery(),
+            select(db.func.max(cls.updated_at)).where(cls.user_id == user_id).scalar_subquery(),
+            select(db.func.max(MemoTombstone.deleted_at))
+            .where(MemoTombstone.user_id == user_id).scalar_subquery(),
+        )
+
+    @classmethod
+    def expire_overdue(cls, user_id):
+        """把用户已到期但未标记的备忘录批量标记为过期，返回更新数量"""
+        overdue = cls.query.filter(
+            cls.user_id == user_id,
+            cls.expired_at <= datetime.utcnow(),
+            cls.status.notin_([MemoStatus.EXPIRED, MemoStatus.CLOSED])
+        ).all()
+        if overdue:
+            for memo in overdue:
+                memo.status = MemoStatus.EXPIRED
+            db.session.commit()
+        return len(overdue)
+
     @classmethod
     def get_user_memos(cls, user_id, page=1, per_page=10):
         """获取用户的备忘录（分页）- 优化版本"""
@@ -124,3 +172,105 @@ class Memo(db.Model):
 
         return pagination
 
+
+class MemoTombstone(db.Model):
+    """备忘录删除记录（墓碑），用于增量同步时通知客户端删除"""
+    __tablename__ = 'memo_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    memo_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_tombstone_user_change_seq', 'user_id', 'change_seq'),
+        db.Index('idx_tombstone_change_seq', 'change_seq'),
+        db.Index('idx_tombstone_deleted_at', 'deleted_at'),
+    )
+
+    def to_dict(self):
+        """转换为字典，便于JSON序列化"""
+        return {
+            'id': self.memo_id,
+            'change_seq': self.change_seq,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
+
+
+class ChangeSequence(db.Model):
+    """全局变更序列（单行计数器）"""
+    __tablename__ = 'change_sequence'
+
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    # 已压缩的墓碑序列号上限，早于此序列号的客户端需要全量同步
+    compacted_seq = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def allocate(cls, connection, count):
+        """在当前事务中分配count个连续序列号，返回第一个
+
+        先执行UPDATE获取写锁，保证并发写入时序列号单调且不重复
+        """
+        table = cls.__table__
+        result = connection.execute(
+            table.update().where(table.c.id == 1).values(value=table.c.value + count)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(id=1, value=count, compacted_seq=0))
+        value = connection.execute(select(table.c.value).where(table.c.id == 1)).scalar_one()
+        return value - count + 1
+
+    @classmethod
+    def get_compacted_seq(cls):
+        """获取已压缩的序列号上限"""
+        row = db.session.get(cls, 1)
+        return row.compacted_seq if row else 0
+
+
+@event.listens_for(Session, 'before_flush')
+def _update_rendered_html(session, flush_context, instances):
+    """
+    内容变化时更新持久化的预览渲染结果，未启用持久化时清空以免过期
+
+    只检查content：状态变更（如 Memo.expire_overdue 批量标记过期）不会触发渲染；
+    尚无渲染结果的旧数据由 flask render-markdown 回填。
+    """
+    persist = persist_enabled()
+    for obj in itertools.chain(session.new, session.dirty):
+        if not isinstance(obj, Memo):
+            continue
+        if obj in session.new or inspect(obj).attrs.content.history.has_changes():
+            obj.rendered_html = render_preview(obj.content) if persist and obj.content else None
+
+
+@event.listens_for(Session, 'before_flush')
+def _assign_change_seq(session, flush_context, instances):
+    """
+    为本次flush中新增/修改的备忘录分配序列号，并为删除的备忘录写入墓碑
+
+    同时记录创建和标记过期时的序列号，其他进程（ChangeFeedRelay）据此区分变更类型。
+    """
+    changed = [obj for obj in session.new if isinstance(obj, Memo)]
+    changed.extend(
+        obj for obj in session.dirty
+        if isinstance(obj, Memo) and session.is_modified(obj, include_collections=False)
+    )
+    deleted = [obj for obj in session.deleted if isinstance(obj, Memo)]
+
+    total = len(changed) + len(deleted)
+    if not total:
+        return
+
+    seq = ChangeSequence.allocate(session.connection(), total)
+    for memo in changed:
+        memo.change_seq = seq
+        if memo in session.new:
+            memo.created_seq = seq
+        elif memo.status == MemoStatus.EXPIRED and inspect(memo).attrs.status.history.added:
+            memo.expired_seq = seq
+        seq += 1
+    for memo in deleted:
+        session.add(MemoTombstone(memo_id=memo.id, user_id=memo.user_id, change_seq=seq))
+        seq += 1
@@ -1,7 +1,7 @@
 """
 认证相关路由
 """
-from flask import Blueprint, redirect, url_for, session, request, flash
+from flask import Blueprint, abort, current_app, redirect, url_for, session, request, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from flask_babel import gettext as _
 from app.services.oauth_service import get_github_oauth, get_github_user_info
@@ -71,3 +71,17 @@ def logout():
     logout_user()
     flash(_('You have successfully logged out'), 'info')
     return redirect(url_for('index.index'))
+
+
+@auth_bp.route('/test-login/<int:user_id>')
+def test_login(user_id):
+    """测试登录（仅TEST_AUTH_ENABLED时可用，供本地压测绕过OAuth）"""
+    if not current_app.config.get('TEST_AUTH_ENABLED', False):
+        abort(404)
+    from app import db
+    from app.models.user import User
+    user = db.session.get(User, user_id)
+    if user is None:
+        abort(404)
+    login_user(user)
+    return redirect(url_for('memo.list'))
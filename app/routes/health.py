@@ -1,17 +1,23 @@
 """
 健康检查和监控路由
+
+探测端点不直接访问数据库：/health/live 只表示进程可以处理请求，
+/health/detailed 返回后台采样的最近快照（见 app.services.health_sampler）。
 """
-from flask import Blueprint, jsonify, current_app
-from app import db
-from app.models.user import User
-from app.models.memo import Memo
-import time
-import psutil
+from flask import Blueprint, abort, jsonify, current_app, request
+from app import csrf
+from app.services.health_sampler import get_sampler
+from app.utils.diagnostics import diagnostics_required
+import json
 import os
+import time
 
 
 health_bp = Blueprint('health', __name__, url_prefix='/health')
 
+# 存活检查的响应体是固定的
+LIVENESS_BODY = json.dumps({'status': 'alive', 'service': 'memo-app'})
+
 
 @health_bp.route('/')
 def health_check():
@@ -23,81 +29,144 @@ def health_check():
     })
 
 
-@health_bp.route('/detailed')
-def detailed_health_check():
-    """详细健康检查"""
-    start_time = time.time()
-
-    # 数据库连接检查
-    db_healthy = True
-    db_error = None
-    try:
-        # 简单查询测试数据库连接
-        db.session.execute(db.text('SELECT 1'))
-    except Exception as e:
-        db_healthy = False
-        db_error = str(e)
+@health_bp.route('/live')
+def liveness_check():
+    """存活检查（不访问数据库，也不读取采样结果）"""
+    return current_app.response_class(LIVENESS_BODY, mimetype='application/json')
 
-    # 基本统计信息
-    try:
-        user_count = User.query.count()
-        memo_count = Memo.query.count()
-    except Exception as e:
-        user_count = memo_count = 0
 
-    # 系统信息
-    process = psutil.Process(os.getpid())
-    memory_usage = process.memory_info().rss / 1024 / 1024  # MB
+@health_bp.route('/detailed')
+def detailed_health_check():
+    """详细健康检查（返回最近一次采样的结果）"""
+    sampler = get_sampler(current_app)
+    snapshot = sampler.latest()
 
-    response_time = time.time() - start_time
+    # 后台采样线程长时间没有更新时视为不健康
+    stale_after = current_app.config.get('HEALTH_STALE_AFTER', 60)
+    if snapshot.age() > stale_after:
+        return jsonify({
+            'status': 'unhealthy',
+            'timestamp': time.time(),
+            'service': 'memo-app',
+            'error': 'health sample is stale',
+            'sample_age': round(snapshot.age(), 3)
+        }), 503
 
-    health_data = {
-        'status': 'healthy' if db_healthy else 'unhealthy',
-        'timestamp': time.time(),
-        'response_time': round(response_time, 3),
-        'service': 'memo-app',
-        'version': '1.0.0',
-        'checks': {
-            'database': {
-                'status': 'healthy' if db_healthy else 'unhealthy',
-                'error': db_error
-            }
-        },
-        'metrics': {
-            'users_count': user_count,
-            'memos_count': memo_count,
-            'memory_usage_mb': round(memory_usage, 2)
-        }
-    }
-
-    status_code = 200 if db_healthy else 503
-    return jsonify(health_data), status_code
+    status_code = 200 if snapshot.healthy else 503
+    return current_app.response_class(snapshot.body, status=status_code, mimetype='application/json')
 
 
 @health_bp.route('/metrics')
 def metrics():
-    """性能指标"""
-    # 数据库查询统计
-    try:
-        # 各状态备忘录数量
-        status_counts = db.session.query(
-            Memo.status, db.func.count(Memo.id)
-        ).group_by(Memo.status).all()
+    """
+    性能指标
+
+    默认输出Prometheus文本格式（请求计数和延迟、缓存命中、数据库查询耗时，
+    多worker时为所有进程的合计）；?format=json 返回原有的业务统计JSON。
+    """
+    # 业务统计来自后台采样
+    snapshot = get_sampler(current_app).latest()
+    status_metrics = snapshot.status_counts
+    recent_users = snapshot.recent_users
+
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'timestamp': time.time(),
+            'memo_status_distribution': status_metrics,
+            'recent_users_7d': recent_users
+        })
+
+    from app.utils import metrics as app_metrics
+    lines = [
+        '# HELP memo_memos Memos by status.',
+        '# TYPE memo_memos gauge',
+    ]
+    lines.extend(f'memo_memos{{status="{status}"}} {count}' for status, count in sorted(status_metrics.items()))
+    lines.extend([
+        '# HELP memo_recent_users_7d Users created in the last 7 days.',
+        '# TYPE memo_recent_users_7d gauge',
+        f'memo_recent_users_7d {recent_users}',
+    ])
+    body = '\n'.join(lines) + '\n' + app_metrics.registry.export(app_metrics.collect(current_app))
+    return current_app.response_class(body, content_type=app_metrics.CONTENT_TYPE)
+
+
+@health_bp.route('/traces')
+@diagnostics_required
+def traces():
+    """
+    最近的请求trace（需要诊断令牌，且启用TRACING_ENABLED）
+
+    参数 endpoint 按端点过滤（如 memo.edit），limit 为返回条数（最多200）。
+    """
+    from app.utils.tracing import tracer
+    if not tracer.enabled:
+        abort(404)
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    recent = tracer.recent(limit=limit, name=request.args.get('endpoint'))
+    return jsonify({'traces': [trace.to_dict() for trace in recent]})
+
+
+@health_bp.route('/memory')
+@diagnostics_required
+def memory_report():
+    """
+    内存诊断报告（需要诊断令牌）
+
+    包括进程RSS、tracemalloc状态、缓存条目数和近似大小、gc分代统计；
+    ?objects=N 附带对象数最多的N种类型。
+    """
+    import psutil
+    from app.utils import memory
+    objects = min(request.args.get('objects', 0, type=int), 100)
+    return jsonify({
+        'pid': os.getpid(),
+        'rss_mb': round(psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024, 2),
+        'tracemalloc': memory.tracing_status(),
+        'caches': memory.cache_report(),
+        'gc': memory.gc_report(object_types=objects),
+    })
 
-        status_metrics = {status: count for status, count in status_counts}
-    except Exception:
-        status_metrics = {}
 
-    # 用户活跃度（最近7天创建的用户）
+@health_bp.route('/memory/tracemalloc', methods=['POST', 'DELETE'])
+@csrf.exempt
+@diagnostics_required
+def memory_tracing():
+    """POST开始跟踪内存分配（?frames=N），DELETE停止跟踪"""
+    from app.utils import memory
+    if request.method == 'POST':
+        frames = max(1, min(request.args.get('frames', 1, type=int), 50))
+        changed = memory.start_tracing(frames)
+    else:
+        changed = memory.stop_tracing()
+    return jsonify({'changed': changed, 'tracemalloc': memory.tracing_status()})
+
+
+@health_bp.route('/memory/snapshot', methods=['POST'])
+@csrf.exempt
+@diagnostics_required
+def memory_snapshot():
+    """保存基准快照，之后用 GET /health/memory/diff 查看增长"""
+    from app.utils import memory
     try:
-        from datetime import datetime, timedelta
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_users = User.query.filter(User.created_at >= week_ago).count()
-    except Exception:
-        recent_users = 0
+        size = memory.take_baseline()
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'baseline_bytes': size})
 
-    return jsonify({
-        'timestamp': time.time(),
-        'memo_status_distribution': status_metrics,
-        'recent_users_7d': recent_users
-    })
\ No newline at end of file
+
+@health_bp.route('/memory/diff')
+@diagnostics_required
+def memory_diff():
+    """当前分配与基准快照的差异（?group=lineno|filename&limit=N）"""
+    from app.utils import memory
+    try:
+        stats = memory.diff_from_baseline(
+            group_by=request.args.get('group', 'lineno'),
+            limit=min(request.args.get('limit', 20, type=int), 200)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'pid': os.getpid(), 'stats': stats})
@@ -1,23 +1,44 @@
 """
 备忘录CRUD路由
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from flask import (Blueprint, Response, render_template, stream_template, request, redirect, url_for, flash, abort,
+                   current_app, get_flashed_messages)
 from flask_login import login_required, current_user
 from flask_babel import gettext as _
-from flask_wtf.csrf import validate_csrf
+from flask_wtf.csrf import generate_csrf, validate_csrf
 from app.services.memo_service import MemoService
 from app.models.memo import MemoStatus
 from app.forms.memo import MemoForm, MemoStatusForm
+from app.utils.conditional import conditional
+from app.utils.helpers import buffered
 
 memo_bp = Blueprint('memo', __name__)
 
 
 @memo_bp.route('/')
 @login_required
+@conditional(MemoService.get_change_state)
 def list():
     """备忘录列表页"""
     page = request.args.get('page', 1, type=int)
-    pagination = MemoService.get_user_memos(page=page, per_page=10)
+    per_page = request.args.get('per_page', current_app.config.get('MEMO_LIST_PER_PAGE', 10), type=int)
+    per_page = max(1, min(per_page, current_app.config.get('MEMO_LIST_MAX_PER_PAGE', 500)))
+
+    if current_app.config.get('MEMO_LIST_STREAMING', True):
+        # 流式渲染：页头和首批卡片立即发送，首字节时间不随per_page增长
+        # 卡片表单的CSRF令牌和闪现消息的移除都需在响应头（会话Cookie）发出前写入会话
+        generate_csrf()
+        flashed_messages = get_flashed_messages(with_categories=True)
+        pagination = MemoService.stream_user_memos(page=page, per_page=per_page)
+        chunks = stream_template('memo/list.html',
+                                 memos=pagination.items,
+                                 pagination=pagination,
+                                 flashed_messages=flashed_messages,
+                                 MemoStatus=MemoStatus)
+        return Response(buffered(chunks, current_app.config.get('STREAM_BUFFER_SIZE', 8192)),
+                        mimetype='text/html')
+
+    pagination = MemoService.get_user_memos(page=page, per_page=per_page)
 
     return render_template('memo/list.html',
                          memos=pagination.items,
@@ -54,6 +75,7 @@ def create():
 
 @memo_bp.route('/<int:memo_id>/edit', methods=['GET', 'POST'])
 @login_required
+@conditional(MemoService.get_change_state)
 def edit(memo_id):
     """编辑备忘录"""
     memo = MemoService.get_memo_by_id(memo_id)
@@ -0,0 +1,187 @@
+"""
+备忘录业务逻辑（异步版本，供ASGI路由使用）
+
+与 MemoService 语义一致，但不依赖 Flask 请求上下文：
+会话和用户ID由调用方显式传入。校验、字段合并和结果组装与 MemoService
+共用 memo_operations，这里只负责异步查询和提交。变更序列、墓碑和事件发布
+通过同步 Session 上注册的钩子同样生效。
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.models.memo import Memo, MemoStatus, ChangeSequence
+from app.models.user import User
+from app.services import memo_operations
+from app.utils.cache import clear_user_cache
+from app.utils.conditional import ChangeState
+
+# 同步驱动到异步驱动的映射
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+
+class AsyncDatabase:
+    """异步数据库引擎和会话工厂"""
+
+    def __init__(self, flask_app):
+        self.url = self._resolve_url(flask_app)
+        self.engine = create_async_engine(self.url)
+        # 提交后不过期对象，避免在异步上下文中触发隐式加载
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    @staticmethod
+    def _resolve_url(flask_app):
+        """优先使用ASYNC_DATABASE_URI，否则由同步引擎URL（已解析相对路径）推导"""
+        configured = flask_app.config.get('ASYNC_DATABASE_URI')
+        if configured:
+            return configured
+
+        from app import db
+        with flask_app.app_context():
+            url = db.engine.url
+        backend = url.get_backend_name()
+        if backend not in ASYNC_DRIVERS:
+            raise RuntimeError(f"不支持的异步数据库后端: {backend}，请设置ASYNC_DATABASE_URI")
+        return url.set(drivername=ASYNC_DRIVERS[backend])
+
+    def session(self):
+        """创建新的异步会话"""
+        return self.session_factory()
+
+    async def dispose(self):
+        """释放连接池"""
+        await self.engine.dispose()
+
+
+class AsyncMemoService:
+    """备忘录服务类（异步）"""
+
+    @staticmethod
+    async def get_user(session, user_id):
+        """根据ID获取用户"""
+        return await session.get(User, user_id)
+
+    @staticmethod
+    async def get_memo_by_id(session, user_id, memo_id):
+        """根据ID获取备忘录"""
+        result = await session.execute(select(Memo).filter_by(id=memo_id, user_id=user_id))
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def get_change_state(session, user_id):
+        """获取用户备忘录的变更状态（用于条件请求的校验器）"""
+        result = await session.execute(Memo.change_state_query(user_id))
+        return ChangeState.from_row(result.one())
+
+    @staticmethod
+    async def create_memo(session, user_id, title, content, status=MemoStatus.PENDING,
+                          expired_at=None, commit=True):
+        """创建备忘录"""
+        memo = memo_operations.build_memo(user_id, title, content, status, expired_at)
+        session.add(memo)
+
+        if not commit:
+            await session.flush()
+            return memo
+
+        await session.commit()
+        clear_user_cache(user_id)
+        return memo
+
+    @staticmethod
+    async def update_memo(session, user_id, memo_id, title=None, content=None, status=None,
+                          expired_at=None, commit=True):
+        """更新备忘录"""
+        memo = await AsyncMemoService.get_memo_by_id(session, user_id, memo_id)
+        if not memo:
+            return None
+
+        memo_operations.apply_memo_changes(memo, title, content, status, expired_at)
+
+        if not commit:
+            await session.flush()
+            return memo
+
+        await session.commit()
+        clear_user_cache(user_id)
+        return memo
+
+    @staticmethod
+    async def delete_memo(session, user_id, memo_id, commit=True):
+        """删除备忘录"""
+        memo = await AsyncMemoService.get_memo_by_id(session, user_id, memo_id)
+        if not memo:
+            return False
+
+        await session.delete(memo)
+
+        if not commit:
+            await session.flush()
+            return True
+
+        await session.commit()
+        clear_user_cache(user_id)
+        return True
+
+    @staticmethod
+    async def change_status(session, user_id, memo_id, new_status, commit=True):
+        """更改备忘录状态"""
+        return await AsyncMemoService.update_memo(session, user_id, memo_id, status=new_status,
+                                                  commit=commit)
+
+    @staticmethod
+    async def apply_batch(session, user_id, operations, atomic=True):
+        """在单个事务中按顺序执行批量操作，语义见 MemoService.apply_batch"""
+        results = []
+        failed = False
+
+        for index, operation in enumerate(operations):
+            try:
+                if atomic:
+                    result = await AsyncMemoService._apply_operation(session, user_id, operation)
+                else:
+                    async with session.begin_nested():
+                        result = await AsyncMemoService._apply_operation(session, user_id, operation)
+            except ValueError as e:
+                results.append(memo_operations.batch_failure(index, e))
+                if atomic:
+                    failed = True
+                    break
+                continue
+
+            results.append(memo_operations.batch_success(index, result))
+
+        if failed:
+            await session.rollback()
+            return results, False
+
+        await session.commit()
+        clear_user_cache(user_id)
+        return results, True
+
+    @staticmethod
+    async def _apply_operation(session, user_id, operation):
+        """执行单个批量操作（不提交），返回结果字典"""
+        action, memo_id, fields = memo_operations.batch_operation_args(operation)
+        if action == 'create':
+            memo = await AsyncMemoService.create_memo(session, user_id, commit=False, **fields)
+        elif action == 'delete':
+            memo = await AsyncMemoService.delete_memo(session, user_id, memo_id, commit=False)
+        else:
+            memo = await AsyncMemoService.update_memo(session, user_id, memo_id, commit=False, **fields)
+        return memo_operations.batch_operation_result(action, memo_id, memo)
+
+    @staticmethod
+    async def get_changes(session, user_id, since=0, limit=500):
+        """获取自序列号since之后的变更，语义见 MemoService.get_changes"""
+        if since > 0:
+            sequence = await session.get(ChangeSequence, 1)
+            if sequence is not None and since < sequence.compacted_seq:
+                return None
+
+        memo_query, tombstone_query = memo_operations.change_queries(user_id, since, limit)
+        memos = (await session.execute(memo_query)).scalars().all()
+        tombstones = (await session.execute(tombstone_query)).scalars().all()
+        return memo_operations.build_changes(memos, tombstones, since, limit)
@@ -0,0 +1,186 @@
+"""
+健康检查采样
+
+数据库连通性、数据量统计和进程资源由后台线程按间隔采样，
+健康检查端点只返回最近一次的快照（JSON预先编码），探测请求不再访问数据库。
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class HealthSnapshot:
+    """一次采样的结果"""
+
+    __slots__ = ('sampled_at', 'duration', 'healthy', 'db_error', 'users_count', 'memos_count',
+                 'status_counts', 'recent_users', 'memory_usage_mb', 'cpu_percent', 'body')
+
+    def __init__(self, sampled_at, duration, db_error, users_count, memos_count,
+                 status_counts, recent_users, memory_usage_mb, cpu_percent):
+        self.sampled_at = sampled_at
+        self.duration = duration
+        self.healthy = db_error is None
+        self.db_error = db_error
+        self.users_count = users_count
+        self.memos_count = memos_count
+        self.status_counts = status_counts
+        self.recent_users = recent_users
+        self.memory_usage_mb = memory_usage_mb
+        self.cpu_percent = cpu_percent
+        # /health/detailed 的响应体，采样时编码一次
+        self.body = json.dumps({
+            'status': 'healthy' if self.healthy else 'unhealthy',
+            'timestamp': sampled_at,
+            'response_time': round(duration, 3),
+            'service': 'memo-app',
+            'version': '1.0.0',
+            'checks': {
+                'database': {
+                    'status': 'healthy' if self.healthy else 'unhealthy',
+                    'error': db_error
+                }
+            },
+            'metrics': {
+                'users_count': users_count,
+                'memos_count': memos_count,
+                'memory_usage_mb': round(memory_usage_mb, 2),
+                'cpu_percent': cpu_percent
+            }
+        })
+
+    def age(self):
+        """距采样的秒数"""
+        return time.time() - self.sampled_at
+
+
+class HealthSampler:
+    """
+    健康状态采样器
+
+    启用后台采样时由线程每interval秒刷新一次快照；未启用时（如测试环境）
+    在快照超过interval秒后由请求线程同步刷新。
+    """
+
+    def __init__(self, app, interval=10.0, background=True):
+        self.app = app
+        self.interval = interval
+        self.background = background
+        self.snapshot = None
+        self._process = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动后台采样线程（幂等；fork后的子进程中线程不存在，会重新启动）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='health-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止后台采样线程"""
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.sample_once()
+            except Exception:
+                self.app.logger.exception('Health sampling failed')
+            self._stopped.wait(self.interval)
+
+    def _get_process(self):
+        import psutil
+        pid = os.getpid()
+        if self._process is None or self._process.pid != pid:
+            self._process = psutil.Process(pid)
+            # 第一次调用cpu_percent只建立基准，返回0
+            self._process.cpu_percent(None)
+        return self._process
+
+    def sample_once(self):
+        """采样一次并替换当前快照"""
+        from app import db
+        from app.models.memo import Memo
+        from app.models.user import User
+
+        start = time.time()
+        db_error = None
+        users_count = memos_count = recent_users = 0
+        status_counts = {}
+        with self.app.app_context():
+            try:
+                db.session.execute(db.text('SELECT 1'))
+                users_count = User.query.count()
+                status_counts = dict(
+                    db.session.query(Memo.status, db.func.count(Memo.id)).group_by(Memo.status).all()
+                )
+                memos_count = sum(status_counts.values())
+                week_ago = datetime.utcnow() - timedelta(days=7)
+                recent_users = User.query.filter(User.created_at >= week_ago).count()
+            except Exception as e:
+                db_error = str(e)
+            finally:
+                db.session.remove()
+
+        process = self._get_process()
+        snapshot = HealthSnapshot(
+            sampled_at=time.time(),
+            duration=time.time() - start,
+            db_error=db_error,
+            users_count=users_count,
+            memos_count=memos_count,
+            status_counts=status_counts,
+            recent_users=recent_users,
+            memory_usage_mb=process.memory_info().rss / 1024 / 1024,
+            cpu_percent=process.cpu_percent(None),
+        )
+        # 替换引用是原子的，读取方总是看到完整的快照
+        self.snapshot = snapshot
+        return snapshot
+
+    def latest(self):
+        """返回最近一次的快照"""
+        if self.background:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                self.start()
+            snapshot = self.snapshot
+            # 进程启动后的首次探测：后台线程尚未完成采样
+            return snapshot if snapshot is not None else self.sample_once()
+
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.age() >= self.interval:
+            with self._lock:
+                snapshot = self.snapshot
+                if snapshot is None or snapshot.age() >= self.interval:
+                    snapshot = self.sample_once()
+        return snapshot
+
+
+_sampler_lock = threading.Lock()
+
+
+def get_sampler(app):
+    """获取应用的采样器（每个应用一个）"""
+    # 传入current_app时取出实际的应用对象，后台线程中没有应用上下文
+    app = getattr(app, '_get_current_object', lambda: app)()
+    sampler = app.extensions.get('health_sampler')
+    if sampler is None:
+        with _sampler_lock:
+            sampler = app.extensions.get('health_sampler')
+            if sampler is None:
+                sampler = app.extensions['health_sampler'] = HealthSampler(
+                    app,
+                    interval=app.config.get('HEALTH_SAMPLE_INTERVAL', 10.0),
+                    background=app.config.get('HEALTH_SAMPLER_ENABLED', True)
+                )
+    return sampler
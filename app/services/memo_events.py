@@ -0,0 +1,378 @@
+"""
+备忘录变更事件（SSE推送）
+
+- EventHub: 进程内按用户分发事件，每个订阅者一个有界队列
+- 会话钩子: flush时收集备忘录变更，事务提交后发布，回滚则丢弃
+- ChangeFeedRelay: 后台线程轮询变更序列，把其他worker进程写入的变更转发到本进程
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models.memo import Memo, MemoStatus, MemoTombstone, ChangeSequence
+
+
+class Subscription:
+    """单个SSE连接的订阅（线程队列，供WSGI生成器阻塞等待）"""
+
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """投递事件；队列已满时清空队列并放入None哨兵"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+            _drain(self.queue, queue.Empty)
+            self.queue.put_nowait(None)
+
+
+class AsyncSubscription:
+    """单个SSE连接的订阅（asyncio队列，供ASGI协程等待）"""
+
+    def __init__(self, user_id, queue_size, loop):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.loop = loop
+        self.overflowed = False
+
+    def deliver(self, event):
+        """投递事件（可在任意线程调用，实际入队在事件循环线程中执行）"""
+        if self.overflowed:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._deliver_in_loop, event)
+        except RuntimeError:
+            # 事件循环已关闭
+            self.overflowed = True
+
+    def _deliver_in_loop(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            _drain(self.queue, asyncio.QueueEmpty)
+            self.queue.put_nowait(None)
+
+
+def _drain(q, empty_error):
+    """清空队列"""
+    while True:
+        try:
+            q.get_nowait()
+        except empty_error:
+            return
+
+
+class EventHub:
+    """进程内事件分发中心"""
+
+    def __init__(self, queue_size=100, local_history=10000):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        # 本进程已发布的序列号，中继转发时用于去重
+        self._local_seqs = set()
+        self._local_order = deque(maxlen=local_history)
+
+    def subscribe(self, user_id, queue_size=None):
+        """订阅指定用户的事件"""
+        return self._add(Subscription(user_id, queue_size or self.queue_size))
+
+    def subscribe_async(self, user_id, queue_size=None):
+        """在当前事件循环中订阅指定用户的事件"""
+        loop = asyncio.get_running_loop()
+        return self._add(AsyncSubscription(user_id, queue_size or self.queue_size, loop))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """取消订阅"""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def has_subscribers(self):
+        """是否存在订阅者"""
+        return bool(self._subscribers)
+
+    def subscriber_count(self):
+        """订阅者总数"""
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def is_local(self, seq):
+        """序列号对应的事件是否已由本进程发布"""
+        return seq in self._local_seqs
+
+    def publish(self, event, local=True):
+        """
+        发布事件给该用户的所有订阅者
+
+        队列已满的订阅者视为消费过慢：清空其队列并放入None哨兵，
+        连接随后会发送resync事件并关闭，客户端重连后通过增量同步补齐
+        """
+        if local and event.get('seq') is not None:
+            with self._lock:
+                if len(self._local_order) == self._local_order.maxlen:
+                    self._local_seqs.discard(self._local_order[0])
+                self._local_order.append(event['seq'])
+                self._local_seqs.add(event['seq'])
+
+        with self._lock:
+            subscribers = list(self._subscribers.get(event['user_id'], ()))
+
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+
+# 全局事件中心
+hub = EventHub()
+
+
+def format_sse(event):
+    """将事件格式化为SSE消息"""
+    lines = []
+    if event.get('seq') is not None:
+        lines.append(f"id: {event['seq']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream_events(subscription, heartbeat=15, max_seconds=300):
+    """
+    SSE响应生成器
+
+    空闲时按heartbeat间隔发送注释行保持连接；超过max_seconds后结束，
+    由浏览器自动重连，避免长连接无限期占用worker线程
+    """
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = subscription.queue.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+            if event is None:
+                yield 'event: resync\ndata: {}\n\n'
+                return
+            yield format_sse(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def stream_events_async(subscription, heartbeat=15, max_seconds=300):
+    """SSE响应异步生成器（ASGI），语义同stream_events，但等待时不占用线程"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ': heartbeat\n\n'
+                continue
+            if event is None:
+                yield 'event: resync\ndata: {}\n\n'
+                return
+            yield format_sse(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def _update_event_type(memo):
+    """区分普通更新和过期"""
+    if memo.status == MemoStatus.EXPIRED and inspect(memo).attrs.status.history.added:
+        return 'expire'
+    return 'update'
+
+
+def _current_transaction(session):
+    """当前最内层事务"""
+    return session.get_nested_transaction() or session.get_transaction()
+
+
+def _within(transaction, target):
+    """transaction是否为target本身或其子事务"""
+    while transaction is not None:
+        if transaction is target:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_memo_events(session, flush_context):
+    """flush后收集备忘录变更事件（此时new/dirty/deleted仍为flush前状态）"""
+    events = []
+    for memo in session.new:
+        if isinstance(memo, Memo):
+            events.append({'type': 'create', 'user_id': memo.user_id, 'seq': memo.change_seq,
+                           'memo': memo.to_dict()})
+    for memo in session.dirty:
+        if isinstance(memo, Memo) and session.is_modified(memo, include_collections=False):
+            events.append({'type': _update_event_type(memo), 'user_id': memo.user_id,
+                           'seq': memo.change_seq, 'memo': memo.to_dict()})
+    tombstone_seqs = {
+        obj.memo_id: obj.change_seq for obj in session.new if isinstance(obj, MemoTombstone)
+    }
+    for memo in session.deleted:
+        if isinstance(memo, Memo):
+            events.append({'type': 'delete', 'user_id': memo.user_id,
+                           'seq': tombstone_seqs.get(memo.id), 'id': memo.id})
+
+    if events:
+        transaction = _current_transaction(session)
+        session.info.setdefault('memo_events', []).extend((transaction, e) for e in events)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_memo_events(session, previous_transaction):
+    """回滚（包括SAVEPOINT回滚）时丢弃对应事务中收集的事件"""
+    pending = session.info.get('memo_events')
+    if pending:
+        session.info['memo_events'] = [
+            (transaction, e) for transaction, e in pending
+            if not _within(transaction, previous_transaction)
+        ]
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_memo_events(session):
+    """事务提交后发布事件"""
+    pending = session.info.pop('memo_events', None)
+    if pending:
+        for _, e in pending:
+            hub.publish(e)
+
+
+class ChangeFeedRelay:
+    """
+    跨进程事件中继
+
+    轮询数据库中的变更序列（见 ChangeSequence / MemoTombstone），
+    把其他进程写入的变更发布到本进程的EventHub。只有存在订阅者时才查询数据库。
+    """
+
+    def __init__(self, app, event_hub, interval=1.0, batch_size=1000):
+        self.app = app
+        self.hub = event_hub
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last_seq = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动后台轮询线程（幂等）；从启动时的序列号开始转发，启动后到首次轮询之间的写入不会遗漏"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self.last_seq is None:
+                self.last_seq = self.current_seq()
+            self._thread = threading.Thread(target=self._run, name='memo-change-relay', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not self.hub.has_subscribers():
+                continue
+            try:
+                self.poll_once()
+            except Exception:
+                self.app.logger.exception('Change feed relay poll failed')
+
+    def current_seq(self):
+        """数据库中当前的最大变更序列号"""
+        from app import db
+        with self.app.app_context():
+            try:
+                row = db.session.get(ChangeSequence, 1)
+                return row.value if row else 0
+            finally:
+                db.session.remove()
+
+    def poll_once(self):
+        """轮询一次，返回转发的事件数（未调用start时本次只记录当前序列号）"""
+        from app import db
+        with self.app.app_context():
+            try:
+                row = db.session.get(ChangeSequence, 1)
+                current = row.value if row else 0
+                if self.last_seq is None:
+                    self.last_seq = current
+                    return 0
+                if current <= self.last_seq:
+                    return 0
+
+                memos = Memo.query.filter(Memo.change_seq > self.last_seq)\
+                    .order_by(Memo.change_seq).limit(self.batch_size).all()
+                tombstones = MemoTombstone.query.filter(MemoTombstone.change_seq > self.last_seq)\
+                    .order_by(MemoTombstone.change_seq).limit(self.batch_size).all()
+
+                relayed = 0
+                for item in sorted(memos + tombstones, key=lambda i: i.change_seq)[:self.batch_size]:
+                    self.last_seq = max(self.last_seq, item.change_seq)
+                    if self.hub.is_local(item.change_seq):
+                        continue
+                    if isinstance(item, MemoTombstone):
+                        e = {'type': 'delete', 'user_id': item.user_id, 'seq': item.change_seq,
+                             'id': item.memo_id}
+                    else:
+                        if item.change_seq == item.created_seq:
+                            event_type = 'create'
+                        elif item.change_seq == item.expired_seq:
+                            event_type = 'expire'
+                        else:
+                            event_type = 'update'
+                        e = {'type': event_type, 'user_id': item.user_id, 'seq': item.change_seq,
+                             'memo': item.to_dict()}
+                    self.hub.publish(e, local=False)
+                    relayed += 1
+
+                if not memos and not tombstones:
+                    self.last_seq = current
+                return relayed
+            finally:
+                db.session.remove()
+
+
+# 每个进程一个中继实例，在首个SSE连接时启动
+_relay = None
+
+
+def ensure_relay(app):
+    """获取并启动当前进程的中继"""
+    global _relay
+    if _relay is None:
+        _relay = ChangeFeedRelay(app, hub, interval=app.config.get('SSE_RELAY_INTERVAL', 1.0))
+    _relay.start()
+    return _relay
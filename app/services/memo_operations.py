@@ -0,0 +1,141 @@
+"""
+备忘录业务规则（MemoService 和 AsyncMemoService 共用）
+
+只包含校验、字段合并、查询构造和结果组装，不访问数据库；
+查询的执行、flush和提交由两个服务各自完成。
+"""
+from datetime import datetime
+from sqlalchemy import select
+from app.models.memo import Memo, MemoStatus, MemoTombstone
+
+# 批量操作支持的动作
+BATCH_ACTIONS = ('create', 'update', 'delete', 'status')
+
+
+def build_memo(user_id, title, content, status=MemoStatus.PENDING, expired_at=None):
+    """创建备忘录对象（由调用方加入会话）"""
+    return Memo(
+        title=title,
+        content=content,
+        status=status,
+        user_id=user_id,
+        expired_at=expired_at
+    )
+
+
+def apply_memo_changes(memo, title=None, content=None, status=None, expired_at=None):
+    """把非None的字段写入备忘录，状态不允许变更时抛出ValueError"""
+    if title is not None:
+        memo.title = title
+    if content is not None:
+        memo.content = content
+    if expired_at is not None:
+        memo.expired_at = expired_at
+    if status is not None:
+        if not memo.can_change_status(status):
+            raise ValueError(f"无法将状态从 {memo.status} 更改为 {status}")
+        # 状态变更时处理特殊逻辑
+        old_status = memo.status
+        memo.status = status
+
+        # 如果状态变为completed，记录完成时间
+        if status == MemoStatus.COMPLETED and old_status != MemoStatus.COMPLETED:
+            memo.completed_at = datetime.utcnow()
+
+
+def batch_operation_args(operation):
+    """
+    取出单个批量操作的参数
+
+    Returns:
+        (action, memo_id, fields) 元组：create 的 memo_id 为 None，
+        fields 为创建/更新方法的关键字参数（delete 为空）
+    """
+    action = operation.get('action')
+    if action not in BATCH_ACTIONS:
+        raise ValueError(f"不支持的操作: {action}")
+
+    if action == 'create':
+        return action, None, {
+            'title': operation['title'],
+            'content': operation['content'],
+            'status': operation.get('status') or MemoStatus.PENDING,
+            'expired_at': operation.get('expired_at'),
+        }
+    if action == 'update':
+        return action, operation['id'], {
+            'title': operation.get('title'),
+            'content': operation.get('content'),
+            'status': operation.get('status'),
+            'expired_at': operation.get('expired_at'),
+        }
+    if action == 'status':
+        return action, operation['id'], {'status': operation['status']}
+    return action, operation['id'], {}
+
+
+def batch_operation_result(action, memo_id, memo):
+    """
+    单个批量操作的结果字典
+
+    memo 为操作后的备忘录（删除操作为是否删除成功），为空时表示备忘录不存在，抛出ValueError。
+    """
+    if not memo:
+        raise ValueError(f"备忘录不存在: {memo_id}")
+    if action == 'delete':
+        return {'action': action, 'id': memo_id}
+    # 在提交前序列化，避免提交后对象过期导致逐条重新查询
+    return {'action': action, 'id': memo.id, 'memo': memo.to_dict()}
+
+
+def batch_success(index, result):
+    """成功的批量操作结果"""
+    result['index'] = index
+    result['ok'] = True
+    return result
+
+
+def batch_failure(index, error):
+    """失败的批量操作结果"""
+    return {'index': index, 'ok': False, 'error': str(error)}
+
+
+def change_queries(user_id, since, limit):
+    """
+    增量同步的两个查询（修改过的备忘录、墓碑）
+
+    两个查询都走 (user_id, change_seq) 索引，各取limit+1条，由 build_changes 按序列号合并截断。
+    """
+    memo_query = select(Memo).filter_by(user_id=user_id)
+    if since > 0:
+        memo_query = memo_query.filter(Memo.change_seq > since)
+    tombstone_query = select(MemoTombstone)\
+        .filter(MemoTombstone.user_id == user_id, MemoTombstone.change_seq > since)
+    return (
+        memo_query.order_by(Memo.change_seq).limit(limit + 1),
+        tombstone_query.order_by(MemoTombstone.change_seq).limit(limit + 1),
+    )
+
+
+def build_changes(memos, tombstones, since, limit):
+    """
+    合并两个查询的结果
+
+    Returns:
+        字典，包含 changes（新增/修改的备忘录）、deleted（墓碑）、
+        next（下次请求使用的since）和 has_more
+    """
+    merged = sorted(list(memos) + list(tombstones), key=lambda item: item.change_seq or 0)
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    next_seq = since
+    for item in merged:
+        next_seq = max(next_seq, item.change_seq or 0)
+
+    return {
+        'changes': [item.to_dict() for item in merged if isinstance(item, Memo)],
+        'deleted': [item.to_dict() for item in merged if isinstance(item, MemoTombstone)],
+        'next': next_seq,
+        'has_more': has_more
+    }
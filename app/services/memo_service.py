@@ -2,28 +2,39 @@
 备忘录业务逻辑
 """
 from app import db
-from app.models.memo import Memo, MemoStatus
+from app.models.memo import Memo, MemoStatus, MemoTombstone, ChangeSequence
+from app.services import memo_operations
 from app.utils.cache import cached, clear_user_cache
+from app.utils.tracing import traced
+from app.utils.conditional import ChangeState
+from app.utils.helpers import StreamingPagination
+from app.services import memo_events  # noqa: F401  注册会话钩子，提交后向EventHub发布变更事件
 from flask_login import current_user
 
 
 class MemoService:
     """备忘录服务类"""
 
+    # 批量操作支持的动作
+    BATCH_ACTIONS = memo_operations.BATCH_ACTIONS
+
     @staticmethod
-    def create_memo(title, content, status=MemoStatus.PENDING, expired_at=None):
-        """创建备忘录"""
+    @traced()
+    def create_memo(title, content, status=MemoStatus.PENDING, expired_at=None, commit=True):
+        """创建备忘录
+
+        commit=False 时只flush不提交，由调用方（如批量操作）统一提交和清理缓存
+        """
         if not current_user.is_authenticated:
             raise ValueError("用户未登录")
 
-        memo = Memo(
-            title=title,
-            content=content,
-            status=status,
-            user_id=current_user.id,
-            expired_at=expired_at
-        )
+        memo = memo_operations.build_memo(current_user.id, title, content, status, expired_at)
         db.session.add(memo)
+
+        if not commit:
+            db.session.flush()
+            return memo
+
         db.session.commit()
 
         # 清除用户缓存
@@ -32,12 +43,20 @@ class MemoService:
         return memo
 
     @staticmethod
+    @traced()
     @cached(timeout=60)  # 缓存1分钟
     def get_memo_by_id(memo_id):
         """根据ID获取备忘录"""
         return Memo.query.filter_by(id=memo_id, user_id=current_user.id).first()
 
     @staticmethod
+    @traced()
+    def _get_owned_memo(memo_id):
+        """获取当前用户的备忘录（不走缓存，保证对象绑定在当前会话上，用于写操作）"""
+        return Memo.query.filter_by(id=memo_id, user_id=current_user.id).first()
+
+    @staticmethod
+    @traced()
     @cached(timeout=30)  # 缓存30秒
     def get_user_memos(page=1, per_page=10):
         """获取当前用户的备忘录（分页）"""
@@ -47,54 +66,176 @@ class MemoService:
         return Memo.get_user_memos(current_user.id, page, per_page)
 
     @staticmethod
-    def update_memo(memo_id, title=None, content=None, status=None, expired_at=None):
+    @traced()
+    def stream_user_memos(page=1, per_page=10):
+        """获取当前用户的备忘录（延迟分页，供流式渲染逐条读取）"""
+        if not current_user.is_authenticated:
+            return None
+
+        # 先把到期的备忘录标记为过期，之后的列表查询才能按需流式读取
+        Memo.expire_overdue(current_user.id)
+        query = Memo.query.filter_by(user_id=current_user.id).order_by(Memo.updated_at.desc())
+        return StreamingPagination(query, page=page, per_page=per_page)
+
+    @staticmethod
+    @traced()
+    def get_change_state():
+        """获取当前用户备忘录的变更状态（用于条件请求的校验器）"""
+        if not current_user.is_authenticated:
+            return None
+        return ChangeState.from_row(db.session.execute(Memo.change_state_query(current_user.id)).one())
+
+    @staticmethod
+    @traced()
+    def update_memo(memo_id, title=None, content=None, status=None, expired_at=None, commit=True):
         """更新备忘录"""
-        memo = MemoService.get_memo_by_id(memo_id)
+        memo = MemoService._get_owned_memo(memo_id)
         if not memo:
             return None
 
-        if title is not None:
-            memo.title = title
-        if content is not None:
-            memo.content = content
-        if expired_at is not None:
-            memo.expired_at = expired_at
-        if status is not None:
-            if not memo.can_change_status(status):
-                raise ValueError(f"无法将状态从 {memo.status} 更改为 {status}")
-            # 状态变更时处理特殊逻辑
-            old_status = memo.status
-            memo.status = status
-            
-            # 如果状态变为completed，记录完成时间
-            if status == MemoStatus.COMPLETED and old_status != MemoStatus.COMPLETED:
-                from datetime import datetime
-                memo.completed_at = datetime.utcnow()
+        memo_operations.apply_memo_changes(memo, title, content, status, expired_at)
+
+        if not commit:
+            db.session.flush()
+            return memo
 
         db.session.commit()
-        
+
         # 清除用户缓存
         clear_user_cache(current_user.id)
-        
+
         return memo
 
     @staticmethod
-    def delete_memo(memo_id):
+    @traced()
+    def delete_memo(memo_id, commit=True):
         """删除备忘录"""
-        memo = MemoService.get_memo_by_id(memo_id)
+        memo = MemoService._get_owned_memo(memo_id)
         if not memo:
             return False
 
         db.session.delete(memo)
+
+        if not commit:
+            db.session.flush()
+            return True
+
         db.session.commit()
-        
+
         # 清除用户缓存
         clear_user_cache(current_user.id)
-        
+
         return True
 
     @staticmethod
-    def change_status(memo_id, new_status):
+    @traced()
+    def change_status(memo_id, new_status, commit=True):
         """更改备忘录状态"""
-        return MemoService.update_memo(memo_id, status=new_status)
+        return MemoService.update_memo(memo_id, status=new_status, commit=commit)
+
+    @staticmethod
+    @traced()
+    def apply_batch(operations, atomic=True):
+        """
+        在单个事务中按顺序执行批量操作
+
+        Args:
+            operations: 操作列表，每项为包含 action 及其参数的字典
+                        （action 取值见 BATCH_ACTIONS）
+            atomic: True 时任一操作失败则整批回滚；
+                    False 时失败的操作单独回滚（SAVEPOINT），其余照常提交
+
+        Returns:
+            (results, committed) 元组，results 为与 operations 一一对应的结果列表
+        """
+        if not current_user.is_authenticated:
+            raise ValueError("用户未登录")
+
+        results = []
+        failed = False
+
+        for index, operation in enumerate(operations):
+            try:
+                if atomic:
+                    result = MemoService._apply_operation(operation)
+                else:
+                    with db.session.begin_nested():
+                        result = MemoService._apply_operation(operation)
+            except ValueError as e:
+                results.append(memo_operations.batch_failure(index, e))
+                if atomic:
+                    failed = True
+                    break
+                continue
+
+            results.append(memo_operations.batch_success(index, result))
+
+        if failed:
+            db.session.rollback()
+            return results, False
+
+        db.session.commit()
+
+        # 整批只清理一次用户缓存
+        clear_user_cache(current_user.id)
+
+        return results, True
+
+    @staticmethod
+    @traced()
+    def _apply_operation(operation):
+        """执行单个批量操作（不提交），返回结果字典"""
+        action, memo_id, fields = memo_operations.batch_operation_args(operation)
+        if action == 'create':
+            memo = MemoService.create_memo(commit=False, **fields)
+        elif action == 'delete':
+            memo = MemoService.delete_memo(memo_id, commit=False)
+        else:
+            memo = MemoService.update_memo(memo_id, commit=False, **fields)
+        return memo_operations.batch_operation_result(action, memo_id, memo)
+
+    @staticmethod
+    @traced()
+    def get_changes(since=0, limit=500):
+        """
+        获取当前用户自序列号since之后的变更（增量同步）
+
+        Returns:
+            字典，包含 changes（新增/修改的备忘录）、deleted（墓碑）、
+            next（下次请求使用的since）和 has_more；
+            since早于已压缩的墓碑时返回 None，客户端需要全量同步
+        """
+        if not current_user.is_authenticated:
+            raise ValueError("用户未登录")
+
+        if 0 < since < ChangeSequence.get_compacted_seq():
+            return None
+
+        memo_query, tombstone_query = memo_operations.change_queries(current_user.id, since, limit)
+        memos = db.session.execute(memo_query).scalars().all()
+        tombstones = db.session.execute(tombstone_query).scalars().all()
+        return memo_operations.build_changes(memos, tombstones, since, limit)
+
+    @staticmethod
+    @traced()
+    def compact_tombstones(older_than_days=30):
+        """删除早于指定天数的墓碑，返回删除数量"""
+        from datetime import datetime, timedelta
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+        horizon = db.session.query(db.func.max(MemoTombstone.change_seq))\
+            .filter(MemoTombstone.deleted_at < cutoff).scalar()
+        if horizon is None:
+            return 0
+
+        deleted = MemoTombstone.query\
+            .filter(MemoTombstone.change_seq <= horizon)\
+            .delete(synchronize_session=False)
+
+        # 记录压缩水位，早于此序列号的客户端将被要求全量同步
+        sequence = db.session.get(ChangeSequence, 1)
+        if sequence is not None and sequence.compacted_seq < horizon:
+            sequence.compacted_seq = horizon
+        db.session.commit()
 
+        return deleted
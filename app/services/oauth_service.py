@@ -1,19 +1,21 @@
 """
 OAuth业务逻辑
+
+authlib（连同requests、cryptography）导入较慢且只在登录时使用，
+OAuth客户端在首次登录请求时才创建，应用启动时不导入。
 """
-from authlib.integrations.flask_client import OAuth
+import threading
+from flask import current_app
 
-# 全局OAuth实例
-oauth = None
+_lock = threading.Lock()
 
 
-def init_oauth(app):
-    """初始化OAuth客户端"""
-    global oauth
+def _create_oauth(app):
+    from authlib.integrations.flask_client import OAuth
     oauth = OAuth(app)
-    
+
     # 注册GitHub OAuth
-    github = oauth.register(
+    oauth.register(
         name='github',
         client_id=app.config['GITHUB_CLIENT_ID'],
         client_secret=app.config['GITHUB_CLIENT_SECRET'],
@@ -24,20 +26,30 @@ def init_oauth(app):
         access_token_url='https://github.com/login/oauth/access_token',
         api_base_url='https://api.github.com/'
     )
-    
     return oauth
 
 
+def init_oauth(app):
+    """注册OAuth客户端（延迟到首次使用时创建）"""
+    app.extensions['memo_oauth'] = None
+
+
 def get_github_oauth():
     """获取GitHub OAuth客户端"""
-    if oauth is None:
+    app = current_app._get_current_object()
+    if 'memo_oauth' not in app.extensions:
         raise RuntimeError("OAuth未初始化，请先调用init_oauth()")
+    oauth = app.extensions['memo_oauth']
+    if oauth is None:
+        with _lock:
+            oauth = app.extensions['memo_oauth']
+            if oauth is None:
+                oauth = app.extensions['memo_oauth'] = _create_oauth(app)
     return oauth.github
 
 
 def get_github_user_info(access_token):
     """获取GitHub用户信息"""
-    from flask import current_app
     import requests
     
     headers = {
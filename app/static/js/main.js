@@ -20,11 +20,17 @@ function initializeApp() {
     // 初始化确认对话框
     initializeConfirmations();
 
+    // 初始化返回按钮
+    initializeHistoryBack();
+
     // 初始化响应式导航
     initializeResponsiveNav();
 
     // 初始化加载状态
     initializeLoadingStates();
+
+    // 初始化实时更新
+    initializeLiveUpdates();
 }
 
 /**
@@ -156,6 +162,17 @@ function initializeConfirmations() {
     });
 }
 
+/**
+ * 初始化返回按钮（data-history-back，代替内联onclick，兼容CSP nonce模式）
+ */
+function initializeHistoryBack() {
+    document.querySelectorAll('[data-history-back]').forEach(button => {
+        button.addEventListener('click', function() {
+            window.history.back();
+        });
+    });
+}
+
 /**
  * 初始化响应式导航
  */
@@ -220,6 +237,38 @@ function hideLoading(element) {
     });
 }
 
+/**
+ * 初始化实时更新（SSE）
+ * 删除事件直接移除卡片，其余变更提示用户刷新
+ */
+function initializeLiveUpdates() {
+    const container = document.querySelector('[data-memo-stream]');
+    if (!container || !window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource(container.dataset.memoStream);
+    const notifyChanged = debounce(function() {
+        showInfo(container.dataset.streamMessage);
+    }, 500);
+
+    source.addEventListener('delete', function(e) {
+        const data = JSON.parse(e.data);
+        const card = container.querySelector(`[data-memo-id="${data.id}"]`);
+        if (card) {
+            card.remove();
+        }
+    });
+
+    ['create', 'update', 'expire', 'resync'].forEach(function(type) {
+        source.addEventListener(type, notifyChanged);
+    });
+
+    window.addEventListener('beforeunload', function() {
+        source.close();
+    });
+}
+
 /**
  * 显示成功消息
  */
@@ -0,0 +1,105 @@
+"""
+静态资源清单（内容指纹 + 压缩）
+
+`flask build-assets` 把 css/js 压缩后以内容哈希命名写入 static/dist/，
+并生成 manifest.json（源文件名 -> 带指纹的文件名）。模板通过 asset_url()
+引用资源；带指纹的文件内容不会变化，可以使用一年的immutable缓存。
+"""
+import hashlib
+import json
+import os
+from flask import url_for
+
+MANIFEST_NAME = 'manifest.json'
+
+# 一年，带指纹的文件内容永不变化
+IMMUTABLE_MAX_AGE = 31536000
+
+_MINIFIERS = {
+    '.css': ('rcssmin', 'cssmin'),
+    '.js': ('rjsmin', 'jsmin'),
+}
+
+
+def _minify(extension, text):
+    """使用构建依赖 rcssmin / rjsmin 压缩文本"""
+    import importlib
+    module_name, func_name = _MINIFIERS[extension]
+    return getattr(importlib.import_module(module_name), func_name)(text)
+
+
+def build_assets(static_folder, output_dir='dist', minify=True):
+    """
+    生成带指纹的静态资源和清单
+
+    Returns:
+        dict: 清单内容 {源相对路径: 指纹文件相对路径}
+    """
+    output_root = os.path.join(static_folder, output_dir)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        # 跳过输出目录本身
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != output_root]
+        for name in sorted(files):
+            base, extension = os.path.splitext(name)
+            if extension not in _MINIFIERS:
+                continue
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            if minify:
+                text = _minify(extension, text)
+            data = text.encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()[:12]
+
+            directory = os.path.dirname(relative)
+            hashed = '/'.join(part for part in (output_dir, directory, f'{base}.{digest}{extension}') if part)
+            target = os.path.join(static_folder, *hashed.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            manifest[relative] = hashed
+
+    os.makedirs(output_root, exist_ok=True)
+    with open(os.path.join(output_root, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder, output_dir='dist'):
+    """读取清单，不存在或无法解析时返回空字典（回退到源文件）"""
+    try:
+        with open(os.path.join(static_folder, output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class AssetManifest:
+    """运行时清单：把源文件名解析为带指纹的文件名"""
+
+    def __init__(self, manifest=None):
+        self.manifest = manifest or {}
+        self.fingerprinted = set(self.manifest.values())
+
+    def resolve(self, filename):
+        return self.manifest.get(filename, filename)
+
+    def is_fingerprinted(self, filename):
+        return filename in self.fingerprinted
+
+
+def init_assets(app):
+    """加载资源清单并注册模板函数 asset_url()"""
+    manifest = {}
+    if app.config.get('ASSETS_MANIFEST_ENABLED', True):
+        manifest = load_manifest(app.static_folder, app.config.get('ASSETS_OUTPUT_DIR', 'dist'))
+    app.extensions['asset_manifest'] = assets = AssetManifest(manifest)
+
+    def asset_url(filename, **kwargs):
+        """url_for('static', ...)，存在清单时解析为带指纹的文件"""
+        return url_for('static', filename=assets.resolve(filename), **kwargs)
+
+    app.add_template_global(asset_url)
+    return assets
@@ -1,9 +1,13 @@
 """
 缓存工具
 """
+import threading
 import time
+from collections import OrderedDict
 from functools import wraps
 from flask import current_app
+from app.utils.metrics import cache_requests
+from app.utils.tracing import span
 
 
 class SimpleCache:
@@ -43,6 +47,44 @@ class SimpleCache:
         self.cache.clear()
 
 
+class LRUCache:
+    """有容量上限的LRU内存缓存（线程安全，适合按内容版本做键、无需过期时间的场景）"""
+
+    def __init__(self, max_entries=1000, name=None):
+        self.cache = OrderedDict()
+        self.max_entries = max_entries
+        self.name = name  # 指标中的缓存名称，为None时不记录命中率
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """获取缓存，命中时移到队尾"""
+        with self.lock:
+            value = self.cache.get(key)
+            if value is not None:
+                self.cache.move_to_end(key)
+        if self.name is not None:
+            cache_requests.inc(self.name, 'miss' if value is None else 'hit')
+        return value
+
+    def set(self, key, value):
+        """设置缓存，超出容量时淘汰最久未使用的项"""
+        with self.lock:
+            self.cache[key] = value
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+    def delete(self, key):
+        """删除缓存"""
+        with self.lock:
+            self.cache.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.cache.clear()
+
+
 # 全局缓存实例
 cache = SimpleCache()
 
@@ -65,17 +107,22 @@ def cached(timeout=None):
             key = ":".join(key_parts)
 
             # 尝试从缓存获取
-            result = cache.get(key)
+            with span('cache.lookup', key=key) as lookup:
+                result = cache.get(key)
+                if lookup is not None:
+                    lookup.attributes['hit'] = result is not None
             if result is not None:
-                current_app.logger.debug(f"Cache hit for {key}")
+                cache_requests.inc('function', 'hit')
+                current_app.logger.debug("Cache hit for %s", key)
                 return result
+            cache_requests.inc('function', 'miss')
 
             # 执行函数
             result = func(*args, **kwargs)
 
             # 存入缓存
             cache.set(key, result, timeout)
-            current_app.logger.debug(f"Cache miss for {key}, stored result")
+            current_app.logger.debug("Cache miss for %s, stored result", key)
 
             return result
         return wrapper
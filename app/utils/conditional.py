@@ -0,0 +1,104 @@
+"""
+条件请求工具（ETag / Last-Modified）
+"""
+import hashlib
+import time
+from functools import wraps
+from flask import current_app, make_response, request, session
+
+
+class ChangeState:
+    """用户数据的变更状态"""
+
+    __slots__ = ('generation', 'overdue', 'last_modified')
+
+    def __init__(self, generation, overdue, last_modified):
+        self.generation = generation        # 最大变更序列号（包括删除）
+        self.overdue = overdue              # 已到期但尚未标记为过期的数量，随时间变化
+        self.last_modified = last_modified  # 最后修改时间（UTC，naive datetime）
+
+    @classmethod
+    def from_row(cls, row):
+        """由 Memo.change_state_query 的结果行构造"""
+        memo_seq, tombstone_seq, overdue, updated_at, deleted_at = row
+        timestamps = [t for t in (updated_at, deleted_at) if t is not None]
+        return cls(
+            max(memo_seq or 0, tombstone_seq or 0),
+            overdue or 0,
+            max(timestamps) if timestamps else None
+        )
+
+
+def make_etag(*parts):
+    """由若干部分生成ETag值"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def _csrf_bucket():
+    """CSRF令牌有时效，页面缓存最多复用半个有效期，保证表单中的令牌仍然有效"""
+    limit = current_app.config.get('WTF_CSRF_TIME_LIMIT') or 3600
+    return int(time.time() // max(limit // 2, 1))
+
+
+def csrf_secret(session_data, config):
+    """会话中的CSRF密钥（页面中的令牌由它签名，不同会话的页面不能共用校验器）"""
+    return session_data.get(config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'), '')
+
+
+def conditional(state_func, last_modified=False):
+    """
+    条件请求装饰器
+
+    在执行视图（查询和模板渲染）之前，用state_func返回的ChangeState计算校验器，
+    命中If-None-Match（或在未携带If-None-Match时命中If-Modified-Since）则直接返回304。
+
+    Args:
+        state_func: 返回ChangeState的函数，返回None时跳过条件处理
+        last_modified: 是否同时输出Last-Modified（仅用于不含CSRF令牌/本地化内容的响应）
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # 有待显示的闪现消息时必须重新渲染
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            state = state_func()
+            if state is None:
+                return view(*args, **kwargs)
+
+            from flask_babel import get_locale
+            from flask_login import current_user
+
+            def current_etag():
+                # 校验器包含用户和会话：变更状态相同的两个用户（例如都没有备忘录）不能互相命中
+                return make_etag(
+                    request.full_path, current_user.get_id(), csrf_secret(session, current_app.config),
+                    state.generation, state.overdue, get_locale(), _csrf_bucket()
+                )
+
+            etag = current_etag()
+            modified = state.last_modified.replace(microsecond=0) if last_modified and state.last_modified else None
+
+            not_modified = request.if_none_match.contains_weak(etag)
+            if not request.if_none_match and modified and request.if_modified_since:
+                not_modified = modified <= request.if_modified_since.replace(tzinfo=None)
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # 视图可能刚生成会话的CSRF密钥
+                etag = current_etag()
+
+            response.set_etag(etag, weak=True)
+            if modified:
+                response.last_modified = modified
+            # 用户私有数据：允许浏览器缓存但每次都需要重新验证
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,135 @@
+"""
+合成数据集生成（flask seed-data）
+
+按接近线上的分布生成用户和备忘录：状态按权重分布，约一半备忘录设置过期时间
+（包括少量已到期但尚未标记的），内容长度为对数正态分布（中位数约300字符，
+上限10,000）。数据通过Core批量INSERT写入，不经过ORM逐行flush；
+变更序列号按批次一次分配，rendered_html留空（由 flask render-markdown 回填）。
+"""
+import math
+import random
+from datetime import datetime, timedelta
+from app import db
+from app.models.memo import ChangeSequence, Memo, MemoStatus
+from app.models.user import User
+
+# 生成的用户使用单独的OAuth提供商，便于识别和清理
+SEED_PROVIDER = 'seed'
+
+STATUS_WEIGHTS = {
+    MemoStatus.PENDING: 35,
+    MemoStatus.IN_PROGRESS: 20,
+    MemoStatus.COMPLETED: 30,
+    MemoStatus.CLOSED: 10,
+    MemoStatus.EXPIRED: 5,
+}
+
+CONTENT_MEDIAN = 300
+CONTENT_MAX = 10000
+
+_WORDS = (
+    'meeting notes review plan release deploy fix bug customer report budget design draft '
+    'schedule follow up call team sprint backlog update docs test migrate refactor check '
+    'invoice travel book order reply email sync roadmap metrics onboarding interview'
+).split()
+
+
+def _sentence(rng, words):
+    text = ' '.join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _content(rng):
+    """对数正态分布长度的内容，部分带Markdown列表"""
+    length = int(min(max(rng.lognormvariate(math.log(CONTENT_MEDIAN), 1.0), 20), CONTENT_MAX))
+    parts = []
+    size = 0
+    while size < length:
+        if rng.random() < 0.15:
+            part = '\n'.join(f'- {_sentence(rng, rng.randint(2, 6))}' for _ in range(rng.randint(2, 5))) + '\n'
+        else:
+            part = ' '.join(_sentence(rng, rng.randint(5, 14)) for _ in range(rng.randint(1, 4))) + '\n\n'
+        parts.append(part)
+        size += len(part)
+    return ''.join(parts)[:length].strip() or 'Note.'
+
+
+def _memo_row(rng, user_id, now):
+    status = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+    created_at = now - timedelta(seconds=rng.randint(0, 180 * 86400))
+    updated_at = min(now, created_at + timedelta(seconds=rng.randint(0, 14 * 86400)))
+
+    expired_at = None
+    if status == MemoStatus.EXPIRED:
+        expired_at = created_at + timedelta(hours=rng.randint(1, 30 * 24))
+        expired_at = min(expired_at, now - timedelta(minutes=1))
+    elif rng.random() < 0.5:
+        if status in (MemoStatus.PENDING, MemoStatus.IN_PROGRESS) and rng.random() < 0.1:
+            # 已到期但尚未标记为过期（列表页首次访问时处理）
+            expired_at = now - timedelta(hours=rng.randint(1, 72))
+        else:
+            expired_at = now + timedelta(hours=rng.randint(1, 60 * 24))
+
+    completed_at = None
+    if status == MemoStatus.COMPLETED:
+        completed_at = updated_at
+
+    return {
+        'title': _sentence(rng, rng.randint(2, 7))[:200].rstrip('.'),
+        'content': _content(rng),
+        'status': status,
+        'user_id': user_id,
+        'created_at': created_at,
+        'updated_at': updated_at,
+        'completed_at': completed_at,
+        'expired_at': expired_at,
+    }
+
+
+def generate_dataset(users, memos_per_user, seed=None, batch_size=5000):
+    """
+    生成users个用户，每个用户memos_per_user条备忘录
+
+    Returns:
+        (新用户ID列表, 备忘录数量)
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    run = f'{seed if seed is not None else rng.getrandbits(32)}-{int(now.timestamp())}'
+
+    user_table = User.__table__
+    db.session.execute(user_table.insert(), [{
+        'oauth_provider': SEED_PROVIDER,
+        'oauth_user_id': f'{run}-{i}',
+        'username': f'seed_user_{i}',
+        'email': f'seed_user_{i}@example.com',
+        'created_at': now - timedelta(days=rng.randint(0, 365)),
+        'updated_at': now,
+    } for i in range(users)])
+    user_ids = db.session.execute(
+        db.select(user_table.c.id)
+        .where(user_table.c.oauth_provider == SEED_PROVIDER, user_table.c.oauth_user_id.like(f'{run}-%'))
+        .order_by(user_table.c.id)
+    ).scalars().all()
+
+    memo_table = Memo.__table__
+    total = 0
+    batch = []
+
+    def flush():
+        seq = ChangeSequence.allocate(db.session.connection(), len(batch))
+        for offset, row in enumerate(batch):
+            row['change_seq'] = row['created_seq'] = seq + offset
+        db.session.execute(memo_table.insert(), batch)
+        batch.clear()
+
+    for user_id in user_ids:
+        for _ in range(memos_per_user):
+            batch.append(_memo_row(rng, user_id, now))
+            total += 1
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+    db.session.commit()
+    return user_ids, total
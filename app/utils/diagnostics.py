@@ -0,0 +1,44 @@
+"""
+运维诊断令牌
+
+请求分析（X-Profile-Token）和诊断端点（X-Diagnostics-Token）使用同一种
+带时效的签名令牌，由 flask diagnostics-token 生成。应用没有管理员角色，
+持有SECRET_KEY的运维人员通过令牌访问这些功能。
+"""
+from functools import wraps
+from flask import abort, current_app, request
+from itsdangerous import BadData, URLSafeTimedSerializer
+
+DIAGNOSTICS_HEADER = 'X-Diagnostics-Token'
+
+_SALT = 'diagnostics'
+
+
+def _serializer(app):
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt=_SALT)
+
+
+def make_diagnostics_token(app):
+    """生成诊断令牌（有效期见DIAGNOSTICS_TOKEN_MAX_AGE）"""
+    return _serializer(app).dumps('diagnostics')
+
+
+def verify_diagnostics_token(app, token):
+    """校验诊断令牌"""
+    if not token:
+        return False
+    try:
+        _serializer(app).loads(token, max_age=app.config.get('DIAGNOSTICS_TOKEN_MAX_AGE', 3600))
+    except BadData:
+        return False
+    return True
+
+
+def diagnostics_required(view):
+    """诊断端点装饰器：没有有效令牌时返回404，不暴露端点是否存在"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not verify_diagnostics_token(current_app, request.headers.get(DIAGNOSTICS_HEADER)):
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapper
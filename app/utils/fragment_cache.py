@@ -0,0 +1,55 @@
+"""
+模板片段缓存
+"""
+from flask import current_app, render_template
+from flask_babel import get_locale
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+from app.models.memo import MemoStatus
+from app.utils.cache import LRUCache
+from app.utils.markdown import content_preview, memo_html
+
+# 缓存中的CSRF令牌占位符，输出时替换为当前请求的令牌。
+# 含有 < 和 >：标题等经过自动转义、Markdown输出也会转义，用户内容中不可能出现这段原样文本
+CSRF_PLACEHOLDER = '<!--csrf_token-->'
+
+# 备忘录卡片缓存，容量在init_fragment_cache中按配置设置
+card_cache = LRUCache(name='memo_card')
+
+
+def _csrf_placeholder():
+    # Markup：占位符原样输出，不被自动转义
+    return Markup(CSRF_PLACEHOLDER)
+
+
+def render_memo_card(memo):
+    """
+    渲染备忘录卡片（memo/_card.html）
+
+    键为 (id, updated_at, status, 是否已到期, Markdown是否就绪, 语言)，备忘录任何写入都会更新updated_at，
+    因此不需要主动失效；与请求相关的CSRF令牌以占位符形式缓存，输出时替换。
+    """
+    # Markdown结果尚未就绪时卡片显示纯文本预览，就绪后键变化，重新渲染一次
+    content_html = memo_html(memo)
+    preview, truncated = content_preview(memo.content)
+    context = dict(memo=memo, content_html=content_html, content_preview=preview,
+                   content_truncated=truncated, MemoStatus=MemoStatus)
+    if not current_app.config.get('MEMO_CARD_CACHE_SIZE'):
+        return Markup(render_template('memo/_card.html', **context))
+
+    key = (memo.id, memo.updated_at, memo.status, bool(memo.is_expired),
+           content_html is not None, str(get_locale()))
+    html = card_cache.get(key)
+    if html is None:
+        html = render_template('memo/_card.html', csrf_token=_csrf_placeholder, **context)
+        card_cache.set(key, html)
+
+    if CSRF_PLACEHOLDER in html:
+        html = html.replace(CSRF_PLACEHOLDER, generate_csrf())
+    return Markup(html)
+
+
+def init_fragment_cache(app):
+    """注册模板函数并按配置设置缓存容量"""
+    card_cache.max_entries = app.config.get('MEMO_CARD_CACHE_SIZE') or 0
+    app.add_template_global(render_memo_card)
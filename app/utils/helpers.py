@@ -1,4 +1,125 @@
 """
 通用辅助函数
 """
+from app import db
 
+
+class LazyItems:
+    """
+    延迟执行的查询结果（单次迭代）
+
+    布尔判断时只读取第一行，迭代时按批流式读取其余行，
+    适合在流式模板中使用 `{% if items %}` / `{% for item in items %}`。
+    查询在开始读取时绑定到当前的会话：流式响应在视图的应用上下文结束后才迭代，
+    视图中的会话此时已被移除，继续使用它会占用连接直到被垃圾回收。
+    """
+
+    _EMPTY = object()
+
+    def __init__(self, query):
+        self._query = query
+        self._iterator = None
+        self._peeked = self._EMPTY
+
+    def _ensure_started(self):
+        if self._iterator is None:
+            self._iterator = iter(self._query.with_session(db.session()))
+
+    def __bool__(self):
+        self._ensure_started()
+        if self._peeked is self._EMPTY:
+            self._peeked = next(self._iterator, None)
+        return self._peeked is not None
+
+    def __iter__(self):
+        self._ensure_started()
+        if self._peeked is not self._EMPTY:
+            peeked, self._peeked = self._peeked, None
+            if peeked is not None:
+                yield peeked
+        yield from self._iterator
+
+
+class StreamingPagination:
+    """
+    延迟分页：items在模板首次使用时才查询并按批读取，
+    total（count查询）在首次访问时才执行（列表页中位于卡片之后的分页导航）
+
+    只使用查询的公开接口（limit/offset/count），提供列表模板用到的分页属性，
+    与 Flask-SQLAlchemy 的 Pagination 同名同义。
+    """
+
+    def __init__(self, query, page=1, per_page=10, batch_size=50):
+        self.query = query
+        self.page = max(page, 1)
+        self.per_page = max(per_page, 1)
+        self.items = LazyItems(
+            query.limit(self.per_page).offset((self.page - 1) * self.per_page).yield_per(batch_size)
+        )
+        self._total = None
+
+    @property
+    def total(self):
+        """总条数（首次访问时执行一次count查询）"""
+        if self._total is None:
+            self._total = self.query.order_by(None).with_session(db.session()).count()
+        return self._total
+
+    @property
+    def pages(self):
+        return -(-self.total // self.per_page) if self.total else 0
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def iter_pages(self, *, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        """分页导航的页码，省略的页码段用None表示（规则同 Flask-SQLAlchemy 的 Pagination.iter_pages）"""
+        pages_end = self.pages + 1
+        if pages_end == 1:
+            return
+
+        left_end = min(1 + left_edge, pages_end)
+        yield from range(1, left_end)
+        if left_end == pages_end:
+            return
+
+        mid_start = max(left_end, self.page - left_current)
+        mid_end = min(self.page + right_current + 1, pages_end)
+        if mid_start - left_end > 0:
+            yield None
+        yield from range(mid_start, mid_end)
+        if mid_end == pages_end:
+            return
+
+        right_start = max(mid_end, pages_end - right_edge)
+        if right_start - mid_end > 0:
+            yield None
+        yield from range(right_start, pages_end)
+
+
+def buffered(chunks, size=8192):
+    """合并模板流输出的小块，攒够size字符再发送，减少写入和压缩刷新次数"""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,59 @@
+"""
+多语言工具（语言选择和翻译目录预加载）
+"""
+from functools import lru_cache
+from babel import Locale
+from flask import current_app, request, session
+from flask_babel import force_locale, get_translations
+from werkzeug.datastructures import LanguageAccept
+from werkzeug.http import parse_accept_header
+
+
+@lru_cache(maxsize=32)
+def parse_locale(identifier):
+    """解析语言标识（Locale对象可复用，Flask-Babel不会再次解析）"""
+    return Locale.parse(identifier)
+
+
+@lru_cache(maxsize=512)
+def negotiate_language(accept_language, supported, default):
+    """
+    按Accept-Language请求头协商语言，返回LANGUAGES中的语言标识
+
+    同一客户端（会话）每次请求发送相同的请求头，结果按请求头缓存，
+    无需在每个请求中重新解析和匹配。
+    """
+    match = None
+    if accept_language:
+        match = parse_accept_header(accept_language, LanguageAccept).best_match(supported)
+    return match or default
+
+
+def get_language():
+    """当前请求的语言标识：优先使用session中的语言设置，其次按请求头协商"""
+    config = current_app.config
+    language = session.get('language')
+    if language in config['LANGUAGES']:
+        return language
+    return negotiate_language(
+        request.headers.get('Accept-Language', ''),
+        tuple(config['LANGUAGES']),
+        config['BABEL_DEFAULT_LOCALE']
+    )
+
+
+def select_locale():
+    """Flask-Babel语言选择器"""
+    return parse_locale(get_language())
+
+
+def preload_translations(app):
+    """
+    启动时通过Flask-Babel加载LANGUAGES中每种语言的已编译翻译目录（.mo），首个请求无需读取文件
+
+    Babel会把zh_CN解析为zh_Hans_CN，翻译目录按解析后的名称存放（translations/zh_Hans_CN）。
+    """
+    with app.app_context():
+        for language in app.config['LANGUAGES']:
+            with force_locale(language):
+                get_translations()
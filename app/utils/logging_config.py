@@ -1,69 +1,252 @@
 """
 日志配置
+
+请求线程只把日志记录放入队列（QueueHandler），格式化输出、文件写入和轮转
+都由后台的QueueListener线程完成。文件日志为JSON格式，每条记录带有
+request_id、user_id，请求日志另带延迟、状态码等字段。
 """
-import os
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
-from flask import current_app
+import os
+import queue
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+# 记录中附加的结构化字段（由RequestContextFilter或extra=提供）
+STRUCTURED_FIELDS = ('request_id', 'user_id', 'method', 'path', 'status', 'latency_ms')
+
+# 只记录警告和错误、只写文件的第三方日志
+LIBRARY_LOGGERS = ('werkzeug', 'sqlalchemy.engine')
+
+# 客户端传入的X-Request-ID只在格式合法时沿用
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_listener = None
+_queue_handlers = []
+
+
+class RequestContextFilter(logging.Filter):
+    """在产生日志的线程中附加请求ID和用户ID（不触发用户加载）"""
+
+    def filter(self, record):
+        if has_request_context():
+            if getattr(record, 'request_id', None) is None:
+                record.request_id = g.get('request_id')
+            if getattr(record, 'user_id', None) is None:
+                record.user_id = _current_user_id()
+        return True
+
+
+def _current_user_id():
+    """当前请求已加载的用户ID（不触发用户加载）"""
+    user = g.get('_login_user')
+    return user.get_id() if user is not None and user.is_authenticated else None
+
+
+class SamplingFilter(logging.Filter):
+    """按比例采样DEBUG及以下级别的记录，高于DEBUG的记录全部保留"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行JSON"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """开发环境控制台使用的文本格式（带请求ID）"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record):
+        message = super().format(record)
+        request_id = getattr(record, 'request_id', None)
+        return f'{message} [{request_id}]' if request_id else message
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for logger, handler in _queue_handlers:
+        logger.removeHandler(handler)
+    _queue_handlers.clear()
+
+
+def restart_listener():
+    """
+    fork后在子进程中重建日志队列和监听线程
+
+    父进程的监听线程不会复制到子进程，子进程继续向继承的队列写入的记录不会被输出；
+    换用新队列也避免了重复输出fork时队列中尚未处理的记录。
+    """
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    for _, handler in _queue_handlers:
+        handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _add_queue_handler(logger, handler):
+    logger.addHandler(handler)
+    _queue_handlers.append((logger, handler))
+
+
+def _file_handler(app, path):
+    """创建日志文件处理器
+
+    rotating：进程内按大小轮转，适用于单进程部署；
+    watched：多个进程（gunicorn worker）以追加方式写同一文件，轮转交给logrotate等外部工具，
+    文件被移走后自动重新打开（多进程各自轮转会互相覆盖、丢失日志）。
+    """
+    if app.config.get('LOG_FILE_HANDLER', 'rotating') == 'watched':
+        return WatchedFileHandler(path, encoding='utf-8', delay=True)  # 首条记录写入时才打开文件
+    return RotatingFileHandler(
+        path,
+        maxBytes=10 * 1024 * 1024,  # 10MB
+        backupCount=5,
+        encoding='utf-8',
+        delay=True  # 首条记录写入时才打开文件
+    )
 
 
 def setup_logging(app):
     """配置应用日志"""
-
-    # 确保日志目录存在
-    log_dir = os.path.join(app.root_path, '..', 'logs')
-    os.makedirs(log_dir, exist_ok=True)
+    # 重复创建应用（如测试）时先停止上一次的监听线程，避免处理器累积
+    _stop_listener()
 
     # 设置日志级别
     log_level = getattr(logging, app.config.get('LOG_LEVEL', 'INFO').upper())
-
-    # 创建格式化器
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    json_formatter = JsonFormatter()
 
     # 控制台处理器
     console_handler = logging.StreamHandler()
     console_handler.setLevel(log_level)
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(json_formatter if app.config.get('LOG_FORMAT', 'json') == 'json' else TextFormatter())
+    # Werkzeug和SQLAlchemy的日志只写文件
+    console_handler.addFilter(lambda record: not record.name.startswith(LIBRARY_LOGGERS))
+    handlers = [console_handler]
 
-    # 文件处理器 - 应用日志
-    app_log_file = os.path.join(log_dir, 'app.log')
-    file_handler = RotatingFileHandler(
-        app_log_file,
-        maxBytes=10 * 1024 * 1024,  # 10MB
-        backupCount=5
-    )
-    file_handler.setLevel(log_level)
-    file_handler.setFormatter(formatter)
+    log_dir = None
+    if app.config.get('LOG_FILES', True):
+        # 确保日志目录存在
+        log_dir = app.config.get('LOG_DIR') or os.path.join(app.root_path, '..', 'logs')
+        os.makedirs(log_dir, exist_ok=True)
 
-    # 错误日志处理器
-    error_log_file = os.path.join(log_dir, 'error.log')
-    error_handler = RotatingFileHandler(
-        error_log_file,
-        maxBytes=10 * 1024 * 1024,  # 10MB
-        backupCount=5
-    )
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
+        # 文件处理器 - 应用日志
+        file_handler = _file_handler(app, os.path.join(log_dir, 'app.log'))
+        file_handler.setLevel(log_level)
+        file_handler.setFormatter(json_formatter)
+
+        # 错误日志处理器
+        error_handler = _file_handler(app, os.path.join(log_dir, 'error.log'))
+        error_handler.setLevel(logging.ERROR)
+        error_handler.setFormatter(json_formatter)
+        handlers += [file_handler, error_handler]
+
+    # 请求线程只入队，I/O在监听线程中完成
+    log_queue = queue.SimpleQueue()
+    global _listener
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    app_queue_handler = QueueHandler(log_queue)
+    app_queue_handler.addFilter(RequestContextFilter())
+    app_queue_handler.addFilter(SamplingFilter(app.config.get('LOG_DEBUG_SAMPLE_RATE', 1.0)))
 
-    # 配置应用日志
-    app.logger.addHandler(console_handler)
-    app.logger.addHandler(file_handler)
-    app.logger.addHandler(error_handler)
+    # 配置应用日志：首次访问app.logger时Flask会挂上default_handler（直接写stderr），
+    # 与监听线程的控制台处理器重复，每条记录会在控制台输出两次，因此移除
+    app.logger.removeHandler(default_handler)
+    _add_queue_handler(app.logger, app_queue_handler)
     app.logger.setLevel(log_level)
 
-    # 配置Werkzeug日志（HTTP请求）
-    werkzeug_logger = logging.getLogger('werkzeug')
-    werkzeug_logger.addHandler(file_handler)
-    werkzeug_logger.setLevel(logging.WARNING)  # 只记录警告和错误
+    # 配置Werkzeug和SQLAlchemy日志：只记录警告和错误，只写文件
+    library_queue_handler = QueueHandler(log_queue)
+    library_queue_handler.addFilter(RequestContextFilter())
+    library_queue_handler.addFilter(lambda record: record.levelno >= logging.WARNING)
+    for name in LIBRARY_LOGGERS:
+        logger = logging.getLogger(name)
+        _add_queue_handler(logger, library_queue_handler)
+        logger.setLevel(logging.WARNING)
 
-    # 配置SQLAlchemy日志
-    sqlalchemy_logger = logging.getLogger('sqlalchemy.engine')
-    sqlalchemy_logger.addHandler(file_handler)
-    sqlalchemy_logger.setLevel(logging.WARNING)  # 只记录警告和错误
+    if app.config.get('LOG_REQUESTS', True):
+        register_request_logging(app)
 
     # 记录启动信息
     app.logger.info('应用启动完成')
-    app.logger.info(f'日志级别: {app.config.get("LOG_LEVEL", "INFO")}')
-    app.logger.info(f'日志目录: {log_dir}')
\ No newline at end of file
+    app.logger.info('日志级别: %s', app.config.get('LOG_LEVEL', 'INFO'))
+    if log_dir:
+        app.logger.info('日志目录: %s', log_dir)
+
+
+def request_id_from(header_value):
+    """请求ID：客户端传入的X-Request-ID格式合法时沿用，否则生成新的"""
+    return header_value if header_value and _REQUEST_ID_PATTERN.match(header_value) else uuid.uuid4().hex
+
+
+def register_request_logging(app):
+    """为每个请求分配请求ID，并在响应后记录一条带延迟的请求日志"""
+    access_logger = logging.getLogger(f'{app.logger.name}.access')
+
+    @app.before_request
+    def start_request_log():
+        g.request_id = request_id_from(request.headers.get('X-Request-ID'))
+        g.request_start = time.perf_counter()
+
+    def log_request(start, fields):
+        access_logger.info(
+            '%s %s %s', fields['method'], fields['path'], fields['status'],
+            extra=dict(fields, latency_ms=round((time.perf_counter() - start) * 1000, 2))
+        )
+
+    @app.after_request
+    def write_request_log(response):
+        start = g.get('request_start')
+        if start is not None:
+            fields = {'method': request.method, 'path': request.path, 'status': response.status_code}
+            if response.is_streamed:
+                # 流式响应（stream_template、SSE）的内容在after_request之后才生成，响应关闭时才记录，
+                # 延迟包含生成内容的时间；此时请求上下文可能已结束，请求ID和用户ID先取出
+                fields.update(request_id=g.request_id, user_id=_current_user_id())
+                response.call_on_close(lambda: log_request(start, fields))
+            else:
+                log_request(start, fields)
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+
+atexit.register(_stop_listener)
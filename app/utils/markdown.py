@@ -0,0 +1,154 @@
+"""
+备忘录内容的Markdown渲染
+
+列表卡片只显示内容预览（超过预览长度时截断的源文本）的渲染结果。渲染结果（已检查的HTML）
+按预览文本的哈希缓存在进程内LRU缓存中，可选持久化到 Memo.rendered_html（内容变化时更新）。
+列表页只读取已有结果，从不同步渲染：未命中时先显示纯文本，并在后台线程渲染（排队数量有上限），
+之后的请求直接使用缓存。
+"""
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from markupsafe import Markup, escape
+from app.utils.cache import LRUCache
+from app.utils.validators import ALLOWED_ATTRIBUTES, ALLOWED_TAGS, ContentSanitizer
+
+# 渲染输出允许的标签和属性（原始HTML在渲染时已被转义，这里是对输出的二次检查）
+MARKDOWN_TAGS = ALLOWED_TAGS | {'img', 'table', 'thead', 'tbody', 'tr', 'th', 'td'}
+MARKDOWN_ATTRIBUTES = {
+    **ALLOWED_ATTRIBUTES,
+    'img': frozenset(['src', 'alt']),
+    'code': frozenset(['class']),
+    'ol': frozenset(['start']),
+    'th': frozenset(['style']),
+    'td': frozenset(['style']),
+}
+
+_renderer = None
+_sanitizer = ContentSanitizer(mode='allow', allowed_tags=MARKDOWN_TAGS, allowed_attributes=MARKDOWN_ATTRIBUTES)
+
+# 内容哈希 -> HTML，容量在init_markdown中按配置设置
+render_cache = LRUCache(name='markdown')
+
+_settings = {'enabled': True, 'persist': True, 'preview_length': 200, 'queue_size': 100}
+_executor = None
+_pending = {}
+_lock = threading.Lock()
+
+
+def _get_renderer():
+    """首次渲染时才导入并创建markdown-it渲染器（应用启动时不加载）"""
+    global _renderer
+    if _renderer is None:
+        from markdown_it import MarkdownIt
+        # CommonMark + 表格和删除线，禁用原始HTML；链接中的javascript:等协议由markdown-it拒绝
+        _renderer = MarkdownIt('commonmark', {'html': False}).enable(['table', 'strikethrough'])
+    return _renderer
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def render_markdown(content):
+    """渲染Markdown为安全的HTML（结果按内容哈希缓存）"""
+    key = content_hash(content)
+    html = render_cache.get(key)
+    if html is None:
+        html = _get_renderer().render(content)
+        if not _sanitizer.is_safe(html):
+            # 理论上不会发生：输出中出现不允许的标签时退回为转义后的纯文本
+            html = f'<pre>{escape(content)}</pre>'
+        render_cache.set(key, html)
+    return Markup(html)
+
+
+def content_preview(content):
+    """列表卡片显示的内容：超过预览长度时在单词边界截断，返回 (预览文本, 是否截断)"""
+    length = _settings['preview_length']
+    if len(content) <= length:
+        return content, False
+    head = content[:length - 3]
+    boundary = max(head.rfind(' '), head.rfind('\n'))
+    if boundary > 0:
+        head = head[:boundary]
+    return head.rstrip() + '...', True
+
+
+def render_preview(content):
+    """渲染内容预览（持久化到rendered_html的内容）"""
+    return render_markdown(content_preview(content)[0])
+
+
+def _render_in_background(key, content):
+    try:
+        render_markdown(content)
+    finally:
+        with _lock:
+            _pending.pop(key, None)
+
+
+def schedule_render(content, key=None):
+    """
+    在后台线程中渲染并写入缓存（同一内容只提交一次）
+
+    排队数量达到上限时不提交并返回None（缓存冷启动时大量不同内容不会无限堆积），
+    调用方继续显示纯文本，之后的请求会重新提交。
+    """
+    global _executor
+    key = key or content_hash(content)
+    with _lock:
+        if key in _pending:
+            return _pending[key]
+        if len(_pending) >= _settings['queue_size']:
+            return None
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='markdown')
+        future = _pending[key] = _executor.submit(_render_in_background, key, content)
+    return future
+
+
+def wait_for_pending():
+    """等待后台渲染全部完成（用于测试和预热）"""
+    with _lock:
+        futures = list(_pending.values())
+    for future in futures:
+        future.result()
+
+
+def pending_count():
+    """排队和正在渲染的数量"""
+    with _lock:
+        return len(_pending)
+
+
+def memo_html(memo):
+    """
+    列表页使用：返回内容预览已持久化或已缓存的HTML，不同步渲染
+
+    未启用Markdown时返回None；缓存未命中时提交后台渲染并返回None，调用方显示纯文本预览。
+    """
+    if not _settings['enabled']:
+        return None
+    if memo.rendered_html is not None:
+        return Markup(memo.rendered_html)
+    preview, _ = content_preview(memo.content)
+    key = content_hash(preview)
+    html = render_cache.get(key)
+    if html is not None:
+        return Markup(html)
+    schedule_render(preview, key)
+    return None
+
+
+def persist_enabled():
+    return _settings['enabled'] and _settings['persist']
+
+
+def init_markdown(app):
+    """按配置设置Markdown渲染（模型事件中无法访问应用配置，这里保存为模块设置）"""
+    _settings['enabled'] = app.config.get('MARKDOWN_ENABLED', True)
+    _settings['persist'] = app.config.get('MARKDOWN_PERSIST', True)
+    _settings['preview_length'] = app.config.get('MARKDOWN_PREVIEW_LENGTH', 200)
+    _settings['queue_size'] = app.config.get('MARKDOWN_RENDER_QUEUE_SIZE', 100)
+    render_cache.max_entries = app.config.get('MARKDOWN_CACHE_SIZE', 2000)
@@ -0,0 +1,169 @@
+"""
+内存诊断
+
+用于定位worker常驻内存增长：tracemalloc启停和快照对比（按文件或行分组）、
+各缓存的条目数和近似大小（SimpleCache按键前缀即函数名分组）、gc分代统计。
+快照保存在当前进程中，多worker部署时每次请求只反映处理该请求的worker。
+"""
+import gc
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+
+# 快照中排除tracemalloc自身和导入机制的分配
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, bool, type(None))
+
+_baseline = None
+_lock = threading.Lock()
+
+
+def start_tracing(frames=1):
+    """开始跟踪内存分配（frames为每个分配保存的调用栈深度）"""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+
+def stop_tracing():
+    """停止跟踪并丢弃基准快照"""
+    global _baseline
+    with _lock:
+        _baseline = None
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    return True
+
+
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def take_baseline():
+    """保存基准快照，返回其中的分配总量（字节）"""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        raise RuntimeError('tracemalloc is not tracing')
+    snapshot = _take_snapshot()
+    with _lock:
+        _baseline = snapshot
+    return sum(stat.size for stat in snapshot.statistics('filename'))
+
+
+def diff_from_baseline(group_by='lineno', limit=20):
+    """当前分配与基准快照的差异，按增长量排序"""
+    if group_by not in ('lineno', 'filename'):
+        raise ValueError('group_by must be lineno or filename')
+    if not tracemalloc.is_tracing():
+        raise RuntimeError('tracemalloc is not tracing')
+    with _lock:
+        baseline = _baseline
+    if baseline is None:
+        raise RuntimeError('no baseline snapshot')
+
+    stats = _take_snapshot().compare_to(baseline, group_by)
+    return [{
+        'location': str(stat.traceback[0]) if group_by == 'lineno' else stat.traceback[0].filename,
+        'size_diff': stat.size_diff,
+        'size': stat.size,
+        'count_diff': stat.count_diff,
+        'count': stat.count,
+    } for stat in stats[:limit]]
+
+
+def tracing_status():
+    """tracemalloc状态"""
+    if not tracemalloc.is_tracing():
+        return {'tracing': False}
+    current, peak = tracemalloc.get_traced_memory()
+    with _lock:
+        has_baseline = _baseline is not None
+    return {
+        'tracing': True,
+        'frames': tracemalloc.get_traceback_limit(),
+        'traced_current': current,
+        'traced_peak': peak,
+        'overhead': tracemalloc.get_tracemalloc_memory(),
+        'baseline': has_baseline,
+    }
+
+
+def approximate_size(obj, max_depth=6, _seen=None, _depth=0):
+    """
+    对象的近似大小（字节）
+
+    递归计算容器和对象的公开属性（__dict__中不以下划线开头的项，
+    因此不会进入ORM实例状态、会话等内部结构），共享对象只计算一次。
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, _ATOMIC_TYPES) or _depth >= max_depth:
+        return size
+
+    depth = _depth + 1
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += approximate_size(key, max_depth, _seen, depth)
+            size += approximate_size(value, max_depth, _seen, depth)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += approximate_size(item, max_depth, _seen, depth)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        for name, value in vars(obj).items():
+            if not name.startswith('_'):
+                size += approximate_size(value, max_depth, _seen, depth)
+    return size
+
+
+def cache_report():
+    """各缓存的条目数和近似大小"""
+    from app.utils.cache import cache
+    from app.utils.fragment_cache import card_cache
+    from app.utils.markdown import render_cache
+
+    # SimpleCache的键为 "函数名:参数..."，按函数名分组
+    groups = {}
+    for key, item in list(cache.cache.items()):
+        prefix = key.split(':', 1)[0]
+        group = groups.setdefault(prefix, {'entries': 0, 'approx_bytes': 0})
+        group['entries'] += 1
+        group['approx_bytes'] += approximate_size(key) + approximate_size(item)
+
+    report = {'simple_cache': groups}
+    for lru in (card_cache, render_cache):
+        with lru.lock:
+            entries = list(lru.cache.items())
+        report[lru.name] = {
+            'entries': len(entries),
+            'max_entries': lru.max_entries,
+            'approx_bytes': sum(approximate_size(key) + approximate_size(value) for key, value in entries),
+        }
+    return report
+
+
+def gc_report(object_types=0):
+    """gc分代统计；object_types>0时附带对象数最多的类型（遍历全部对象，较慢）"""
+    report = {
+        'enabled': gc.isenabled(),
+        'counts': gc.get_count(),
+        'thresholds': gc.get_threshold(),
+        'generations': gc.get_stats(),
+        'garbage': len(gc.garbage),
+    }
+    if object_types:
+        counts = Counter(type(obj).__qualname__ for obj in gc.get_objects())
+        report['object_types'] = counts.most_common(object_types)
+    return report
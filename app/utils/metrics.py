@@ -0,0 +1,366 @@
+"""
+运行指标（Prometheus文本格式）
+
+计数和直方图按线程分片保存：每个线程只写自己的字典，记录时不加锁，
+导出时合并各分片。多个worker进程时，每个进程按间隔把快照写入
+METRICS_DIR，导出时合并目录中所有进程的快照。
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request
+
+# 请求延迟分桶（秒），与Prometheus客户端默认值一致
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 数据库查询分桶（秒）
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Shard:
+    """单个线程的指标数据"""
+
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [各分桶计数..., 溢出计数, 总和]
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._shards = []   # (线程, 分片)
+        self._retired = {'counters': {}, 'histograms': {}}  # 已结束线程的数据
+        self._shards_lock = threading.Lock()  # 只在线程首次记录和导出时使用
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def counter(self, name, documentation, labelnames=()):
+        """注册计数器"""
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        """注册直方图"""
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """合并当前进程各线程的数据，返回可JSON序列化的快照"""
+        with self._shards_lock:
+            # 已结束线程的分片并入retired，避免每请求一个线程的服务器上分片无限增长
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    _merge_shard(self._retired, shard)
+            self._shards = live
+            snapshot = merge_snapshots([self._retired])
+        for _, shard in live:
+            _merge_shard(snapshot, shard)
+        return snapshot
+
+    def reset(self):
+        """清空当前进程的数据"""
+        with self._shards_lock:
+            for _, shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+            self._retired = {'counters': {}, 'histograms': {}}
+
+    def export(self, snapshot=None):
+        """输出Prometheus文本格式"""
+        snapshot = snapshot or self.snapshot()
+        lines = []
+        for metric in self.metrics.values():
+            metric.render(snapshot, lines)
+        return '\n'.join(lines) + '\n'
+
+
+class Counter:
+    """计数器"""
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labels, amount=1):
+        counters = self.registry._shard().counters
+        key = (self.name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def render(self, snapshot, lines):
+        lines.append(f'# HELP {self.name} {self.documentation}')
+        lines.append(f'# TYPE {self.name} counter')
+        for key, value in sorted(snapshot['counters'].items()):
+            name, labels = _decode_key(key)
+            if name == self.name:
+                lines.append(f'{name}{_format_labels(self.labelnames, labels)} {value}')
+
+
+class Histogram:
+    """直方图（分桶计数、总和、次数）"""
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        histograms = self.registry._shard().histograms
+        key = (self.name, labels)
+        data = histograms.get(key)
+        if data is None:
+            data = histograms[key] = [0] * (len(self.buckets) + 2)
+        # 分桶按 value <= le 统计；超出最大分桶的落在溢出位置
+        data[bisect_left(self.buckets, value)] += 1
+        data[-1] += value
+
+    def render(self, snapshot, lines):
+        lines.append(f'# HELP {self.name} {self.documentation}')
+        lines.append(f'# TYPE {self.name} histogram')
+        bounds = [str(bucket) for bucket in self.buckets] + ['+Inf']
+        labelnames = self.labelnames + ('le',)
+        for key, data in sorted(snapshot['histograms'].items()):
+            name, labels = _decode_key(key)
+            if name != self.name:
+                continue
+            cumulative = 0
+            for bound, count in zip(bounds, data[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labelnames, labels + (bound,))} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{name}_sum{label_text} {data[-1]}')
+            lines.append(f'{name}_count{label_text} {cumulative}')
+
+
+def _encode_key(key):
+    """快照中的键为JSON字符串，便于写入文件后合并"""
+    name, labels = key
+    return json.dumps([name, [str(label) for label in labels]], ensure_ascii=False)
+
+
+def _decode_key(key):
+    name, labels = json.loads(key)
+    return name, tuple(labels)
+
+
+def _merge_counter(target, key, value):
+    target[key] = target.get(key, 0) + value
+
+
+def _merge_histogram(target, key, data):
+    existing = target.get(key)
+    if existing is None or len(existing) != len(data):
+        target[key] = data
+    else:
+        target[key] = [a + b for a, b in zip(existing, data)]
+
+
+def _merge_shard(target, shard):
+    # dict()复制在GIL下是原子的，不受所属线程同时写入的影响
+    for key, value in dict(shard.counters).items():
+        _merge_counter(target['counters'], _encode_key(key), value)
+    for key, data in dict(shard.histograms).items():
+        _merge_histogram(target['histograms'], _encode_key(key), list(data))
+
+
+def merge_snapshots(snapshots):
+    """合并多个进程的快照"""
+    merged = {'counters': {}, 'histograms': {}}
+    for snapshot in snapshots:
+        for key, value in snapshot.get('counters', {}).items():
+            _merge_counter(merged['counters'], key, value)
+        for key, data in snapshot.get('histograms', {}).items():
+            _merge_histogram(merged['histograms'], key, list(data))
+    return merged
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+# 全局注册表和应用指标
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    'memo_http_requests_total', 'HTTP requests by endpoint, method and status.',
+    ('endpoint', 'method', 'status'))
+http_request_duration = registry.histogram(
+    'memo_http_request_duration_seconds', 'Time spent producing the response, by endpoint.',
+    ('endpoint',))
+cache_requests = registry.counter(
+    'memo_cache_requests_total', 'Cache lookups by cache name and result.',
+    ('cache', 'result'))
+db_query_duration = registry.histogram(
+    'memo_db_query_duration_seconds', 'Database statement execution time, by statement type.',
+    ('operation',), buckets=QUERY_BUCKETS)
+
+
+class MultiProcessStore:
+    """
+    跨进程聚合：每个进程把快照写入 {directory}/metrics-{pid}.json
+
+    worker退出后由主进程把它的快照合并进 metrics-aggregate.json 并删除（mark_process_dead），
+    目录中只保留存活的worker和一份合计，文件数量和导出开销不随worker替换增长。
+    """
+
+    AGGREGATE_FILE = 'metrics-aggregate.json'
+
+    def __init__(self, directory, interval=5.0):
+        self.directory = directory
+        self.interval = interval
+        self._last_flush = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self):
+        # fork后pid变化，按当前pid计算文件名
+        return os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+
+    @staticmethod
+    def _write(path, snapshot):
+        """先写临时文件再替换，读取方不会看到半个文件"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def flush(self):
+        """写入当前进程的快照"""
+        self._last_flush = time.monotonic()
+        self._write(self.path, registry.snapshot())
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def collect(self):
+        """当前进程使用内存中的数据，其他进程读取文件（已退出的进程的计数在合计文件中）"""
+        own = os.path.basename(self.path)
+        snapshots = [registry.snapshot()]
+        for name in os.listdir(self.directory):
+            if name == own or not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            snapshot = self._read(os.path.join(self.directory, name))
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return merge_snapshots(snapshots)
+
+    def mark_process_dead(self, pid):
+        """把已退出进程的快照合并进合计文件并删除（只在主进程中调用，不会并发写合计文件）"""
+        path = os.path.join(self.directory, f'metrics-{pid}.json')
+        snapshot = self._read(path)
+        if snapshot is not None:
+            aggregate_path = os.path.join(self.directory, self.AGGREGATE_FILE)
+            self._write(aggregate_path, merge_snapshots([self._read(aggregate_path) or {}, snapshot]))
+        for stale in (path, f'{path}.tmp'):
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """删除目录中的所有快照（主进程启动时调用，计数从零开始）"""
+        for name in os.listdir(self.directory):
+            if name.startswith('metrics-'):
+                os.remove(os.path.join(self.directory, name))
+
+
+def _statement_operation(statement):
+    """SQL语句类型（SELECT/INSERT/...）"""
+    head = statement.lstrip()[:10].split(None, 1)
+    return head[0].upper() if head else 'OTHER'
+
+
+def instrument_engine(engine):
+    """为数据库引擎记录语句执行耗时"""
+    from sqlalchemy import event
+
+    if getattr(engine, '_memo_metrics', False):
+        return
+    engine._memo_metrics = True
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _end_query(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_metrics_query_start')
+        if starts:
+            db_query_duration.observe(time.perf_counter() - starts.pop(), _statement_operation(statement))
+
+
+def collect(app):
+    """返回所有进程合并后的快照"""
+    store = app.extensions.get('metrics_store')
+    return store.collect() if store is not None else registry.snapshot()
+
+
+def init_metrics(app):
+    """注册请求指标钩子和数据库计时"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    store = None
+    directory = app.config.get('METRICS_DIR')
+    if directory:
+        store = MultiProcessStore(directory, app.config.get('METRICS_FLUSH_INTERVAL', 5.0))
+        atexit.register(store.flush)
+    app.extensions['metrics_store'] = store
+
+    with app.app_context():
+        from app import db
+        instrument_engine(db.engine)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            # 未匹配路由的请求（404）归入同一个端点，避免标签数量随URL增长
+            endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+            http_request_duration.observe(time.perf_counter() - start, endpoint)
+            http_requests.inc(endpoint, request.method, str(response.status_code))
+            if store is not None:
+                store.maybe_flush()
+        return response
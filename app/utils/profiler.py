@@ -0,0 +1,145 @@
+"""
+按需请求分析
+
+未启用（PROFILER_ENABLED=False）时不注册任何钩子，没有额外开销。启用后，
+携带有效诊断令牌（X-Profile-Token，由 flask diagnostics-token 生成）的请求，
+或按 1/PROFILER_SAMPLE_RATE 比例抽中的请求会被分析，结果写入日志目录：
+
+- sample 模式：后台线程定时采集请求线程的调用栈，输出折叠栈格式（.folded），
+  可直接用于 flamegraph.pl、speedscope 等火焰图工具
+- cprofile 模式：使用cProfile，输出pstats文件（.prof），可用 snakeviz 等查看
+"""
+import cProfile
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from flask import current_app, g, request
+from app.utils.diagnostics import verify_diagnostics_token
+
+PROFILE_HEADER = 'X-Profile-Token'
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class StackSampler:
+    """定时采集指定线程的调用栈，按折叠栈（根;...;叶）计数"""
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.counts[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class CProfileRunner:
+    """cProfile封装，接口与StackSampler一致"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+def _should_profile(app, counter):
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        return verify_diagnostics_token(app, token)
+    sample_rate = app.config.get('PROFILER_SAMPLE_RATE', 0)
+    return bool(sample_rate) and next(counter) % sample_rate == 0
+
+
+def profile_directory(app):
+    """分析结果目录（默认 logs/profiles）"""
+    return app.config.get('PROFILER_DIR') or os.path.join(app.root_path, '..', 'logs', 'profiles')
+
+
+def _output_path(app, mode):
+    endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+    user = g.get('_login_user')
+    user_id = user.get_id() if user is not None and user.is_authenticated else 'anon'
+    request_id = g.get('request_id') or f'{threading.get_ident():x}'
+    name = f'{time.strftime("%Y%m%dT%H%M%S")}-{endpoint}-u{user_id}-{request_id[:12]}'
+    name = _UNSAFE_FILENAME_CHARS.sub('_', name)
+    extension = '.prof' if mode == 'cprofile' else '.folded'
+    return os.path.join(profile_directory(app), name + extension)
+
+
+def init_profiler(app):
+    """按配置注册请求分析钩子"""
+    if not app.config.get('PROFILER_ENABLED', False):
+        return
+
+    mode = app.config.get('PROFILER_MODE', 'sample')
+    interval = app.config.get('PROFILER_INTERVAL', 0.001)
+    counter = itertools.count()
+    os.makedirs(profile_directory(app), exist_ok=True)
+
+    @app.before_request
+    def start_profiler():
+        if not _should_profile(app, counter):
+            return
+        if mode == 'cprofile':
+            profiler = CProfileRunner()
+        else:
+            profiler = StackSampler(threading.get_ident(), interval)
+        try:
+            profiler.start()
+        except ValueError:
+            # 同一线程已有其他分析器（如调试器）在运行
+            return
+        g.request_profiler = (profiler, time.perf_counter())
+
+    # teardown在流式响应结束后才执行，分析覆盖整个响应生成过程
+    @app.teardown_request
+    def stop_profiler(exc=None):
+        state = g.pop('request_profiler', None)
+        if state is None:
+            return
+        profiler, start = state
+        profiler.stop()
+        try:
+            path = _output_path(app, mode)
+            profiler.write(path)
+        except OSError:
+            current_app.logger.exception('Failed to write request profile')
+            return
+        current_app.logger.info(
+            'Request profile written to %s (%s %s, %.1f ms)', path, request.method, request.path,
+            (time.perf_counter() - start) * 1000
+        )
@@ -0,0 +1,48 @@
+"""
+模板编译缓存和预热
+"""
+import os
+import time
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+
+def init_template_cache(app):
+    """
+    为Jinja环境配置文件系统字节码缓存
+
+    缓存以模板源码校验和区分版本，部署后模板变化会自动重新编译；
+    多个worker共享同一目录，只有第一个worker需要真正编译。
+    """
+    if not app.config.get('TEMPLATE_BYTECODE_CACHE', True):
+        return None
+
+    directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # directory为None时使用Jinja默认的用户私有临时目录
+    cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.bytecode_cache = cache
+    return cache
+
+
+def precompile_templates(app):
+    """
+    预编译app/templates下的全部模板并放入环境缓存
+
+    在worker启动时执行，避免部署或重载后的首个请求承担编译耗时。
+
+    Returns:
+        tuple: (编译的模板数量, 耗时毫秒)
+    """
+    env = app.jinja_env
+    start = time.perf_counter()
+    count = 0
+    for name in env.list_templates(filter_func=lambda name: name.endswith('.html')):
+        try:
+            env.get_template(name)
+            count += 1
+        except TemplateSyntaxError as e:
+            app.logger.warning('模板预编译失败 %s: %s', name, e)
+    elapsed = (time.perf_counter() - start) * 1000
+    app.logger.info('预编译模板 %d 个，耗时 %.1f ms', count, elapsed)
+    return count, elapsed
@@ -0,0 +1,293 @@
+"""
+轻量级请求追踪
+
+每个请求是一条trace，根span为Flask请求；MemoService方法、@cached查找、
+模板渲染和每条SQL语句是其中的子span。当前span通过contextvars传递，
+完成的trace保存在内存环形缓冲区中（/health/traces 查看），
+也可以按行追加到JSON文件（TRACING_FILE）。
+
+未启用（TRACING_ENABLED=False）时不注册钩子，span()/traced 只做一次布尔判断。
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+
+# 当前span（请求之外为None，此时不记录任何span）
+_current_span = ContextVar('memo_current_span', default=None)
+
+_ids = itertools.count(1)
+
+
+class Span:
+    """一个计时区间"""
+
+    __slots__ = ('name', 'trace', 'span_id', 'parent', 'start', 'end', 'attributes')
+
+    def __init__(self, name, trace, parent, attributes):
+        self.name = name
+        self.trace = trace
+        self.span_id = next(_ids)
+        self.parent = parent
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration_ms(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self):
+        return {
+            'id': self.span_id,
+            'parent': self.parent.span_id if self.parent is not None else None,
+            'name': self.name,
+            'offset_ms': round((self.start - self.trace.root.start) * 1000, 3),
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+        }
+
+
+class Trace:
+    """一个请求内的全部span"""
+
+    __slots__ = ('trace_id', 'started_at', 'root', 'spans', 'dropped')
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.started_at = time.time()
+        self.root = None
+        self.spans = []
+        self.dropped = 0  # 超出TRACING_MAX_SPANS未记录的span数
+
+    def summary(self):
+        """按span名称汇总次数和耗时（根span除外）"""
+        totals = {}
+        for item in self.spans:
+            if item is self.root:
+                continue
+            entry = totals.setdefault(item.name, {'count': 0, 'total_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += item.duration_ms
+        for entry in totals.values():
+            entry['total_ms'] = round(entry['total_ms'], 3)
+        return totals
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'name': self.root.name,
+            'started_at': self.started_at,
+            'duration_ms': round(self.root.duration_ms, 3),
+            'attributes': self.root.attributes,
+            'summary': self.summary(),
+            'spans': [item.to_dict() for item in self.spans],
+            'dropped_spans': self.dropped,
+        }
+
+
+class Tracer:
+    """追踪器：保存最近完成的trace"""
+
+    def __init__(self, buffer_size=200, max_spans=1000):
+        self.enabled = False
+        self.max_spans = max_spans
+        self.traces = deque(maxlen=buffer_size)
+        self.export_path = None
+        self._file_lock = threading.Lock()
+
+    def configure(self, enabled, buffer_size=200, max_spans=1000, export_path=None):
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self.traces = deque(maxlen=buffer_size)
+        self.export_path = export_path
+
+    def start_trace(self, name, trace_id=None, **attributes):
+        """开始一条trace，返回根span"""
+        trace = Trace(trace_id or f'{next(_ids):x}')
+        root = trace.root = Span(name, trace, None, attributes)
+        trace.spans.append(root)
+        _current_span.set(root)
+        return root
+
+    def start_span(self, name, **attributes):
+        """在当前span下开始子span；不在trace中时返回None"""
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        trace = parent.trace
+        if len(trace.spans) >= self.max_spans:
+            trace.dropped += 1
+            return None
+        child = Span(name, trace, parent, attributes)
+        trace.spans.append(child)
+        _current_span.set(child)
+        return child
+
+    def finish(self, finished):
+        """结束span；当前span恢复为其父span（未正常结束的子span不影响恢复）"""
+        if finished is None:
+            return
+        finished.end = time.perf_counter()
+        _current_span.set(finished.parent)
+        if finished.parent is None:
+            self._export(finished.trace)
+
+    def _export(self, trace):
+        self.traces.append(trace)
+        if self.export_path:
+            line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+            with self._file_lock:
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+
+    def recent(self, limit=20, name=None):
+        """最近完成的trace（新的在前），可按根span名称（端点）过滤"""
+        result = []
+        for trace in reversed(self.traces):
+            if name is None or trace.root.name == name:
+                result.append(trace)
+                if len(result) >= limit:
+                    break
+        return result
+
+
+tracer = Tracer()
+
+
+class span:
+    """
+    span上下文管理器
+
+        with span('render', template='memo/list.html'):
+            ...
+    """
+
+    __slots__ = ('name', 'attributes', '_span')
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self._span = None
+
+    def __enter__(self):
+        if tracer.enabled:
+            self._span = tracer.start_span(self.name, **self.attributes)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            if exc_type is not None:
+                self._span.attributes['error'] = exc_type.__name__
+            tracer.finish(self._span)
+        return False
+
+
+def traced(name=None):
+    """为函数记录span，名称默认为限定名（如 MemoService.get_memo_by_id）"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    """当前span（不在trace中时为None）"""
+    return _current_span.get()
+
+
+def instrument_engine(engine):
+    """为每条SQL语句记录span"""
+    from sqlalchemy import event
+
+    if getattr(engine, '_memo_tracing', False):
+        return
+    engine._memo_tracing = True
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_statement(conn, cursor, statement, parameters, context, executemany):
+        if tracer.enabled:
+            conn.info.setdefault('_tracing_spans', []).append(
+                tracer.start_span('sql', statement=statement[:200])
+            )
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _end_statement(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get('_tracing_spans')
+        if spans:
+            tracer.finish(spans.pop())
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed_statement(context):
+        spans = context.connection.info.get('_tracing_spans') if context.connection is not None else None
+        if spans:
+            failed = spans.pop()
+            if failed is not None:
+                failed.attributes['error'] = type(context.original_exception).__name__
+            tracer.finish(failed)
+
+
+def init_tracing(app):
+    """按配置启用追踪并注册请求、模板渲染和SQL的span"""
+    enabled = app.config.get('TRACING_ENABLED', False)
+    export_path = app.config.get('TRACING_FILE')
+    if export_path:
+        os.makedirs(os.path.dirname(os.path.abspath(export_path)), exist_ok=True)
+    tracer.configure(
+        enabled,
+        buffer_size=app.config.get('TRACING_BUFFER_SIZE', 200),
+        max_spans=app.config.get('TRACING_MAX_SPANS', 1000),
+        export_path=export_path
+    )
+    if not enabled:
+        return
+
+    from flask import before_render_template, g, request, template_rendered
+
+    with app.app_context():
+        from app import db
+        instrument_engine(db.engine)
+
+    @app.before_request
+    def start_request_trace():
+        endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+        g.trace_span = tracer.start_trace(
+            endpoint, trace_id=g.get('request_id'), method=request.method, path=request.path
+        )
+
+    # teardown在流式响应结束后才执行，trace包含整个响应生成过程
+    @app.teardown_request
+    def finish_request_trace(exc=None):
+        root = g.pop('trace_span', None)
+        if root is None:
+            return
+        user = g.get('_login_user')
+        if user is not None and user.is_authenticated:
+            root.attributes['user_id'] = user.get_id()
+        if exc is not None:
+            root.attributes['error'] = type(exc).__name__
+        tracer.finish(root)
+
+    def _start_render(sender, template, context, **extra):
+        tracer.start_span('render', template=template.name)
+
+    def _end_render(sender, template, context, **extra):
+        current = _current_span.get()
+        if current is not None and current.name == 'render':
+            tracer.finish(current)
+
+    # 处理函数是局部函数，需要强引用
+    before_render_template.connect(_start_render, app, weak=False)
+    template_rendered.connect(_end_render, app, weak=False)
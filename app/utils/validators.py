@@ -1,4 +1,179 @@
 """
 数据验证工具
 """
+import re
+from html.parser import HTMLParser
 
+# 标题允许字母、数字、中文字符、空格和基本标点符号
+TITLE_PATTERN = re.compile(r'^[\w\s\u4e00-\u9fff.,!?-]+$')
+
+# 拒绝模式下禁止出现的标签
+DANGEROUS_TAGS = ('script', 'iframe', 'object', 'embed', 'form', 'input', 'button')
+
+# 白名单模式下允许的标签和属性（'*' 表示所有标签通用的属性）
+ALLOWED_TAGS = frozenset([
+    'a', 'b', 'blockquote', 'br', 'code', 'del', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'i', 'li', 'ol', 'p', 'pre', 's', 'span', 'strong', 'sub', 'sup', 'u', 'ul',
+])
+ALLOWED_ATTRIBUTES = {
+    '*': frozenset(['title']),
+    'a': frozenset(['href']),
+}
+# URL属性只允许的协议（不带协议的相对地址也允许）
+ALLOWED_URL_SCHEMES = frozenset(['http', 'https', 'mailto'])
+URL_ATTRIBUTES = frozenset(['href', 'src'])
+
+_SCHEME_PATTERN = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.\-]*):')
+# 检查协议前去掉控制字符和空白（浏览器会忽略 "java\tscript:" 中的制表符等）
+_URL_IGNORED = re.compile(r'[\x00-\x20]+')
+
+
+def _char_class(chars):
+    """字符集（大小写都包含），如 ['s', 'i'] -> '[IiSs]'"""
+    chars = {c.lower() for c in chars} | {c.upper() for c in chars}
+    return '[' + ''.join(re.escape(c) for c in sorted(chars)) + ']'
+
+
+def _compile_tag_pattern(tags):
+    """
+    编译拒绝模式的正则：与原先 '<tag' 子串查找一致，标签名前缀匹配、不区分大小写
+
+    先用标签名前两个字符的字符集做前瞻过滤，普通HTML中的 <p>、<b> 等
+    在第二个字符处就失败，不会逐个尝试候选标签。
+    """
+    depth = min(2, min(len(tag) for tag in tags))
+    lookahead = ''.join(_char_class([tag[i] for tag in tags]) for i in range(depth))
+    return re.compile(
+        '<(?=' + lookahead + ')(' + '|'.join(re.escape(tag) for tag in tags) + ')',
+        re.IGNORECASE | re.ASCII
+    )
+
+
+def is_valid_title(title):
+    """标题是否只包含允许的字符"""
+    return TITLE_PATTERN.match(title) is not None
+
+
+class _DenyScanner:
+    """拒绝模式的增量扫描器：保留上一块末尾，跨块边界的标签也能识别"""
+
+    def __init__(self, pattern, overlap):
+        self.pattern = pattern
+        self.overlap = overlap
+        self.tail = ''
+        self.violation = None
+
+    def feed(self, chunk):
+        if self.violation is None:
+            text = self.tail + chunk
+            match = self.pattern.search(text)
+            if match:
+                self.violation = match.group(1).lower()
+            self.tail = text[-self.overlap:]
+        return self.violation
+
+    def close(self):
+        return self.violation
+
+
+class _AllowListScanner(HTMLParser):
+    """
+    白名单模式的增量扫描器：按HTML语法解析，遇到第一个不允许的标签或属性即记录；
+    同时进行拒绝模式扫描，未闭合的危险标签（如结尾的 "<script"）也会被拒绝
+    """
+
+    def __init__(self, sanitizer):
+        super().__init__(convert_charrefs=True)
+        self.sanitizer = sanitizer
+        self.deny = _DenyScanner(sanitizer.pattern, sanitizer.overlap)
+        self.violation = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.violation is None:
+            self.violation = self.sanitizer.check_tag(tag, attrs)
+
+    handle_startendtag = handle_starttag
+
+    def handle_endtag(self, tag):
+        if self.violation is None and tag not in self.sanitizer.allowed_tags:
+            self.violation = tag
+
+    def feed(self, chunk):
+        if self.violation is None:
+            self.violation = self.deny.feed(chunk)
+        if self.violation is None:
+            super().feed(chunk)
+        return self.violation
+
+    def close(self):
+        if self.violation is None:
+            super().close()
+        return self.violation
+
+
+class ContentSanitizer:
+    """
+    HTML内容安全检查
+
+    - deny 模式：一个预编译正则单次扫描，拒绝 DANGEROUS_TAGS 中的标签
+    - allow 模式：按HTML语法解析，只允许白名单中的标签和属性，
+      事件处理属性（on*）和 javascript: 等协议的URL一律拒绝
+
+    检查方法返回第一个不安全的标签或属性名，安全时返回None；
+    scanner() 返回增量扫描器，可以按块 feed() 大文本（如批量导入）。
+    """
+
+    def __init__(self, mode='deny', denied_tags=DANGEROUS_TAGS, allowed_tags=ALLOWED_TAGS,
+                 allowed_attributes=None, allowed_schemes=ALLOWED_URL_SCHEMES):
+        if mode not in ('deny', 'allow'):
+            raise ValueError(f'未知的检查模式: {mode}')
+        self.mode = mode
+        self.pattern = _compile_tag_pattern(denied_tags)
+        self.overlap = max(len(tag) for tag in denied_tags)
+        self.allowed_tags = frozenset(allowed_tags)
+        self.allowed_attributes = allowed_attributes if allowed_attributes is not None else ALLOWED_ATTRIBUTES
+        self.allowed_schemes = frozenset(allowed_schemes)
+
+    def find_unsafe(self, text):
+        """返回第一个不安全的标签或属性名，内容安全时返回None"""
+        if self.mode == 'deny':
+            match = self.pattern.search(text)
+            return match.group(1).lower() if match else None
+        scanner = self.scanner()
+        scanner.feed(text)
+        return scanner.close()
+
+    def is_safe(self, text):
+        return self.find_unsafe(text) is None
+
+    def scanner(self):
+        """创建增量扫描器（feed(chunk) / close() 返回第一个违规项或None）"""
+        if self.mode == 'deny':
+            return _DenyScanner(self.pattern, self.overlap)
+        return _AllowListScanner(self)
+
+    def check_tag(self, tag, attrs):
+        """白名单模式下检查单个开始标签，返回违规的标签/属性名或None"""
+        if tag not in self.allowed_tags:
+            return tag
+        common = self.allowed_attributes.get('*', ())
+        specific = self.allowed_attributes.get(tag, ())
+        for name, value in attrs:
+            if name not in common and name not in specific:
+                return name
+            if name in URL_ATTRIBUTES and value:
+                match = _SCHEME_PATTERN.match(_URL_IGNORED.sub('', value))
+                if match and match.group(1).lower() not in self.allowed_schemes:
+                    return name
+        return None
+
+
+_sanitizers = {}
+
+
+def get_content_sanitizer(mode='deny'):
+    """按模式返回共享的ContentSanitizer实例（正则只编译一次）"""
+    sanitizer = _sanitizers.get(mode)
+    if sanitizer is None:
+        sanitizer = _sanitizers[mode] = ContentSanitizer(mode)
+    return sanitizer
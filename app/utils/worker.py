@@ -0,0 +1,59 @@
+"""
+多进程部署（gunicorn preload）的fork钩子
+
+主进程加载应用后fork出worker：before_fork在主进程中释放数据库连接并冻结gc，
+worker继承的对象不会因gc遍历而写入，内存页保持共享（copy-on-write）；
+after_fork在worker中丢弃继承的连接、重建日志线程、清空主进程产生的指标并启动后台线程。
+before_start和after_worker_exit在主进程中维护多进程指标目录（METRICS_DIR）。
+"""
+import gc
+
+
+def _engines(app):
+    from app import db
+    with app.app_context():
+        return list(db.engines.values())
+
+
+def before_start(app):
+    """主进程启动时调用：清空上次运行留下的指标快照"""
+    store = app.extensions.get('metrics_store')
+    if store is not None:
+        store.clear()
+
+
+def after_worker_exit(app, pid):
+    """worker退出后在主进程中调用：把它的指标快照合并进合计文件"""
+    store = app.extensions.get('metrics_store')
+    if store is not None:
+        store.mark_process_dead(pid)
+
+
+def before_fork(app):
+    """在主进程fork前调用"""
+    # 主进程不处理请求，关闭启动时（如建表）打开的连接，避免socket被多个进程共享
+    for engine in _engines(app):
+        engine.dispose()
+    # 把已有对象移入永久代，之后的gc不再遍历它们
+    gc.freeze()
+
+
+def after_fork(app):
+    """在worker进程启动时调用"""
+    from app.services.health_sampler import get_sampler
+    from app.utils.logging_config import restart_listener
+    from app.utils.metrics import registry
+
+    # close=False：不关闭连接（它们的socket仍属于主进程），只让本进程的连接池不再使用
+    for engine in _engines(app):
+        engine.dispose(close=False)
+
+    restart_listener()
+    # 主进程启动时的计数会被每个worker各复制一份
+    registry.reset()
+
+    if app.config.get('HEALTH_SAMPLER_ENABLED', True):
+        get_sampler(app).start()
+    if app.config.get('SSE_RELAY_ENABLED', True):
+        from app.services.memo_events import ensure_relay
+        ensure_relay(app)
@@ -0,0 +1,11 @@
+"""
+备忘录网站 - ASGI入口文件
+
+uvicorn asgi:application
+"""
+from app.asgi import create_asgi_app
+import os
+
+# 从环境变量获取配置名称，默认为development
+config_name = os.environ.get('FLASK_ENV', 'development')
+application = create_asgi_app(config_name)
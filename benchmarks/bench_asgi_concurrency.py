@@ -0,0 +1,176 @@
+"""
+WSGI vs ASGI 长连接并发基准
+
+在同一进程内分别启动线程化WSGI服务器（werkzeug）和ASGI服务器（uvicorn），
+对 /api/memos/stream 建立N个并发SSE连接并保持，统计：
+- 每个连接占用的线程数
+- 保持连接时的内存增量
+- 保持连接期间 /health/ 请求的延迟
+
+用法：
+    python benchmarks/bench_asgi_concurrency.py --connections 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def build_app(db_path):
+    """创建使用临时数据库的应用和一个已登录会话cookie"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    from app import create_app, db
+    from app.models.user import User
+
+    app = create_app('development')
+    app.config['SSE_MAX_STREAM_SECONDS'] = 3600
+    app.config['SSE_RELAY_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        user = User(oauth_provider='github', oauth_user_id='bench', username='bench')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    cookie = app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(user_id)})
+    return app, f'session={cookie}'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def open_stream(port, cookie):
+    """建立一个SSE连接，读到首个数据块后返回socket（保持打开）"""
+    sock = socket.create_connection(('127.0.0.1', port), timeout=30)
+    request = (
+        'GET /api/memos/stream HTTP/1.1\r\n'
+        'Host: 127.0.0.1\r\n'
+        f'Cookie: {cookie}\r\n'
+        'Accept: text/event-stream\r\n\r\n'
+    )
+    sock.sendall(request.encode('latin-1'))
+    data = b''
+    while b'retry:' not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise RuntimeError('stream closed before first event')
+        data += chunk
+    return sock
+
+
+def timed_health(port, samples=20):
+    """保持连接期间测量 /health/ 延迟（毫秒）"""
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        with socket.create_connection(('127.0.0.1', port), timeout=30) as sock:
+            sock.sendall(b'GET /health/ HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n')
+            while sock.recv(4096):
+                pass
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'p50_ms': round(latencies[len(latencies) // 2], 2),
+        'max_ms': round(latencies[-1], 2),
+    }
+
+
+def measure(port, cookie, connections):
+    """建立连接并采集线程和内存数据"""
+    import psutil
+    process = psutil.Process()
+    base_threads = threading.active_count()
+    base_rss = process.memory_info().rss
+
+    sockets = [open_stream(port, cookie) for _ in range(connections)]
+    time.sleep(0.5)
+    held_threads = threading.active_count() - base_threads
+    rss_delta = process.memory_info().rss - base_rss
+    health = timed_health(port)
+
+    for sock in sockets:
+        sock.close()
+
+    return {
+        'connections': connections,
+        'threads_held': held_threads,
+        'threads_per_connection': round(held_threads / connections, 3),
+        'rss_delta_mb': round(rss_delta / 1024 / 1024, 2),
+        'rss_per_connection_kb': round(rss_delta / 1024 / connections, 1),
+        'health_latency': health,
+    }
+
+
+def run_wsgi(app, cookie, connections):
+    """线程化WSGI服务器：每个连接占用一个线程"""
+    from werkzeug.serving import make_server
+    port = free_port()
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        return measure(port, cookie, connections)
+    finally:
+        server.shutdown()
+
+
+def run_asgi(app, cookie, connections):
+    """ASGI服务器：连接在单个事件循环中等待"""
+    import uvicorn
+    from app.asgi import AsgiApplication
+
+    port = free_port()
+    config = uvicorn.Config(AsgiApplication(app), host='127.0.0.1', port=port,
+                            log_level='warning', lifespan='on')
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=lambda: asyncio.run(server.serve()), daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        return measure(port, cookie, connections)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both')
+    parser.add_argument('--json', dest='json_path', help='结果写入JSON文件')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, cookie = build_app(os.path.join(tmp, 'bench.db'))
+        results = {}
+        if args.mode in ('wsgi', 'both'):
+            results['wsgi'] = run_wsgi(app, cookie, args.connections)
+        if args.mode in ('asgi', 'both'):
+            results['asgi'] = run_asgi(app, cookie, args.connections)
+
+    for mode, result in results.items():
+        print(f"[{mode}] {result['connections']} streams: "
+              f"{result['threads_held']} threads held "
+              f"({result['threads_per_connection']}/conn), "
+              f"RSS +{result['rss_delta_mb']} MB "
+              f"({result['rss_per_connection_kb']} KB/conn), "
+              f"/health/ p50 {result['health_latency']['p50_ms']} ms")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
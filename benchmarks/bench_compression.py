@@ -0,0 +1,72 @@
+"""
+响应压缩收益和CPU开销测量
+
+- memo.list 页面（10条备忘录）在不同压缩级别下的字节数和压缩耗时
+- app/static 下静态文件的预压缩收益（请求时零CPU）
+
+用法：
+    python benchmarks/bench_compression.py
+"""
+import gzip
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def render_list_page():
+    """渲染一页备忘录列表，返回HTML字节"""
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    from app import create_app, db
+    from app.models.memo import Memo
+    from app.models.user import User
+
+    app = create_app('testing')
+    app.config['COMPRESS_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        user = User(oauth_provider='github', oauth_user_id='bench', username='bench')
+        db.session.add(user)
+        db.session.commit()
+        for i in range(10):
+            db.session.add(Memo(title=f'Memo {i}', content='Lorem ipsum dolor sit amet. ' * 20,
+                                user_id=user.id))
+        db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+            sess['_fresh'] = True
+        return client.get('/memo/').data
+
+
+def measure(name, data, levels=(1, 6, 9), rounds=200):
+    """测量不同压缩级别的输出大小和单次压缩耗时"""
+    print(f'{name}: {len(data)} bytes')
+    for level in levels:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            compressed = gzip.compress(data, compresslevel=level)
+        elapsed = (time.perf_counter() - start) / rounds * 1e6
+        saved = 1 - len(compressed) / len(data)
+        print(f'  level {level}: {len(compressed)} bytes ({saved:.0%} saved), {elapsed:.0f} us CPU per response')
+
+
+def main():
+    measure('memo.list (10 memos)', render_list_page())
+
+    static_folder = os.path.join(ROOT, 'app', 'static')
+    for root, _, files in os.walk(static_folder):
+        for name in sorted(files):
+            if name.endswith('.gz'):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                measure(os.path.relpath(path, static_folder), f.read(), levels=(6, 9))
+    print('static files: precompressed with `flask compress-static`, 0 us CPU per request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+备忘录卡片片段缓存基准
+
+渲染包含100条备忘录的 memo/list.html，比较：
+- 未启用片段缓存（每张卡片完整渲染）
+- 启用缓存、缓存冷启动
+- 启用缓存、缓存命中（主要是字符串拼接和CSRF占位符替换）
+
+用法：
+    python benchmarks/bench_fragment_cache.py
+"""
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main(items=100, rounds=20):
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    from flask import render_template
+    from flask_login import login_user
+    from app import create_app, db
+    from app.models.memo import Memo, MemoStatus
+    from app.models.user import User
+    from app.utils.fragment_cache import card_cache
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user = User(oauth_provider='github', oauth_user_id='bench', username='bench')
+        db.session.add(user)
+        db.session.commit()
+        statuses = MemoStatus.get_all_statuses()
+        for i in range(items):
+            db.session.add(Memo(title=f'Memo {i}', content='Lorem ipsum dolor sit amet. ' * 20,
+                                status=statuses[i % len(statuses)], user_id=user.id))
+        db.session.commit()
+
+        def render_page():
+            with app.test_request_context('/memo/'):
+                login_user(user)
+                pagination = Memo.get_user_memos(user.id, page=1, per_page=items)
+                start = time.perf_counter()
+                render_template('memo/list.html', memos=pagination.items,
+                                pagination=pagination, MemoStatus=MemoStatus)
+                return (time.perf_counter() - start) * 1000
+
+        def run(label, cache_size, clear_each_round=False):
+            app.config['MEMO_CARD_CACHE_SIZE'] = cache_size
+            card_cache.max_entries = cache_size
+            card_cache.clear()
+            render_page()  # 预热模板编译
+            timings = []
+            for _ in range(rounds):
+                if clear_each_round:
+                    card_cache.clear()
+                timings.append(render_page())
+            print(f'{label:<28} median {statistics.median(timings):7.2f} ms  '
+                  f'min {min(timings):7.2f} ms')
+
+        print(f'memo/list.html with {items} memos, {rounds} rounds')
+        run('no fragment cache', 0)
+        run('fragment cache (cold)', 2000, clear_each_round=True)
+        run('fragment cache (warm)', 2000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+语言选择和翻译的每请求开销
+
+- 语言选择器单次调用耗时（按请求头协商）
+- 完整请求耗时：GET /memo/create（表单标签全部经过翻译）和 GET /memo/
+- 每个请求写到stdout的字节数
+
+用法：
+    python benchmarks/bench_locale.py
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ACCEPT_LANGUAGE = 'en-US,en;q=0.9,zh-CN;q=0.8,zh;q=0.7'
+
+
+def main(rounds=300):
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    import logging
+    logging.disable(logging.CRITICAL)
+    from flask_babel import get_babel
+    from app import create_app, db
+    from app.models.memo import Memo
+    from app.models.user import User
+
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        app = create_app('testing')
+    app.config['COMPRESS_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+        user = User(oauth_provider='github', oauth_user_id='bench', username='bench')
+        db.session.add(user)
+        db.session.commit()
+        for i in range(10):
+            db.session.add(Memo(title=f'Memo {i}', content='content', user_id=user.id))
+        db.session.commit()
+        user_id = user.id
+
+    selector = get_babel(app).locale_selector
+    with app.test_request_context(headers={'Accept-Language': ACCEPT_LANGUAGE}):
+        with contextlib.redirect_stdout(io.StringIO()):
+            selector()
+            start = time.perf_counter()
+            for _ in range(rounds * 10):
+                selector()
+            elapsed = (time.perf_counter() - start) / (rounds * 10) * 1e6
+    print(f'locale selector: {elapsed:.2f} us per call')
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+    for path in ('/memo/create', '/memo/'):
+        stdout = io.StringIO()
+        timings = []
+        with contextlib.redirect_stdout(stdout):
+            client.get(path, headers={'Accept-Language': ACCEPT_LANGUAGE})
+            stdout.seek(0)
+            stdout.truncate()
+            for _ in range(rounds):
+                start = time.perf_counter()
+                client.get(path, headers={'Accept-Language': ACCEPT_LANGUAGE})
+                timings.append((time.perf_counter() - start) * 1000)
+        print(f'GET {path:<13} median {statistics.median(timings):.3f} ms, '
+              f'{len(stdout.getvalue()) / rounds:.0f} bytes of stdout per request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+冷启动耗时（导入 app + create_app）
+
+每轮在新的子进程中测量导入和 create_app 的耗时，取中位数与目标预算比较；
+另用 `python -X importtime` 运行一次，列出耗时最多的导入（顶层及其直接导入的模块）。
+启动后不应加载只在特定请求中使用的重量级依赖（LAZY_MODULES），加载了也视为失败。
+
+用法：
+    python benchmarks/bench_startup.py                      # production配置，预算650ms
+    python benchmarks/bench_startup.py --config development --budget-ms 400 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 应在首次使用时才导入的模块（OAuth登录、进程指标、Markdown渲染、数据库迁移命令）
+LAZY_MODULES = ('authlib', 'requests', 'psutil', 'markdown_it', 'alembic')
+
+SNIPPET = '''
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (done - imported) * 1000,
+    'loaded': [name for name in sys.argv[2].split(',') if name in sys.modules],
+}))
+'''
+
+
+def run_once(config_name, env, importtime=False):
+    """在新进程中启动一次，返回 (测量结果, importtime输出)"""
+    args = [sys.executable]
+    if importtime:
+        args += ['-X', 'importtime']
+    args += ['-c', SNIPPET, config_name, ','.join(LAZY_MODULES)]
+    result = subprocess.run(args, capture_output=True, text=True, cwd=ROOT, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def parse_importtime(stderr, max_depth=1):
+    """解析 -X importtime 输出，返回 [(模块, 嵌套深度, 累计毫秒)]（只保留顶层和其直接导入的模块）"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # 每层嵌套缩进两个空格
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= max_depth:
+            modules.append((name.strip(), depth, int(cumulative) / 1000))
+    return modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure cold start time of the app')
+    parser.add_argument('--config', default='production', help='create_app使用的配置名')
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=650.0,
+                        help='导入 + create_app 的中位耗时预算（毫秒），超过时退出码为1')
+    parser.add_argument('--top', type=int, default=10, help='列出耗时最多的N个导入')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='memo-startup-')
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'bench-secret')
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    env['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "startup.db")}'
+
+    results = [run_once(args.config, env)[0] for _ in range(args.rounds)]
+    import_ms = statistics.median(r['import_ms'] for r in results)
+    create_ms = statistics.median(r['create_app_ms'] for r in results)
+    total_ms = statistics.median(r['import_ms'] + r['create_app_ms'] for r in results)
+
+    _, stderr = run_once(args.config, env, importtime=True)
+    modules = sorted(parse_importtime(stderr), key=lambda item: item[2], reverse=True)
+
+    print(f'config {args.config}, median of {args.rounds} fresh processes')
+    print(f'  import app      {import_ms:8.1f} ms')
+    print(f'  create_app      {create_ms:8.1f} ms')
+    print(f'  total           {total_ms:8.1f} ms  (budget {args.budget_ms:.0f} ms)')
+    print(f'\nslowest imports (-X importtime, cumulative; depth 1 = imported by a top-level module):')
+    for name, depth, ms in modules[:args.top]:
+        print(f'  {name:<40} depth {depth}  {ms:8.1f} ms')
+
+    failed = False
+    loaded = sorted({name for r in results for name in r['loaded']})
+    if loaded:
+        print(f'\nFAIL: loaded at startup but should be imported lazily: {", ".join(loaded)}')
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f'\nFAIL: startup {total_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms')
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
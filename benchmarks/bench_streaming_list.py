@@ -0,0 +1,68 @@
+"""
+备忘录列表流式渲染首字节时间基准
+
+对不同的per_page，比较一次性渲染与流式渲染的首字节时间（TTFB）和总耗时。
+
+用法：
+    python benchmarks/bench_streaming_list.py
+"""
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main(total=500, rounds=10):
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    from app import create_app, db
+    from app.models.memo import Memo
+    from app.models.user import User
+
+    app = create_app('testing')
+    app.config['COMPRESS_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        user = User(oauth_provider='github', oauth_user_id='bench', username='bench')
+        db.session.add(user)
+        db.session.commit()
+        for i in range(total):
+            db.session.add(Memo(title=f'Memo {i}', content='Lorem ipsum dolor sit amet. ' * 20,
+                                user_id=user.id))
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+    def measure(per_page, streaming):
+        app.config['MEMO_LIST_STREAMING'] = streaming
+        first, full = [], []
+        for _ in range(rounds + 1):
+            start = time.perf_counter()
+            response = client.get(f'/memo/?per_page={per_page}', buffered=False)
+            chunks = iter(response.response)
+            next(chunks)
+            ttfb = time.perf_counter() - start
+            for _ in chunks:
+                pass
+            response.close()
+            first.append(ttfb * 1000)
+            full.append((time.perf_counter() - start) * 1000)
+        # 第一轮为模板预热
+        return statistics.median(first[1:]), statistics.median(full[1:])
+
+    print(f'memo.list, {rounds} rounds (median ms)')
+    print(f'{"per_page":>8}  {"buffered ttfb":>13}  {"stream ttfb":>11}  {"stream total":>12}')
+    for per_page in (10, 100, total):
+        buffered_ttfb, _ = measure(per_page, False)
+        stream_ttfb, stream_total = measure(per_page, True)
+        print(f'{per_page:>8}  {buffered_ttfb:>13.2f}  {stream_ttfb:>11.2f}  {stream_total:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+模板预编译和字节码缓存：启动耗时与首个请求延迟
+
+每种配置在独立子进程中运行（模拟新worker），测量：
+- create_app 耗时
+- 首个请求（已登录的 /memo/，渲染base.html + memo/list.html + memo/_card.html）延迟
+- 第二个请求延迟（模板已编译，作为基线）
+
+用法：
+    python benchmarks/bench_template_warmup.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def worker(precompile, bytecode_cache, cache_dir):
+    """在当前进程中创建应用并测量，结果以JSON输出"""
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    import logging
+    logging.disable(logging.CRITICAL)
+    import app as app_module
+    from config import TestingConfig
+
+    TestingConfig.TEMPLATE_PRECOMPILE = precompile
+    TestingConfig.TEMPLATE_BYTECODE_CACHE = bytecode_cache
+    TestingConfig.TEMPLATE_BYTECODE_CACHE_DIR = cache_dir
+
+    start = time.perf_counter()
+    application = app_module.create_app('testing')
+    startup = (time.perf_counter() - start) * 1000
+
+    from app import db
+    from app.models.memo import Memo
+    from app.models.user import User
+    with application.app_context():
+        db.create_all()
+        user = User(oauth_provider='github', oauth_user_id='bench', username='bench')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Memo(title='Memo', content='content', user_id=user.id))
+        db.session.commit()
+        user_id = user.id
+
+    client = application.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        client.get('/memo/')
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'startup': startup, 'first': timings[0], 'second': timings[1]}
+
+
+def run(label, precompile, bytecode_cache, cache_dir, rounds=5):
+    results = []
+    for _ in range(rounds):
+        output = subprocess.run(
+            [sys.executable, __file__, '--worker', json.dumps([precompile, bytecode_cache, cache_dir])],
+            capture_output=True, text=True, check=True, cwd=ROOT
+        ).stdout.strip().splitlines()[-1]
+        results.append(json.loads(output))
+    median = {key: statistics.median(r[key] for r in results) for key in results[0]}
+    print(f'{label:<34} startup {median["startup"]:7.1f} ms  '
+          f'first request {median["first"]:6.1f} ms  second {median["second"]:5.1f} ms')
+
+
+def main():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print('median of 5 fresh processes')
+        run('no precompile, no bytecode cache', False, False, None)
+        run('precompile, no bytecode cache', True, False, None)
+        # 第一次运行填充缓存目录，之后的运行都从字节码加载
+        worker_args = [sys.executable, __file__, '--worker', json.dumps([True, True, cache_dir])]
+        subprocess.run(worker_args, capture_output=True, check=True, cwd=ROOT)
+        run('precompile, warm bytecode cache', True, True, cache_dir)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--worker':
+        result = worker(*json.loads(sys.argv[2]))
+        print(json.dumps(result))
+    else:
+        main()
@@ -0,0 +1,285 @@
+"""
+本地压测
+
+默认在进程内驱动WSGI应用：使用临时SQLite文件，按 --users/--memos 生成合成数据，
+每个并发线程以测试登录（TEST_AUTH_ENABLED）随机登录一个用户，然后按权重执行
+列表、创建、编辑、状态变更和健康检查请求，最后输出吞吐量和各操作的p50/p95/p99延迟。
+
+也可以用 --url 压测已运行的服务（服务需设置 TEST_AUTH_ENABLED=true，
+数据由 flask seed-data 预先生成，--user-ids 指定可登录的用户ID范围）。
+
+用法：
+    python benchmarks/load_test.py --users 50 --memos 200 --concurrency 8 --duration 20
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --user-ids 1-100 --duration 30
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 操作及权重
+ACTIONS = {
+    'list': 40,
+    'create': 15,
+    'edit': 20,
+    'status': 10,
+    'health': 15,
+}
+
+_CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+_MEMO_ID_PATTERN = re.compile(r'/memo/(\d+)/edit')
+
+
+class InProcessClient:
+    """进程内客户端（Werkzeug测试客户端，不跟随重定向）"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        body = response.get_data(as_text=True)
+        return response.status_code, body
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    """HTTP客户端（保持cookie，不跟随重定向）"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                return response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode('utf-8', 'replace')
+
+
+class VirtualUser:
+    """一个并发线程：登录后循环执行加权随机操作"""
+
+    def __init__(self, client, user_id, rng):
+        self.client = client
+        self.user_id = user_id
+        self.rng = rng
+        self.csrf_token = None
+        self.memo_ids = []
+
+    def timed(self, action, method, path, data=None):
+        start = time.perf_counter()
+        status, body = self.client.request(method, path, data)
+        return action, time.perf_counter() - start, status, body
+
+    def login(self):
+        self.client.request('GET', f'/auth/test-login/{self.user_id}')
+        status, body = self.client.request('GET', '/memo/create')
+        match = _CSRF_PATTERN.search(body)
+        if status != 200 or not match:
+            raise RuntimeError(f'test login failed for user {self.user_id} (status {status}); '
+                               f'is TEST_AUTH_ENABLED set?')
+        self.csrf_token = match.group(1)
+        self._remember_ids(self.client.request('GET', '/memo/?per_page=50')[1])
+
+    def _remember_ids(self, body):
+        ids = _MEMO_ID_PATTERN.findall(body)
+        if ids:
+            self.memo_ids = sorted(set(int(i) for i in ids))
+
+    def step(self):
+        action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        if action in ('edit', 'status') and not self.memo_ids:
+            action = 'create'
+
+        if action == 'list':
+            page = self.rng.choice((1, 1, 1, 2, 3))
+            result = self.timed(action, 'GET', f'/memo/?page={page}')
+            if page == 1 and result[2] == 200:
+                self._remember_ids(result[3])
+            return result
+        if action == 'create':
+            return self.timed(action, 'POST', '/memo/create', {
+                'csrf_token': self.csrf_token,
+                'title': f'Load test memo {self.rng.randint(1, 10 ** 6)}',
+                'content': 'Generated by the load test. ' * self.rng.randint(1, 40),
+                'status': 'pending',
+                'no_expiry': 'y',
+            })
+        if action == 'edit':
+            memo_id = self.rng.choice(self.memo_ids)
+            action, elapsed, status, body = self.timed(action, 'GET', f'/memo/{memo_id}/edit')
+            if status != 200:
+                # 备忘录可能已被其他线程删除或状态变化
+                self.memo_ids.remove(memo_id)
+                return action, elapsed, status, body
+            title = re.search(r'name="title"[^>]*value="([^"]*)"', body)
+            current = re.search(r'<option selected value="(\w+)"', body)
+            _, post_elapsed, status, body = self.timed(action, 'POST', f'/memo/{memo_id}/edit', {
+                'csrf_token': self.csrf_token,
+                'title': title.group(1) if title else 'Edited memo',
+                'content': 'Edited by the load test. ' * self.rng.randint(1, 40),
+                'status': current.group(1) if current else 'pending',
+                'no_expiry': 'y',
+            })
+            return action, elapsed + post_elapsed, status, body
+        if action == 'status':
+            memo_id = self.rng.choice(self.memo_ids)
+            new_status = self.rng.choice(('in_progress', 'completed', 'closed'))
+            return self.timed(action, 'POST', f'/memo/{memo_id}/status', {
+                'csrf_token': self.csrf_token,
+                'new_status': new_status,
+            })
+        return self.timed(action, 'GET', self.rng.choice(('/health/live', '/health/detailed')))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_load(make_client, user_ids, concurrency, duration, seed):
+    samples = {action: [] for action in ACTIONS}
+    errors = {action: 0 for action in ACTIONS}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    failures = []
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        user = VirtualUser(make_client(), rng.choice(user_ids), rng)
+        try:
+            user.login()
+        except Exception as e:
+            failures.append(str(e))
+            return
+        local_samples = {action: [] for action in ACTIONS}
+        local_errors = {action: 0 for action in ACTIONS}
+        while time.perf_counter() < deadline:
+            action, elapsed, status, _ = user.step()
+            local_samples[action].append(elapsed)
+            if status >= 400:
+                local_errors[action] += 1
+        with lock:
+            for action in ACTIONS:
+                samples[action].extend(local_samples[action])
+                errors[action] += local_errors[action]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if failures:
+        raise SystemExit(failures[0])
+    return samples, errors, elapsed
+
+
+def report(samples, errors, elapsed, concurrency):
+    total = sum(len(values) for values in samples.values())
+    result = {
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'errors': sum(errors.values()),
+        'actions': {},
+    }
+    print(f'\n{total} operations in {elapsed:.1f}s with {concurrency} threads: '
+          f'{result["throughput_rps"]} ops/s, {result["errors"]} errors\n')
+    print(f'{"action":<10} {"count":>7} {"errors":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"mean ms":>9}')
+    for action, values in samples.items():
+        ordered = sorted(values)
+        stats = {
+            'count': len(values),
+            'errors': errors[action],
+            'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+            'mean_ms': round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        }
+        result['actions'][action] = stats
+        print(f'{action:<10} {stats["count"]:>7} {stats["errors"]:>7} {stats["p50_ms"]:>9.2f} '
+              f'{stats["p95_ms"]:>9.2f} {stats["p99_ms"]:>9.2f} {stats["mean_ms"]:>9.2f}')
+    return result
+
+
+def parse_id_range(value):
+    start, _, end = value.partition('-')
+    return list(range(int(start), int(end or start) + 1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local load test for the memo app')
+    parser.add_argument('--url', help='压测已运行的服务，不指定时在进程内运行')
+    parser.add_argument('--user-ids', help='--url模式下可登录的用户ID范围，如 1-100')
+    parser.add_argument('--users', type=int, default=20, help='进程内模式生成的用户数')
+    parser.add_argument('--memos', type=int, default=100, help='进程内模式每个用户的备忘录数')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0, help='压测时长（秒）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='把结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    if args.url:
+        if not args.user_ids:
+            parser.error('--url requires --user-ids')
+        user_ids = parse_id_range(args.user_ids)
+        samples, errors, elapsed = run_load(lambda: HttpClient(args.url), user_ids,
+                                            args.concurrency, args.duration, args.seed)
+    else:
+        workdir = tempfile.mkdtemp(prefix='memo-load-')
+        os.environ.setdefault('SECRET_KEY', 'load-test-secret')
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "load.db")}'
+        os.environ['TEST_AUTH_ENABLED'] = 'true'
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        from app import create_app, db
+        from app.utils.dataset import generate_dataset
+
+        app = create_app('development')
+        app.config['DEBUG'] = False
+        app.jinja_env.auto_reload = False
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            user_ids, total = generate_dataset(args.users, args.memos, seed=args.seed)
+            print(f'Seeded {len(user_ids)} users and {total} memos in {time.perf_counter() - start:.1f}s '
+                  f'({workdir})')
+        samples, errors, elapsed = run_load(lambda: InProcessClient(app), user_ids,
+                                            args.concurrency, args.duration, args.seed)
+
+    result = report(samples, errors, elapsed, args.concurrency)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+"""
+热点路径微基准套件
+
+覆盖：
+- SimpleCache.get/set、clear_user_cache（10k/100k个键）、@cached 装饰器开销
+- Memo.to_dict（1k行）、MemoForm校验（10,000字符内容）、MemoStatus.can_transition
+- 渲染 memo/list.html（100条备忘录，启用/不启用卡片片段缓存）
+
+每项取多轮中的最小值作为单次耗时，结果（含提交号和运行环境）写入JSON，
+可与其他提交的结果对比。
+
+用法：
+    python benchmarks/suite.py                          # 写入 benchmarks/results/<commit>.json
+    python benchmarks/suite.py --filter cache           # 只运行名称包含cache的项
+    python benchmarks/suite.py --compare benchmarks/results/abc1234.json
+    python benchmarks/suite.py --compare base.json --threshold 0.2   # 变慢超过20%时退出码为1
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+BENCHMARKS = []
+
+
+def benchmark(name, number=1000, repeat=5):
+    """
+    注册基准项
+
+    被装饰的函数接收应用对象，返回 (stmt, setup)：stmt为被计时的函数，
+    setup为每轮计时前调用的函数（可为None，不计入耗时）。
+    """
+    def decorator(func):
+        BENCHMARKS.append((name, func, number, repeat))
+        return func
+    return decorator
+
+
+def git_commit():
+    """当前提交号（工作区有改动时加 -dirty）"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f'{commit}-dirty' if dirty else commit
+
+
+# ---- 缓存 ----
+
+@benchmark('simple_cache.get_hit', number=200000)
+def bench_cache_get_hit(app):
+    from app.utils.cache import SimpleCache
+    cache = SimpleCache()
+    cache.set('get_memo_by_id:1', {'id': 1})
+    return (lambda: cache.get('get_memo_by_id:1')), None
+
+
+@benchmark('simple_cache.get_miss', number=200000)
+def bench_cache_get_miss(app):
+    from app.utils.cache import SimpleCache
+    cache = SimpleCache()
+    return (lambda: cache.get('get_memo_by_id:1')), None
+
+
+@benchmark('simple_cache.set', number=200000)
+def bench_cache_set(app):
+    from app.utils.cache import SimpleCache
+    cache = SimpleCache()
+    return (lambda: cache.set('get_memo_by_id:1', {'id': 1})), None
+
+
+def _clear_user_cache_bench(keys):
+    def factory(app):
+        from app.utils.cache import cache, clear_user_cache
+
+        def fill():
+            cache.clear()
+            # 10%的键属于被清除的用户
+            for i in range(keys):
+                user_id = 7 if i % 10 == 0 else 1000 + i % 97
+                cache.set(f'get_user_memos:page={i}:user_id={user_id}', i)
+
+        return (lambda: clear_user_cache(7)), fill
+    return factory
+
+
+benchmark('clear_user_cache.10k', number=1, repeat=5)(_clear_user_cache_bench(10000))
+benchmark('clear_user_cache.100k', number=1, repeat=3)(_clear_user_cache_bench(100000))
+
+
+@benchmark('cached.hit', number=50000)
+def bench_cached_hit(app):
+    from app.utils.cache import cache, cached
+
+    @cached(timeout=300)
+    def lookup(memo_id):
+        return {'id': memo_id}
+
+    def call():
+        with app.app_context():
+            return lookup(1)
+
+    def setup():
+        cache.clear()
+        app.config['TESTING'] = False  # 测试配置下cached直接跳过缓存
+        call()
+
+    return call, setup
+
+
+@benchmark('cached.baseline', number=50000)
+def bench_cached_baseline(app):
+    """与cached.hit相同的调用，不经过缓存（两者之差为装饰器开销）"""
+    def lookup(memo_id):
+        return {'id': memo_id}
+
+    def call():
+        with app.app_context():
+            return lookup(1)
+
+    return call, None
+
+
+# ---- 模型和表单 ----
+
+def _seed_memos(app, count):
+    from app import db
+    from app.models.memo import Memo, MemoStatus
+    from app.models.user import User
+    with app.app_context():
+        user = User.query.filter_by(username='bench').first()
+        if user is None:
+            user = User(oauth_provider='github', oauth_user_id='bench', username='bench')
+            db.session.add(user)
+            db.session.commit()
+        existing = Memo.query.filter_by(user_id=user.id).count()
+        statuses = MemoStatus.get_all_statuses()
+        db.session.add_all([
+            Memo(title=f'Memo {i}', content='Lorem ipsum dolor sit amet. ' * 20,
+                 status=statuses[i % len(statuses)], user_id=user.id)
+            for i in range(existing, count)
+        ])
+        db.session.commit()
+        return user.id
+
+
+@benchmark('memo.to_dict.1k_rows', number=20)
+def bench_to_dict(app):
+    from app.models.memo import Memo
+    user_id = _seed_memos(app, 1000)
+    with app.app_context():
+        memos = Memo.query.filter_by(user_id=user_id).limit(1000).all()
+    return (lambda: [memo.to_dict() for memo in memos]), None
+
+
+@benchmark('memo_form.validate.max_content', number=500)
+def bench_form_validate(app):
+    from werkzeug.datastructures import MultiDict
+    from app.forms.memo import MemoForm
+    data = MultiDict({
+        'title': 'Weekly planning notes',
+        'content': ('会议纪要 Lorem ipsum dolor sit amet, consectetur. ' * 250)[:10000],
+        'status': 'pending',
+        'no_expiry': 'y',
+    })
+
+    def validate():
+        with app.test_request_context('/memo/create', method='POST'):
+            form = MemoForm(formdata=data)
+            assert form.validate(), form.errors
+
+    return validate, None
+
+
+@benchmark('memo_status.can_transition', number=20000)
+def bench_can_transition(app):
+    from app.models.memo import MemoStatus
+    pairs = [(a, b) for a in MemoStatus.get_all_statuses() for b in MemoStatus.get_all_statuses()]
+
+    def check_all():
+        for from_status, to_status in pairs:
+            MemoStatus.can_transition(from_status, to_status)
+
+    return check_all, None
+
+
+# ---- 模板渲染 ----
+
+def _render_list_bench(card_cache_size):
+    def factory(app):
+        from flask import render_template
+        from flask_login import login_user
+        from app import db
+        from app.models.memo import Memo, MemoStatus
+        from app.models.user import User
+        from app.utils.fragment_cache import card_cache
+
+        user_id = _seed_memos(app, 1000)
+
+        def render():
+            with app.test_request_context('/memo/'):
+                login_user(db.session.get(User, user_id))
+                pagination = Memo.get_user_memos(user_id, page=1, per_page=100)
+                render_template('memo/list.html', memos=pagination.items,
+                                pagination=pagination, MemoStatus=MemoStatus)
+
+        def setup():
+            app.config['MEMO_CARD_CACHE_SIZE'] = card_cache_size
+            card_cache.max_entries = card_cache_size
+            card_cache.clear()
+            render()  # 模板编译和缓存预热不计入
+
+        return render, setup
+    return factory
+
+
+benchmark('render.memo_list.100', number=10)(_render_list_bench(0))
+benchmark('render.memo_list.100.card_cache', number=10)(_render_list_bench(2000))
+
+
+def run(selected):
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    from app import create_app, db
+
+    results = {}
+    for name, factory, number, repeat in selected:
+        # 每项使用独立的应用和内存数据库，互不影响
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+        stmt, setup = factory(app)
+        timings = []
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            timings.append(timeit.timeit(stmt, number=number) / number)
+        results[name] = {
+            'best_us': round(min(timings) * 1e6, 3),
+            'median_us': round(statistics.median(timings) * 1e6, 3),
+            'number': number,
+            'repeat': repeat,
+        }
+        print(f'{name:<36} {results[name]["best_us"]:12.2f} us')
+    return results
+
+
+def compare(results, baseline, threshold):
+    """打印与基准结果的对比，返回变慢超过threshold的项"""
+    regressions = []
+    print(f'\n{"benchmark":<36} {"base us":>12} {"now us":>12} {"change":>8}')
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            print(f'{name:<36} {"-":>12} {result["best_us"]:12.2f} {"new":>8}')
+            continue
+        change = result['best_us'] / base['best_us'] - 1 if base['best_us'] else 0.0
+        flag = ''
+        if threshold is not None and change > threshold:
+            regressions.append(name)
+            flag = '  <-- slower'
+        print(f'{name:<36} {base["best_us"]:12.2f} {result["best_us"]:12.2f} {change:+8.1%}{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run hot-path microbenchmarks')
+    parser.add_argument('--filter', help='只运行名称包含该字符串的基准项')
+    parser.add_argument('--output', help='结果JSON路径，默认 benchmarks/results/<commit>.json')
+    parser.add_argument('--compare', help='与该结果JSON对比')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='与--compare一起使用：任一项变慢超过该比例（如0.2）时退出码为1')
+    args = parser.parse_args(argv)
+
+    selected = [item for item in BENCHMARKS if not args.filter or args.filter in item[0]]
+    if not selected:
+        parser.error(f'no benchmark matches {args.filter!r}')
+
+    commit = git_commit()
+    started = time.perf_counter()
+    results = run(selected)
+    report = {
+        'commit': commit,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'duration_s': round(time.perf_counter() - started, 1),
+        'results': results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    print(f'\nResults written to {os.path.relpath(output)}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f'Compared with {baseline.get("commit", args.compare)}')
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
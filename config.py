@@ -51,6 +51,12 @@ class Config:
     
     # 日志配置
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # 控制台格式：json 或 text（文件日志始终为JSON）
+    LOG_REQUESTS = True  # 每个请求记录一条带延迟的请求日志
+    LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0.1))  # DEBUG日志采样比例
+    LOG_FILES = True  # 写入 app.log / error.log
+    LOG_DIR = os.environ.get('LOG_DIR')  # 默认 logs/
+    LOG_FILE_HANDLER = os.environ.get('LOG_FILE_HANDLER', 'rotating')  # 日志文件处理：rotating（进程内轮转）或 watched（外部轮转，多进程部署）
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'  # 生产环境建议使用 'Strict'
     
@@ -66,16 +72,113 @@ class Config:
         'Permissions-Policy': 'geolocation=(), microphone=(), camera=()',  # 权限策略
     }
     
+    # 内容安全策略（CSP）
+    CSP_DIRECTIVES = {
+        'default-src': "'self'",
+        'script-src': "'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com",
+        'style-src': "'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com https://fonts.googleapis.com",
+        'font-src': "'self' https://fonts.gstatic.com https://cdnjs.cloudflare.com",
+        'img-src': "'self' data: https:",
+        'connect-src': "'self' https://api.github.com https://cdn.jsdelivr.net",
+        'frame-ancestors': "'none'",
+    }
+    # nonce模式：script-src中的'unsafe-inline'替换为每个请求的nonce
+    CSP_NONCE_ENABLED = os.environ.get('CSP_NONCE_ENABLED', 'False').lower() == 'true'
+
     # HSTS配置（仅生产环境）
     HSTS_MAX_AGE = 31536000  # 1年
     HSTS_INCLUDE_SUBDOMAINS = True
     HSTS_PRELOAD = False
 
+    # 响应压缩配置
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'True').lower() == 'true'
+    COMPRESS_MIN_SIZE = 500  # 小于该字节数的响应不压缩
+    COMPRESS_LEVEL = 6  # 动态压缩级别（预压缩静态文件使用9）
+
+    # 备忘录列表配置
+    MEMO_LIST_PER_PAGE = 10  # 默认每页数量
+    MEMO_LIST_MAX_PER_PAGE = int(os.environ.get('MEMO_LIST_MAX_PER_PAGE', 500))  # ?per_page= 的上限
+    MEMO_LIST_STREAMING = os.environ.get('MEMO_LIST_STREAMING', 'True').lower() == 'true'  # 流式渲染列表页
+    STREAM_BUFFER_SIZE = 8192  # 流式响应合并输出的字符数
+
+    # 静态资源清单配置（flask build-assets 生成）
+    ASSETS_MANIFEST_ENABLED = True  # 模板中的asset_url()解析为带指纹的文件
+    ASSETS_OUTPUT_DIR = 'dist'  # static下的输出目录
+
+    # 模板编译配置
+    TEMPLATE_BYTECODE_CACHE = True  # 使用文件系统字节码缓存
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR')  # 默认使用系统临时目录
+    TEMPLATE_PRECOMPILE = True  # 启动时预编译全部模板
+    TRANSLATIONS_PRELOAD = True  # 启动时加载翻译目录（gunicorn预加载时只在主进程中执行一次）
+
+    # 模板片段缓存（备忘录卡片），0表示禁用
+    MEMO_CARD_CACHE_SIZE = int(os.environ.get('MEMO_CARD_CACHE_SIZE', 2000))
+
+    # Markdown渲染配置
+    MARKDOWN_ENABLED = os.environ.get('MARKDOWN_ENABLED', 'True').lower() == 'true'
+    MARKDOWN_PERSIST = os.environ.get('MARKDOWN_PERSIST', 'True').lower() == 'true'  # 写入时保存到rendered_html
+    MARKDOWN_CACHE_SIZE = int(os.environ.get('MARKDOWN_CACHE_SIZE', 2000))  # 内存缓存条数（按内容哈希）
+    MARKDOWN_PREVIEW_LENGTH = int(os.environ.get('MARKDOWN_PREVIEW_LENGTH', 200))  # 列表卡片显示的内容长度
+    MARKDOWN_RENDER_QUEUE_SIZE = int(os.environ.get('MARKDOWN_RENDER_QUEUE_SIZE', 100))  # 后台渲染排队上限
+
+    # 内容安全检查模式：deny（拒绝危险标签）或 allow（只允许白名单中的标签和属性）
+    CONTENT_SANITIZER_MODE = os.environ.get('CONTENT_SANITIZER_MODE', 'deny')
+
+    # 批量API配置
+    BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', 500))  # 单次批量请求的最大操作数
+    BATCH_ATOMIC = os.environ.get('BATCH_ATOMIC', 'True').lower() == 'true'  # 默认任一操作失败即整批回滚
+
+    # 增量同步配置
+    SYNC_MAX_CHANGES = int(os.environ.get('SYNC_MAX_CHANGES', 500))  # 单次返回的最大变更数
+    TOMBSTONE_RETENTION_DAYS = int(os.environ.get('TOMBSTONE_RETENTION_DAYS', 30))  # 墓碑保留天数
+
+    # 运行指标配置（/health/metrics）
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # 多worker部署时设置为共享目录，导出所有进程的合计
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5.0))  # 进程快照写入间隔（秒）
+
+    # 诊断令牌有效期（秒），令牌由 flask diagnostics-token 生成
+    DIAGNOSTICS_TOKEN_MAX_AGE = int(os.environ.get('DIAGNOSTICS_TOKEN_MAX_AGE', 3600))
+
+    # 请求分析配置（结果写入logs/profiles）
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'False').lower() == 'true'
+    PROFILER_MODE = os.environ.get('PROFILER_MODE', 'sample')  # sample（折叠栈）或 cprofile
+    PROFILER_SAMPLE_RATE = int(os.environ.get('PROFILER_SAMPLE_RATE', 0))  # 每N个请求分析1个，0表示只分析带令牌的请求
+    PROFILER_INTERVAL = 0.001  # sample模式的采样间隔（秒）
+    PROFILER_DIR = os.environ.get('PROFILER_DIR')  # 默认 logs/profiles
+
+    # 测试登录（/auth/test-login/<user_id>，绕过OAuth，仅用于本地压测，生产环境强制关闭）
+    TEST_AUTH_ENABLED = os.environ.get('TEST_AUTH_ENABLED', 'False').lower() == 'true'
+
+    # 请求追踪配置（/health/traces 查看，需要诊断令牌）
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'False').lower() == 'true'
+    TRACING_BUFFER_SIZE = 200  # 内存中保留的最近trace数
+    TRACING_MAX_SPANS = 1000  # 单个trace的span上限
+    TRACING_FILE = os.environ.get('TRACING_FILE')  # 设置后每条trace按行追加到该JSON文件
+
+    # 健康检查采样配置（/health/detailed 返回后台采样的快照）
+    HEALTH_SAMPLER_ENABLED = os.environ.get('HEALTH_SAMPLER_ENABLED', 'True').lower() == 'true'
+    HEALTH_SAMPLE_INTERVAL = float(os.environ.get('HEALTH_SAMPLE_INTERVAL', 10.0))  # 采样间隔（秒）
+    HEALTH_STALE_AFTER = 60  # 快照超过该秒数未更新时报告不健康
+
+    # SSE实时推送配置
+    SSE_HEARTBEAT_INTERVAL = 15  # 心跳间隔（秒）
+    SSE_QUEUE_SIZE = 100  # 每个连接的事件队列上限，超出后断开并要求客户端重新同步
+    SSE_MAX_STREAM_SECONDS = 300  # 单个连接最长保持时间，到期后由浏览器自动重连
+    SSE_RELAY_ENABLED = True  # 是否启用跨进程中继（轮询变更序列）
+    SSE_RELAY_INTERVAL = float(os.environ.get('SSE_RELAY_INTERVAL', 1.0))  # 中继轮询间隔（秒）
+
 
 class DevelopmentConfig(Config):
     """开发环境配置"""
     DEBUG = True
     ENV = 'development'
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    # 开发时直接引用源文件，修改后无需重新构建
+    ASSETS_MANIFEST_ENABLED = False
+    # 开发服务器在代码修改后频繁重启，模板和翻译在首次使用时加载
+    TEMPLATE_PRECOMPILE = False
+    TRANSLATIONS_PRELOAD = False
 
 
 class ProductionConfig(Config):
@@ -92,6 +195,9 @@ class ProductionConfig(Config):
     SESSION_COOKIE_SAMESITE = 'Strict'
     PREFERRED_URL_SCHEME = 'https'
     
+    # 生产环境不允许测试登录
+    TEST_AUTH_ENABLED = False
+
     # 生产环境启用HSTS
     HSTS_MAX_AGE = 31536000
     HSTS_INCLUDE_SUBDOMAINS = True
@@ -105,10 +211,20 @@ class TestingConfig(Config):
     ENV = 'testing'
     # 测试环境使用内存数据库
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # 测试用例按英文文本断言
+    BABEL_DEFAULT_LOCALE = 'en'
     # 测试环境禁用WTF CSRF
     WTF_CSRF_ENABLED = False
     # 测试环境简化会话配置
     SESSION_COOKIE_SECURE = False
+    # 测试环境不启动后台中继线程和健康采样线程
+    SSE_RELAY_ENABLED = False
+    HEALTH_SAMPLER_ENABLED = False
+    # 测试环境日志只输出到控制台，不在仓库的logs/中写文件
+    LOG_FILES = False
+    # 测试环境每个用例都创建应用，不预编译模板
+    TEMPLATE_BYTECODE_CACHE = False
+    TEMPLATE_PRECOMPILE = False
 
 
 # 配置字典
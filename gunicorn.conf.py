@@ -0,0 +1,73 @@
+"""
+gunicorn配置（生产环境）
+
+    gunicorn wsgi:application
+
+主进程预加载应用（模板预编译、翻译、静态资源清单只加载一次），worker通过fork共享这部分内存。
+worker数和线程数可用环境变量覆盖：
+    WEB_CONCURRENCY   worker进程数，SQLite 默认 2，DATABASE_URL 为服务器数据库时默认 CPU核数*2+1
+    GUNICORN_THREADS  每个worker的线程数，默认 4
+    GUNICORN_BIND     监听地址，默认 0.0.0.0:8000
+
+SQLite同一时间只允许一个写入者，worker再多也只是争用同一个数据库文件的锁；需要更多worker时
+应通过 DATABASE_URL 使用服务器数据库（如PostgreSQL）。每个worker各自运行健康检查采样和变更推送
+中继线程（中继只在有订阅者时查询数据库）。
+
+多个worker写同一个日志文件时不能各自按大小轮转，因此默认改用 LOG_FILE_HANDLER=watched：
+各进程以追加方式写入，轮转交给logrotate（文件被移走后自动重新打开）。
+
+发送 HUP 时逐个替换worker（预加载的代码不会重新加载）；更新代码需先发送 USR2 启动新的主进程，
+确认正常后向旧主进程发送 WINCH 和 QUIT。
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# 模板渲染和Markdown处理以CPU为主，数据库和网络等待由线程覆盖；
+# SQLite的写入是串行的，默认只用少量worker
+_sqlite = (os.environ.get('DATABASE_URL') or 'sqlite://').startswith('sqlite')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 if _sqlite else multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+preload_app = True
+
+# 在主进程加载应用之前写入环境变量，多个worker共用的日志文件交给外部轮转
+raw_env = [f"LOG_FILE_HANDLER={os.environ.get('LOG_FILE_HANDLER', 'watched')}"]
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# worker处理一定数量的请求后平滑重启（加随机量，避免所有worker同时重启），限制内存缓慢增长
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+# 应用自己的日志已写入 logs/，gunicorn访问日志默认关闭
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def on_starting(server):
+    """主进程启动时（应用已预加载）"""
+    from app.utils.worker import before_start
+    before_start(server.app.wsgi())
+
+
+def pre_fork(server, worker):
+    """主进程fork每个worker之前"""
+    from app.utils.worker import before_fork
+    before_fork(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    """worker进程启动后"""
+    from app.utils.worker import after_fork
+    after_fork(server.app.wsgi())
+
+
+def child_exit(server, worker):
+    """主进程回收退出的worker后"""
+    from app.utils.worker import after_worker_exit
+    after_worker_exit(server.app.wsgi(), worker.pid)
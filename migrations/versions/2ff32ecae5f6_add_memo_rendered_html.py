@@ -0,0 +1,27 @@
+"""add persisted markdown render to memos
+
+Revision ID: 2ff32ecae5f6
+Revises: 6ce6d6dd5806
+Create Date: 2026-10-19 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2ff32ecae5f6'
+down_revision = '6ce6d6dd5806'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 渲染结果由 flask render-markdown 回填（启用MARKDOWN_PERSIST时）
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rendered_html', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.drop_column('rendered_html')
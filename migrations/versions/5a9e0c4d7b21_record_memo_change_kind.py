@@ -0,0 +1,30 @@
+"""record the change sequence of memo creation and expiry
+
+Revision ID: 5a9e0c4d7b21
+Revises: eb338ae34dd6
+Create Date: 2026-10-19 16:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a9e0c4d7b21'
+down_revision = 'eb338ae34dd6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ChangeFeedRelay按 change_seq == created_seq / expired_seq 区分创建和过期；
+    # 已有数据保持NULL（中继从启动时的序列号开始转发，不会再看到这些历史变更）
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_seq', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('expired_seq', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.drop_column('expired_seq')
+        batch_op.drop_column('created_seq')
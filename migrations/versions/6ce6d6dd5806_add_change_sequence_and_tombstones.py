@@ -0,0 +1,60 @@
+"""add change sequence and tombstones for delta sync
+
+Revision ID: 6ce6d6dd5806
+Revises: 7f1c7d202a7c
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6ce6d6dd5806'
+down_revision = '7f1c7d202a7c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_sequence',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('compacted_seq', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('memo_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('memo_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('memo_tombstones', schema=None) as batch_op:
+        batch_op.create_index('idx_tombstone_deleted_at', ['deleted_at'], unique=False)
+        batch_op.create_index('idx_tombstone_user_change_seq', ['user_id', 'change_seq'], unique=False)
+
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.Integer(), nullable=True))
+        batch_op.create_index('idx_memo_user_change_seq', ['user_id', 'change_seq'], unique=False)
+
+    # 已有备忘录的序列号取其ID（唯一且递增），计数器从最大值继续分配
+    op.execute('UPDATE memos SET change_seq = id')
+    op.execute(
+        'INSERT INTO change_sequence (id, value, compacted_seq) '
+        'SELECT 1, COALESCE(MAX(id), 0), 0 FROM memos'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.drop_index('idx_memo_user_change_seq')
+        batch_op.drop_column('change_seq')
+
+    with op.batch_alter_table('memo_tombstones', schema=None) as batch_op:
+        batch_op.drop_index('idx_tombstone_user_change_seq')
+        batch_op.drop_index('idx_tombstone_deleted_at')
+
+    op.drop_table('memo_tombstones')
+    op.drop_table('change_sequence')
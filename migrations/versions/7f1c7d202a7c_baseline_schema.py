@@ -0,0 +1,66 @@
+"""baseline schema (users, memos)
+
+Revision ID: 7f1c7d202a7c
+Revises: 
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f1c7d202a7c'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('oauth_provider', sa.String(length=50), nullable=False),
+    sa.Column('oauth_user_id', sa.String(length=100), nullable=False),
+    sa.Column('username', sa.String(length=100), nullable=True),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('avatar_url', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('oauth_provider', 'oauth_user_id', name='uq_user_oauth')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('idx_user_email', ['email'], unique=False)
+        batch_op.create_index('idx_user_oauth', ['oauth_provider', 'oauth_user_id'], unique=False)
+
+    op.create_table('memos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('expired_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.create_index('idx_memo_expired', ['expired_at'], unique=False)
+        batch_op.create_index('idx_memo_user_status', ['user_id', 'status'], unique=False)
+        batch_op.create_index('idx_memo_user_updated', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.drop_index('idx_memo_user_updated')
+        batch_op.drop_index('idx_memo_user_status')
+        batch_op.drop_index('idx_memo_expired')
+
+    op.drop_table('memos')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_oauth')
+        batch_op.drop_index('idx_user_email')
+
+    op.drop_table('users')
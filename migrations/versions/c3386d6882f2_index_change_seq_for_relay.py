@@ -0,0 +1,33 @@
+"""index change_seq on memos and tombstones for the change feed relay
+
+Revision ID: c3386d6882f2
+Revises: 2ff32ecae5f6
+Create Date: 2026-10-19 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3386d6882f2'
+down_revision = '2ff32ecae5f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ChangeFeedRelay跨用户按序列号轮询，(user_id, change_seq)复合索引用不上
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.create_index('idx_memo_change_seq', ['change_seq'], unique=False)
+
+    with op.batch_alter_table('memo_tombstones', schema=None) as batch_op:
+        batch_op.create_index('idx_tombstone_change_seq', ['change_seq'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('memo_tombstones', schema=None) as batch_op:
+        batch_op.drop_index('idx_tombstone_change_seq')
+
+    with op.batch_alter_table('memos', schema=None) as batch_op:
+        batch_op.drop_index('idx_memo_change_seq')
@@ -0,0 +1,25 @@
+"""store the card preview render in memos.rendered_html
+
+Revision ID: eb338ae34dd6
+Revises: c3386d6882f2
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eb338ae34dd6'
+down_revision = 'c3386d6882f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # rendered_html改为保存内容预览的渲染结果，清空旧的全文渲染，由 flask render-markdown 回填
+    op.execute('UPDATE memos SET rendered_html = NULL')
+
+
+def downgrade():
+    op.execute('UPDATE memos SET rendered_html = NULL')
@@ -2,6 +2,7 @@
 测试配置和工具函数
 """
 import pytest
+from sqlalchemy import event
 from app import create_app, db
 from app.models import User, Memo
 from flask_login import login_user
@@ -83,4 +84,34 @@ def test_memo(app, test_user):
         db.session.commit()
         # 确保对象在返回前仍然绑定到会话
         db.session.refresh(memo)
-        return memo
\ No newline at end of file
+        return memo
+
+
+class QueryCounter:
+    """记录期间执行的SQL语句（用于查询次数断言）"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_queries(app):
+    """返回统计SQL语句数的上下文管理器：with count_queries() as queries: ..."""
+    def factory():
+        return QueryCounter(db.engine)
+    return factory
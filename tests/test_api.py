@@ -0,0 +1,296 @@
+"""
+API端点测试
+"""
+import pytest
+from app.models.memo import Memo, MemoStatus
+from app import db
+
+
+class TestBatchApi:
+    """批量操作API测试"""
+
+    def test_batch_requires_login(self, client):
+        """测试批量接口需要登录"""
+        response = client.post('/api/batch', json={'operations': []})
+        assert response.status_code == 302
+
+    def test_batch_rejects_invalid_payload(self, authenticated_client):
+        """测试非法请求体"""
+        response = authenticated_client.post('/api/batch', json={'operations': 'nope'})
+        assert response.status_code == 400
+
+        response = authenticated_client.post('/api/batch', json={
+            'operations': [{'action': 'create', 'title': 'Missing content'}]
+        })
+        assert response.status_code == 400
+        assert response.get_json()['index'] == 0
+
+        response = authenticated_client.post('/api/batch', json={'operations': [
+            {'action': 'create', 'title': 'Fine', 'content': 'ok'},
+            {'action': 'create', 'title': 'Sneaky', 'content': '<script>alert(1)</script>'},
+        ]})
+        assert response.status_code == 400
+        assert response.get_json()['index'] == 1
+
+    def test_batch_applies_operations_in_order(self, authenticated_client, test_memo):
+        """测试按顺序执行多个操作"""
+        response = authenticated_client.post('/api/batch', json={'operations': [
+            {'action': 'create', 'title': 'Batch One', 'content': 'first'},
+            {'action': 'create', 'title': 'Batch Two', 'content': 'second'},
+            {'action': 'status', 'id': test_memo.id, 'status': 'in_progress'},
+            {'action': 'update', 'id': test_memo.id, 'title': 'Renamed'},
+        ]})
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['committed'] is True
+        assert [r['ok'] for r in data['results']] == [True, True, True, True]
+        assert data['results'][0]['memo']['title'] == 'Batch One'
+
+        memo = db.session.get(Memo, test_memo.id)
+        assert memo.title == 'Renamed'
+        assert memo.status == 'in_progress'
+        assert Memo.query.count() == 3
+
+    def test_batch_atomic_failure_rolls_back(self, authenticated_client, test_memo):
+        """测试原子模式下任一失败则整批回滚"""
+        response = authenticated_client.post('/api/batch', json={'atomic': True, 'operations': [
+            {'action': 'create', 'title': 'Should vanish', 'content': 'x'},
+            {'action': 'status', 'id': test_memo.id, 'status': 'completed'},
+        ]})
+        assert response.status_code == 409
+        data = response.get_json()
+        assert data['committed'] is False
+        assert data['results'][-1]['ok'] is False
+        assert Memo.query.filter_by(title='Should vanish').first() is None
+
+    def test_batch_non_atomic_keeps_successful_operations(self, authenticated_client, test_memo):
+        """测试非原子模式下失败操作不影响其他操作"""
+        response = authenticated_client.post('/api/batch', json={'atomic': False, 'operations': [
+            {'action': 'create', 'title': 'Kept', 'content': 'x'},
+            {'action': 'delete', 'id': 99999},
+            {'action': 'delete', 'id': test_memo.id},
+        ]})
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [r['ok'] for r in data['results']] == [True, False, True]
+        assert Memo.query.filter_by(title='Kept').first() is not None
+        assert db.session.get(Memo, test_memo.id) is None
+
+    @pytest.mark.parametrize('atomic', ['false', '0', 0, [0], None])
+    def test_batch_atomic_must_be_boolean(self, authenticated_client, atomic):
+        """测试atomic只接受JSON布尔值"""
+        response = authenticated_client.post('/api/batch', json={'atomic': atomic, 'operations': [
+            {'action': 'create', 'title': 'Not applied', 'content': 'x'},
+        ]})
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'atomic must be a boolean'
+        assert Memo.query.filter_by(title='Not applied').first() is None
+
+    def test_batch_operation_limit(self, authenticated_client, app):
+        """测试批量操作数量上限"""
+        app.config['BATCH_MAX_OPERATIONS'] = 1
+        response = authenticated_client.post('/api/batch', json={'operations': [
+            {'action': 'delete', 'id': 1},
+            {'action': 'delete', 'id': 2},
+        ]})
+        assert response.status_code == 413
+
+
+class TestChangesApi:
+    """增量同步API测试"""
+
+    def test_changes_since_zero_returns_all(self, authenticated_client, test_memo):
+        """测试全量同步"""
+        response = authenticated_client.get('/api/memos/changes?since=0')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [m['id'] for m in data['changes']] == [test_memo.id]
+        assert data['deleted'] == []
+        assert data['next'] == test_memo.change_seq
+
+    def test_changes_are_incremental(self, authenticated_client, test_memo):
+        """测试增量同步只返回之后的变更，删除以墓碑返回"""
+        since = authenticated_client.get('/api/memos/changes').get_json()['next']
+
+        authenticated_client.post('/api/batch', json={'operations': [
+            {'action': 'create', 'title': 'Fresh', 'content': 'x'},
+            {'action': 'delete', 'id': test_memo.id},
+        ]})
+
+        data = authenticated_client.get(f'/api/memos/changes?since={since}').get_json()
+        assert [m['title'] for m in data['changes']] == ['Fresh']
+        assert [t['id'] for t in data['deleted']] == [test_memo.id]
+        assert data['next'] > since
+
+        data = authenticated_client.get(f"/api/memos/changes?since={data['next']}").get_json()
+        assert data['changes'] == [] and data['deleted'] == []
+
+    def test_changes_pagination(self, authenticated_client):
+        """测试分页返回has_more"""
+        authenticated_client.post('/api/batch', json={'operations': [
+            {'action': 'create', 'title': f'Memo {i}', 'content': 'x'} for i in range(3)
+        ]})
+        data = authenticated_client.get('/api/memos/changes?limit=2').get_json()
+        assert len(data['changes']) == 2
+        assert data['has_more'] is True
+
+    def test_compaction_requires_resync(self, authenticated_client, app, test_memo):
+        """测试墓碑压缩后旧序列号需要全量同步"""
+        from datetime import datetime, timedelta
+        from app.models.memo import MemoTombstone
+        from app.services.memo_service import MemoService
+
+        since = authenticated_client.get('/api/memos/changes').get_json()['next']
+        authenticated_client.post('/api/batch', json={'operations': [
+            {'action': 'delete', 'id': test_memo.id},
+            {'action': 'create', 'title': 'After', 'content': 'x'},
+        ]})
+        MemoTombstone.query.update({'deleted_at': datetime.utcnow() - timedelta(days=60)})
+        db.session.commit()
+
+        assert MemoService.compact_tombstones(older_than_days=30) == 1
+        assert MemoTombstone.query.count() == 0
+
+        response = authenticated_client.get(f'/api/memos/changes?since={since}')
+        assert response.status_code == 410
+
+
+class TestMemoEvents:
+    """备忘录变更事件（SSE）测试"""
+
+    def _drain(self, subscription):
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+
+    def test_events_published_after_commit(self, authenticated_client, test_user, test_memo):
+        """测试提交后发布事件，回滚的操作不发布"""
+        from app.services.memo_events import hub
+        subscription = hub.subscribe(test_user.id)
+        try:
+            authenticated_client.post('/api/batch', json={'atomic': False, 'operations': [
+                {'action': 'create', 'title': 'Live', 'content': 'x'},
+                {'action': 'status', 'id': test_memo.id, 'status': 'completed'},
+                {'action': 'delete', 'id': test_memo.id},
+            ]})
+            events = self._drain(subscription)
+            assert [e['type'] for e in events] == ['create', 'delete']
+            assert all(e['seq'] for e in events)
+
+            authenticated_client.post('/api/batch', json={'operations': [
+                {'action': 'create', 'title': 'Rolled back', 'content': 'x'},
+                {'action': 'delete', 'id': 99999},
+            ]})
+            assert self._drain(subscription) == []
+        finally:
+            hub.unsubscribe(subscription)
+
+    def test_slow_subscriber_gets_resync(self):
+        """测试队列满时断开慢消费者"""
+        from app.services.memo_events import EventHub, stream_events
+        event_hub = EventHub(queue_size=2)
+        subscription = event_hub.subscribe(1)
+        for seq in range(3):
+            event_hub.publish({'type': 'update', 'user_id': 1, 'seq': seq})
+        assert subscription.overflowed
+        assert subscription.queue.get_nowait() is None
+
+    def test_stream_sends_heartbeat(self, authenticated_client, app):
+        """测试SSE连接发送心跳并按时结束"""
+        app.config['SSE_HEARTBEAT_INTERVAL'] = 0.01
+        app.config['SSE_MAX_STREAM_SECONDS'] = 0.05
+        response = authenticated_client.get('/api/memos/stream')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert b': heartbeat' in response.data
+
+    def test_relay_forwards_foreign_changes(self, app, test_user, test_memo):
+        """测试中继转发其他进程写入的变更，跳过本进程已发布的事件"""
+        from app.services.memo_events import EventHub, ChangeFeedRelay
+        event_hub = EventHub()
+        relay = ChangeFeedRelay(app, event_hub)
+        relay.last_seq = 0
+        subscription = event_hub.subscribe(test_user.id)
+
+        assert relay.poll_once() == 1
+        assert subscription.queue.get_nowait()['memo']['id'] == test_memo.id
+
+        assert relay.poll_once() == 0
+
+    def test_relay_forwards_changes_before_first_poll(self, app, test_user):
+        """测试中继从启动时的序列号开始转发，启动后到首次轮询之间的写入不会遗漏"""
+        from app.services.memo_events import EventHub, ChangeFeedRelay
+        event_hub = EventHub()
+        relay = ChangeFeedRelay(app, event_hub, interval=3600)
+        relay.start()
+        assert relay.last_seq == relay.current_seq()
+        subscription = event_hub.subscribe(test_user.id)
+
+        memo = Memo(title='Written before first poll', content='content', user_id=test_user.id)
+        db.session.add(memo)
+        db.session.commit()
+
+        assert relay.poll_once() == 1
+        assert subscription.queue.get_nowait()['memo']['id'] == memo.id
+
+    def test_relay_event_types_from_other_session(self, app, test_user):
+        """测试其他进程（独立会话）写入的创建、更新、过期按写入时记录的类型转发"""
+        from sqlalchemy.orm import Session
+        from app.services.memo_events import EventHub, ChangeFeedRelay
+        event_hub = EventHub()
+        relay = ChangeFeedRelay(app, event_hub, interval=3600)
+        relay.start()
+        subscription = event_hub.subscribe(test_user.id)
+
+        def relayed_type():
+            assert relay.poll_once() == 1
+            return subscription.queue.get_nowait()['type']
+
+        with Session(db.engine) as other:
+            memo = Memo(title='From another worker', content='content', user_id=test_user.id)
+            other.add(memo)
+            other.commit()
+            assert relayed_type() == 'create'
+
+            memo.title = 'Edited'
+            other.commit()
+            assert relayed_type() == 'update'
+
+            memo.status = MemoStatus.EXPIRED
+            other.commit()
+            assert relayed_type() == 'expire'
+
+            memo.title = 'Edited after expiry'
+            other.commit()
+            assert relayed_type() == 'update'
+
+    @pytest.mark.parametrize('model', ['Memo', 'MemoTombstone'])
+    def test_relay_query_uses_change_seq_index(self, app, model):
+        """测试中继的跨用户序列号查询走索引，不扫描全表"""
+        from app.models import memo as memo_models
+        cls = getattr(memo_models, model)
+        query = cls.query.filter(cls.change_seq > 0).order_by(cls.change_seq).limit(1000)
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+        assert 'USING INDEX' in plan and 'change_seq' in plan
+        assert 'TEMP B-TREE' not in plan
+
+
+class TestConditionalApi:
+    """API条件请求测试"""
+
+    def test_changes_not_modified(self, authenticated_client, test_memo):
+        """测试变更接口支持If-None-Match和If-Modified-Since"""
+        response = authenticated_client.get('/api/memos/changes')
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+
+        assert authenticated_client.get('/api/memos/changes', headers={'If-None-Match': etag}).status_code == 304
+        assert authenticated_client.get('/api/memos/changes',
+                                        headers={'If-Modified-Since': last_modified}).status_code == 304
+
+        authenticated_client.post('/api/batch', json={'operations': [
+            {'action': 'delete', 'id': test_memo.id},
+        ]})
+        assert authenticated_client.get('/api/memos/changes', headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,271 @@
+"""
+ASGI入口测试
+"""
+import asyncio
+import json
+import logging
+import pytest
+from app import db
+from app.asgi import AsgiApplication
+from app.models.user import User
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+async def call_asgi(asgi_app, method, path, body=None, headers=None, query=b''):
+    """直接调用ASGI应用，返回 (状态码, 响应体)"""
+    sent = await call_asgi_messages(asgi_app, method, path, body, headers, query)
+    status = sent[0]['status']
+    data = b''.join(m.get('body', b'') for m in sent[1:])
+    return status, data
+
+
+async def call_asgi_messages(asgi_app, method, path, body=None, headers=None, query=b''):
+    """直接调用ASGI应用，返回发送的全部消息"""
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'scheme': 'http',
+        'server': ('testserver', 80),
+        'root_path': '',
+        'method': method,
+        'path': path,
+        'query_string': query,
+        'headers': [(k.encode(), v.encode()) for k, v in (headers or {}).items()],
+    }
+    await asgi_app(scope, receive, send)
+    return sent
+
+
+@pytest.fixture
+def asgi_app(app, tmp_path):
+    """使用临时文件数据库的ASGI应用"""
+    app.config['ASYNC_DATABASE_URI'] = f"sqlite+aiosqlite:///{tmp_path / 'asgi.db'}"
+    asgi = AsgiApplication(app)
+
+    async def setup():
+        async with asgi._get_database().engine.begin() as conn:
+            await conn.run_sync(db.metadata.create_all)
+        async with asgi._get_database().session() as session:
+            session.add(User(oauth_provider='github', oauth_user_id='1', username='asgi'))
+            await session.commit()
+
+    asyncio.run(setup())
+    yield asgi
+    asyncio.run(asgi.database.dispose())
+
+
+@pytest.fixture
+def auth_headers(app):
+    """携带已登录会话cookie的请求头"""
+    cookie = app.session_interface.get_signing_serializer(app).dumps({'_user_id': '1'})
+    return {'cookie': f'session={cookie}'}
+
+
+class TestAsgiApplication:
+    """ASGI应用测试"""
+
+    def test_requires_login(self, asgi_app):
+        """测试未登录返回401"""
+        status, _ = asyncio.run(call_asgi(asgi_app, 'GET', '/api/memos/changes'))
+        assert status == 401
+
+    def test_remember_cookie_login(self, app, asgi_app):
+        """测试会话中没有用户时，与Flask-Login一样用“记住我”cookie恢复登录"""
+        from flask_login import encode_cookie
+        with app.app_context():
+            remember = encode_cookie('1')
+        serializer = app.session_interface.get_signing_serializer(app)
+
+        def changes_status(cookie):
+            status, _ = asyncio.run(call_asgi(asgi_app, 'GET', '/api/memos/changes', headers={'cookie': cookie}))
+            return status
+
+        assert changes_status(f'remember_token={remember}') == 200
+        assert changes_status('remember_token=1|forged') == 401
+        # 退出登录后会话标记 _remember=clear，不再使用cookie
+        logged_out = serializer.dumps({'_remember': 'clear'})
+        assert changes_status(f'session={logged_out}; remember_token={remember}') == 401
+
+    def test_batch_and_changes(self, asgi_app, auth_headers):
+        """测试异步批量写入和增量同步"""
+        status, data = asyncio.run(call_asgi(asgi_app, 'POST', '/api/batch', body={'operations': [
+            {'action': 'create', 'title': 'Async one', 'content': 'x'},
+            {'action': 'create', 'title': 'Async two', 'content': 'y'},
+        ]}, headers=auth_headers))
+        assert status == 200
+        results = json.loads(data)['results']
+        assert all(r['ok'] for r in results)
+
+        status, data = asyncio.run(call_asgi(asgi_app, 'POST', '/api/batch', body={'operations': [
+            {'action': 'delete', 'id': results[0]['id']},
+        ]}, headers=auth_headers))
+        assert status == 200
+
+        status, data = asyncio.run(call_asgi(asgi_app, 'GET', '/api/memos/changes',
+                                             headers=auth_headers, query=b'since=0'))
+        assert status == 200
+        changes = json.loads(data)
+        assert [m['title'] for m in changes['changes']] == ['Async two']
+        assert [t['id'] for t in changes['deleted']] == [results[0]['id']]
+
+    def test_changes_not_modified(self, asgi_app, auth_headers):
+        """测试异步变更接口的条件请求"""
+        status, _ = asyncio.run(call_asgi(asgi_app, 'POST', '/api/batch', body={'operations': [
+            {'action': 'create', 'title': 'Cached', 'content': 'x'},
+        ]}, headers=auth_headers))
+        assert status == 200
+
+        sent = []
+
+        async def capture():
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                sent.append(message)
+
+            await asgi_app({
+                'type': 'http', 'method': 'GET', 'path': '/api/memos/changes', 'query_string': b'',
+                'headers': [(b'cookie', auth_headers['cookie'].encode())],
+            }, receive, send)
+
+        asyncio.run(capture())
+        etag = dict(sent[0]['headers'])[b'etag'].decode()
+
+        status, data = asyncio.run(call_asgi(asgi_app, 'GET', '/api/memos/changes',
+                                             headers={**auth_headers, 'if-none-match': etag}))
+        assert status == 304
+        assert data == b''
+
+    def test_changes_etag_not_shared_between_users(self, app, asgi_app, auth_headers):
+        """测试变更状态相同的两个用户不能用对方的ETag得到304"""
+        async def add_user():
+            async with asgi_app._get_database().session() as session:
+                session.add(User(oauth_provider='github', oauth_user_id='2', username='bob'))
+                await session.commit()
+
+        asyncio.run(add_user())
+        serializer = app.session_interface.get_signing_serializer(app)
+        bob_headers = {'cookie': f"session={serializer.dumps({'_user_id': '2'})}"}
+
+        sent = []
+
+        async def capture():
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                sent.append(message)
+
+            await asgi_app({
+                'type': 'http', 'method': 'GET', 'path': '/api/memos/changes', 'query_string': b'',
+                'headers': [(b'cookie', auth_headers['cookie'].encode())],
+            }, receive, send)
+
+        asyncio.run(capture())
+        etag = dict(sent[0]['headers'])[b'etag'].decode()
+
+        status, _ = asyncio.run(call_asgi(asgi_app, 'GET', '/api/memos/changes',
+                                          headers={**bob_headers, 'if-none-match': etag}))
+        assert status == 200
+
+    def test_batch_atomic_rollback(self, asgi_app, auth_headers):
+        """测试异步批量原子回滚"""
+        status, data = asyncio.run(call_asgi(asgi_app, 'POST', '/api/batch', body={'operations': [
+            {'action': 'create', 'title': 'Gone', 'content': 'x'},
+            {'action': 'delete', 'id': 12345},
+        ]}, headers=auth_headers))
+        assert status == 409
+
+        status, data = asyncio.run(call_asgi(asgi_app, 'GET', '/api/memos/changes', headers=auth_headers))
+        assert json.loads(data)['changes'] == []
+
+    def test_batch_atomic_must_be_boolean(self, asgi_app, auth_headers):
+        """测试异步批量接口的atomic只接受JSON布尔值"""
+        status, data = asyncio.run(call_asgi(asgi_app, 'POST', '/api/batch', body={'atomic': 'false', 'operations': [
+            {'action': 'create', 'title': 'Not applied', 'content': 'x'},
+        ]}, headers=auth_headers))
+        assert status == 400
+        assert json.loads(data)['error'] == 'atomic must be a boolean'
+
+    def test_stream_heartbeat(self, app, asgi_app, auth_headers):
+        """测试异步SSE心跳"""
+        app.config['SSE_HEARTBEAT_INTERVAL'] = 0.01
+        app.config['SSE_MAX_STREAM_SECONDS'] = 0.05
+        status, data = asyncio.run(call_asgi(asgi_app, 'GET', '/api/memos/stream', headers=auth_headers))
+        assert status == 200
+        assert b': heartbeat' in data
+
+    def test_native_routes_match_wsgi_handling(self, app, asgi_app, auth_headers):
+        """测试原生路由与WSGI端一样带安全响应头和请求ID，并记录请求指标和请求日志"""
+        from app.utils.metrics import registry
+        registry.reset()
+
+        handler = _ListHandler()
+        access_logger = logging.getLogger(f'{app.logger.name}.access')
+        access_logger.addHandler(handler)
+        try:
+            sent = asyncio.run(call_asgi_messages(asgi_app, 'GET', '/api/memos/changes',
+                                                  headers={**auth_headers, 'x-request-id': 'asgi-1'}))
+            unauthorized = asyncio.run(call_asgi_messages(asgi_app, 'GET', '/api/memos/changes'))
+        finally:
+            access_logger.removeHandler(handler)
+
+        headers = dict(sent[0]['headers'])
+        for name, value in app.config['SECURITY_HEADERS'].items():
+            assert headers[name.lower().encode()] == value.encode()
+        assert b'content-security-policy' in headers
+        assert headers[b'x-request-id'] == b'asgi-1'
+        # 错误响应同样带安全头
+        assert b'x-frame-options' in dict(unauthorized[0]['headers'])
+
+        text = registry.export()
+        assert 'memo_http_requests_total{endpoint="memo_api.memo_changes",method="GET",status="200"} 1' in text
+        assert 'memo_http_requests_total{endpoint="memo_api.memo_changes",method="GET",status="401"} 1' in text
+
+        record = handler.records[0]
+        assert (record.request_id, record.user_id, record.status) == ('asgi-1', '1', 200)
+        assert record.path == '/api/memos/changes'
+
+    def test_native_routes_traced(self, app, asgi_app, auth_headers, monkeypatch):
+        """测试启用追踪时原生路由记录trace（包含SQL span）"""
+        from app.utils.tracing import tracer
+        monkeypatch.setattr(tracer, 'enabled', True)
+        # 启用追踪后新建的应用在创建异步引擎时注册SQL span
+        asgi = AsgiApplication(app)
+        try:
+            status, _ = asyncio.run(call_asgi(asgi, 'GET', '/api/memos/changes',
+                                              headers={**auth_headers, 'x-request-id': 'trace-1'}))
+        finally:
+            asyncio.run(asgi.database.dispose())
+        assert status == 200
+        trace = tracer.recent(limit=1, name='memo_api.memo_changes')[0]
+        assert trace.trace_id == 'trace-1'
+        assert trace.root.attributes['user_id'] == '1'
+        assert any(s.name == 'sql' for s in trace.spans)
+
+    def test_falls_back_to_wsgi(self, asgi_app):
+        """测试其他路由转交WSGI应用"""
+        status, data = asyncio.run(call_asgi(asgi_app, 'GET', '/health/'))
+        assert status == 200
+        assert json.loads(data)['status'] == 'healthy'
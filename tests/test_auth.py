@@ -83,4 +83,21 @@ class TestUserModel:
 
             # 应该抛出IntegrityError
             with pytest.raises(Exception):  # SQLAlchemy会抛出IntegrityError
-                db.session.commit()
\ No newline at end of file
+                db.session.commit()
+
+
+class TestTestLogin:
+    """测试登录（本地压测用）"""
+
+    def test_disabled_by_default(self, client, test_user):
+        """未启用时返回404"""
+        response = client.get(f'/auth/test-login/{test_user.id}')
+        assert response.status_code == 404
+
+    def test_login_when_enabled(self, app, client, test_user):
+        """启用后登录指定用户"""
+        app.config['TEST_AUTH_ENABLED'] = True
+        response = client.get(f'/auth/test-login/{test_user.id}')
+        assert response.status_code == 302
+        assert client.get('/memo/').status_code == 200
+        assert client.get('/auth/test-login/99999').status_code == 404
@@ -0,0 +1,41 @@
+"""
+合成数据集测试
+"""
+from app import db
+from app.models.memo import Memo, MemoStatus
+from app.models.user import User
+from app.utils.dataset import CONTENT_MAX, SEED_PROVIDER, generate_dataset
+
+
+class TestDataset:
+    """合成数据集生成测试"""
+
+    def test_generate_counts(self, app):
+        """生成指定数量的用户和备忘录"""
+        user_ids, total = generate_dataset(3, 40, seed=1, batch_size=50)
+        assert len(user_ids) == 3
+        assert total == 120
+        assert User.query.filter_by(oauth_provider=SEED_PROVIDER).count() == 3
+        for user_id in user_ids:
+            assert Memo.query.filter_by(user_id=user_id).count() == 40
+
+    def test_distribution(self, app):
+        """状态分布、内容长度和变更序列号"""
+        generate_dataset(2, 300, seed=2, batch_size=100)
+        memos = Memo.query.all()
+        statuses = {memo.status for memo in memos}
+        assert statuses <= set(MemoStatus.get_all_statuses())
+        assert len(statuses) >= 4
+        assert all(0 < len(memo.content) <= CONTENT_MAX for memo in memos)
+        assert all(memo.completed_at for memo in memos if memo.status == MemoStatus.COMPLETED)
+        assert all(memo.expired_at for memo in memos if memo.status == MemoStatus.EXPIRED)
+        # 每条备忘录都有唯一的变更序列号
+        seqs = [memo.change_seq for memo in memos]
+        assert None not in seqs and len(set(seqs)) == len(seqs)
+
+    def test_seed_command(self, app, runner):
+        """flask seed-data 命令"""
+        result = runner.invoke(args=['seed-data', '--users', '2', '--memos', '5', '--seed', '3'])
+        assert result.exit_code == 0, result.output
+        assert 'Created 2 users' in result.output
+        assert db.session.query(Memo).count() == 10
@@ -3,7 +3,12 @@
 """
 import pytest
 from app.forms.memo import MemoForm, MemoStatusForm
+from flask import session
+from babel import support
+from flask_babel import force_locale, get_translations, gettext, refresh
 from flask_wtf.csrf import generate_csrf
+from app.utils.i18n import negotiate_language, select_locale
+from app.utils.validators import ContentSanitizer, DANGEROUS_TAGS
 
 
 class TestMemoForm:
@@ -130,4 +135,89 @@ class TestMemoStatusForm:
             # 测试配置中禁用了CSRF，所以不需要csrf_token
             form.new_status.data = 'in_progress'
 
-            assert form.validate() is True
\ No newline at end of file
+            assert form.validate() is True
+
+
+class TestFormTranslations:
+    """表单文本按请求语言翻译测试"""
+
+    def test_labels_follow_request_locale(self, app):
+        """测试同一表单类的标签随请求语言变化"""
+        with app.test_request_context(headers={'Accept-Language': 'zh-CN'}):
+            refresh()
+            assert '标题' in str(MemoForm().title.label)
+        with app.test_request_context(headers={'Accept-Language': 'en'}):
+            refresh()
+            assert 'Title' in str(MemoForm().title.label)
+
+    def test_session_language_overrides_header(self, app):
+        """测试session中的语言设置优先于请求头"""
+        with app.test_request_context(headers={'Accept-Language': 'en'}):
+            session['language'] = 'zh_CN'
+            refresh()
+            assert gettext('Title') == '标题'
+
+    def test_translations_preloaded(self, app, monkeypatch):
+        """测试启动时已加载所有语言的翻译目录，请求中不再读取文件"""
+        loads = []
+        monkeypatch.setattr(support.Translations, 'load', lambda *args, **kwargs: loads.append(args))
+        with app.app_context():
+            for language, title in (('zh_CN', '标题'), ('en', 'Title')):
+                with force_locale(language):
+                    assert get_translations().gettext('Title') == title
+        assert loads == []
+
+    def test_locale_negotiation_cached(self, app):
+        """测试按请求头协商的结果被缓存"""
+        negotiate_language.cache_clear()
+        for _ in range(3):
+            with app.test_request_context(headers={'Accept-Language': 'en-US,en;q=0.9'}):
+                assert str(select_locale()) == 'en'
+        info = negotiate_language.cache_info()
+        assert info.misses == 1 and info.hits == 2
+
+
+class TestContentSanitizer:
+    """内容安全检查测试"""
+
+    def test_deny_mode_matches_previous_rules(self):
+        """测试拒绝模式与原先的子串规则一致"""
+        sanitizer = ContentSanitizer()
+        assert sanitizer.find_unsafe('plain text with a < b') is None
+        assert sanitizer.find_unsafe('hello <b>world</b>') is None
+        assert sanitizer.find_unsafe('x' * 9990 + '<IFrame src=x>') == 'iframe'
+        for tag in DANGEROUS_TAGS:
+            assert not sanitizer.is_safe(f'before <{tag.upper()}> after')
+
+    def test_allow_mode(self):
+        """测试白名单模式按HTML语法检查标签、属性和URL协议"""
+        sanitizer = ContentSanitizer(mode='allow')
+        assert sanitizer.is_safe('<p>Hello <a href="https://example.com" title="x">link</a></p>')
+        assert sanitizer.find_unsafe('<img src=x onerror=alert(1)>') == 'img'
+        assert sanitizer.find_unsafe('<b onclick="alert(1)">x</b>') == 'onclick'
+        assert sanitizer.find_unsafe('<a href="java&#9;script:alert(1)">x</a>') == 'href'
+        assert sanitizer.find_unsafe('text ending with <script') == 'script'
+
+    def test_streaming_scanner_across_chunks(self):
+        """测试增量扫描能识别跨块边界的标签"""
+        for mode in ('deny', 'allow'):
+            scanner = ContentSanitizer(mode=mode).scanner()
+            assert scanner.feed('<p>safe text <scr') is None
+            assert scanner.feed('ipt>alert(1)</script></p>') == 'script'
+            assert scanner.close() == 'script'
+
+            scanner = ContentSanitizer(mode=mode).scanner()
+            for chunk in ('<p>', 'all ', 'good', '</p>'):
+                assert scanner.feed(chunk) is None
+            assert scanner.close() is None
+
+    def test_allow_mode_in_form(self, app):
+        """测试表单按配置使用白名单模式"""
+        app.config['CONTENT_SANITIZER_MODE'] = 'allow'
+        with app.test_request_context():
+            form = MemoForm()
+            form.title.data = 'Valid Title'
+            form.content.data = '<p onmouseover="x()">hover</p>'
+            form.status.data = 'pending'
+            assert form.validate() is False
+            assert 'content' in form.errors
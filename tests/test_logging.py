@@ -0,0 +1,114 @@
+"""
+结构化日志测试
+"""
+import json
+import logging
+import sys
+import time
+from app.utils.logging_config import JsonFormatter, RequestContextFilter, SamplingFilter
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestLogging:
+    """队列日志、请求ID和采样测试"""
+
+    def test_request_id_header(self, client):
+        """测试响应带有请求ID，合法的客户端请求ID被沿用"""
+        response = client.get('/')
+        assert len(response.headers['X-Request-ID']) == 32
+
+        response = client.get('/', headers={'X-Request-ID': 'abc-123'})
+        assert response.headers['X-Request-ID'] == 'abc-123'
+
+        response = client.get('/', headers={'X-Request-ID': 'bad id <script>'})
+        assert response.headers['X-Request-ID'] != 'bad id <script>'
+
+    def test_access_log_fields(self, app, client):
+        """测试请求日志带有方法、路径、状态码和延迟"""
+        handler = _ListHandler()
+        handler.addFilter(RequestContextFilter())
+        access_logger = logging.getLogger(f'{app.logger.name}.access')
+        access_logger.addHandler(handler)
+        try:
+            response = client.get('/', headers={'X-Request-ID': 'req-1'})
+        finally:
+            access_logger.removeHandler(handler)
+
+        record = handler.records[-1]
+        data = json.loads(JsonFormatter().format(record))
+        assert data['request_id'] == 'req-1'
+        assert data['method'] == 'GET'
+        assert data['path'] == '/'
+        assert data['status'] == response.status_code
+        assert data['latency_ms'] >= 0
+        assert 'user_id' not in data
+
+    def test_access_log_streamed_latency(self, app, client):
+        """测试流式响应在内容生成完、响应关闭后才记录，延迟包含生成时间"""
+        def generate():
+            time.sleep(0.05)
+            yield 'done'
+
+        app.add_url_rule('/test-stream', 'test_stream', lambda: app.response_class(generate()))
+        handler = _ListHandler()
+        access_logger = logging.getLogger(f'{app.logger.name}.access')
+        access_logger.addHandler(handler)
+        try:
+            response = client.get('/test-stream', headers={'X-Request-ID': 'req-stream'})
+            assert handler.records == []
+            assert response.get_data() == b'done'
+            response.close()
+        finally:
+            access_logger.removeHandler(handler)
+
+        [record] = handler.records
+        assert record.request_id == 'req-stream'
+        assert record.status == 200
+        assert record.latency_ms >= 50
+
+    def test_json_formatter_exception(self):
+        """测试异常信息写入JSON字段"""
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = logging.LogRecord('app', logging.ERROR, __file__, 1, 'failed %s', ('x',),
+                                       exc_info=sys.exc_info())
+        data = json.loads(JsonFormatter().format(record))
+        assert data['message'] == 'failed x'
+        assert 'ValueError: boom' in data['exception']
+
+    def test_sampling_filter(self):
+        """测试只对DEBUG记录采样"""
+        debug = logging.LogRecord('app', logging.DEBUG, __file__, 1, 'debug', (), None)
+        warning = logging.LogRecord('app', logging.WARNING, __file__, 1, 'warning', (), None)
+        never = SamplingFilter(0.0)
+        assert not never.filter(debug)
+        assert never.filter(warning)
+        assert SamplingFilter(1.0).filter(debug)
+
+    def test_app_logger_uses_queue(self, app):
+        """测试应用日志只通过队列处理器输出"""
+        from logging.handlers import QueueHandler
+        assert app.logger.handlers
+        assert all(isinstance(handler, QueueHandler) for handler in app.logger.handlers)
+
+    def test_testing_config_writes_no_log_files(self, app):
+        """测试环境只输出到控制台，不在logs/中写文件"""
+        from app.utils import logging_config
+        assert not any(isinstance(handler, logging.FileHandler) for handler in logging_config._listener.handlers)
+
+    def test_default_handler_removed(self, app):
+        """测试Flask默认的stderr处理器被移除，控制台不会重复输出"""
+        from flask.logging import default_handler
+        from app.utils.logging_config import setup_logging
+        app.logger.addHandler(default_handler)
+        setup_logging(app)
+        assert default_handler not in app.logger.handlers
@@ -174,4 +174,290 @@ class TestMemoRoutes:
             follow_redirects=True
         )
         assert response.status_code == 200
-        assert b'Memo deleted successfully' in response.data
\ No newline at end of file
+        assert b'Memo deleted successfully' in response.data
+
+
+class TestConditionalRequests:
+    """条件请求（ETag）测试"""
+
+    def test_list_returns_304_when_unchanged(self, authenticated_client, test_memo):
+        """测试列表页未变化时返回304"""
+        response = authenticated_client.get('/memo/')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert etag.startswith('W/')
+
+        response = authenticated_client.get('/memo/', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+    def test_list_etag_changes_after_write(self, authenticated_client, test_memo):
+        """测试写入后ETag变化"""
+        etag = authenticated_client.get('/memo/').headers['ETag']
+        MemoService.update_memo(test_memo.id, title='Changed')
+
+        response = authenticated_client.get('/memo/', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_edit_etag_depends_on_page(self, authenticated_client, test_memo):
+        """测试不同页面的ETag不同"""
+        list_etag = authenticated_client.get('/memo/').headers['ETag']
+        response = authenticated_client.get(f'/memo/{test_memo.id}/edit', headers={'If-None-Match': list_etag})
+        assert response.status_code == 200
+        edit_etag = response.headers['ETag']
+
+        response = authenticated_client.get(f'/memo/{test_memo.id}/edit', headers={'If-None-Match': edit_etag})
+        assert response.status_code == 304
+
+
+    def test_etag_not_shared_between_users(self, app, authenticated_client, test_user):
+        """测试变更状态相同的两个用户不能用对方的ETag得到304"""
+        from app.models.user import User
+        bob = User(oauth_provider='github', oauth_user_id='67890', username='bob')
+        db.session.add(bob)
+        db.session.commit()
+        bob_client = app.test_client()
+        with bob_client.session_transaction() as sess:
+            sess['_user_id'] = str(bob.id)
+            sess['_fresh'] = True
+
+        # 两个用户都没有备忘录
+        etag = authenticated_client.get('/memo/').headers['ETag']
+        # 新的应用上下文：不沿用g中已加载的用户
+        with app.app_context():
+            response = bob_client.get('/memo/', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert 'testuser' not in response.get_data(as_text=True)
+        assert response.headers['ETag'] != etag
+
+
+class TestMemoCardCache:
+    """备忘录卡片片段缓存测试"""
+
+    def test_card_cached_with_csrf_placeholder(self, authenticated_client, test_memo):
+        """测试卡片被缓存且输出时替换CSRF占位符"""
+        from app.utils.fragment_cache import card_cache, CSRF_PLACEHOLDER
+        card_cache.clear()
+
+        first = authenticated_client.get('/memo/')
+        assert first.status_code == 200
+        assert len(card_cache.cache) == 1
+        cached_html = next(iter(card_cache.cache.values()))
+        assert CSRF_PLACEHOLDER in cached_html
+        assert CSRF_PLACEHOLDER.encode() not in first.data
+
+        second = authenticated_client.get('/memo/')
+        assert b'Test Memo' in second.data
+        assert CSRF_PLACEHOLDER.encode() not in second.data
+
+    @pytest.mark.parametrize('literal', ['%%CSRF_TOKEN%%', '<!--csrf_token-->'])
+    def test_csrf_placeholder_not_injected_from_content(self, authenticated_client, test_memo, literal):
+        """测试用户内容中的占位符文本原样（转义后）输出，不会被替换为CSRF令牌"""
+        from markupsafe import escape
+        from app.utils.fragment_cache import card_cache, CSRF_PLACEHOLDER
+        card_cache.clear()
+        memo = db.session.get(Memo, test_memo.id)
+        memo.title, memo.content = f'Title {literal}', f'Content {literal}'
+        db.session.commit()
+
+        for _ in range(2):  # 首次渲染写入缓存，第二次从缓存输出
+            html = authenticated_client.get('/memo/').get_data(as_text=True)
+            assert f'Title {escape(literal)}' in html
+            assert f'Content {escape(literal)}' in html
+            assert CSRF_PLACEHOLDER not in html
+
+    def test_card_cache_key_follows_updates(self, authenticated_client, test_memo):
+        """测试备忘录更新后渲染新内容"""
+        authenticated_client.get('/memo/')
+        MemoService.update_memo(test_memo.id, title='Fresh Title')
+
+        response = authenticated_client.get('/memo/')
+        assert b'Fresh Title' in response.data
+
+
+class TestStreamingList:
+    """备忘录列表流式渲染测试"""
+
+    def _add_memos(self, user, count):
+        for i in range(count):
+            db.session.add(Memo(title=f'Bulk {i:03d}', content='content', user_id=user.id))
+        db.session.commit()
+
+    def test_list_is_streamed(self, authenticated_client, test_memo):
+        """测试列表页以流式响应返回"""
+        response = authenticated_client.get('/memo/', buffered=False)
+        assert response.is_streamed
+        assert b'Test Memo' in b''.join(response.response)
+        response.close()
+
+    def test_per_page_and_clamp(self, app, authenticated_client, test_user):
+        """测试per_page参数生效并受上限约束"""
+        self._add_memos(test_user, 30)
+        response = authenticated_client.get('/memo/?per_page=25')
+        assert response.data.count(b'data-memo-id=') == 25
+        assert b'per_page=25' in response.data
+
+        app.config['MEMO_LIST_MAX_PER_PAGE'] = 5
+        response = authenticated_client.get('/memo/?per_page=25')
+        assert response.data.count(b'data-memo-id=') == 5
+
+    def test_streaming_pagination_is_lazy(self, app, test_user, count_queries):
+        """测试延迟分页在使用前不执行查询"""
+        from app.utils.helpers import StreamingPagination
+        self._add_memos(test_user, 12)
+
+        with count_queries() as queries:
+            pagination = StreamingPagination(Memo.query.filter_by(user_id=test_user.id)
+                                             .order_by(Memo.id), page=2, per_page=5)
+            assert queries.count == 0
+            assert bool(pagination.items)
+            assert [memo.title for memo in pagination.items] == [f'Bulk {i:03d}' for i in range(5, 10)]
+            assert not any('count' in s.lower() for s in queries.statements)
+            assert pagination.total == 12
+            assert pagination.pages == 3
+
+    def test_streaming_pagination_matches_pagination(self, app, test_user):
+        """测试延迟分页的导航属性与Flask-SQLAlchemy的分页一致"""
+        from app.utils.helpers import StreamingPagination
+        self._add_memos(test_user, 95)
+        query = Memo.query.filter_by(user_id=test_user.id).order_by(Memo.id)
+
+        for page in (1, 2, 5, 10):
+            expected = query.paginate(page=page, per_page=10, error_out=False)
+            pagination = StreamingPagination(query, page=page, per_page=10)
+            assert [memo.id for memo in pagination.items] == [memo.id for memo in expected.items]
+            for name in ('total', 'pages', 'has_prev', 'prev_num', 'has_next', 'next_num'):
+                assert getattr(pagination, name) == getattr(expected, name), name
+            assert list(pagination.iter_pages()) == list(expected.iter_pages())
+
+    def test_csrf_token_saved_before_streaming(self, authenticated_client, test_memo):
+        """测试卡片表单的CSRF令牌在流式响应前写入会话"""
+        authenticated_client.get('/memo/')
+        with authenticated_client.session_transaction() as sess:
+            assert sess.get('csrf_token')
+
+    def test_flash_consumed_before_streaming(self, authenticated_client, test_memo):
+        """测试闪现消息在流式响应前从会话中取出，只显示一次"""
+        with authenticated_client.session_transaction() as sess:
+            sess['_flashes'] = [('success', 'Flash once')]
+
+        assert 'Flash once' in authenticated_client.get('/memo/').get_data(as_text=True)
+        with authenticated_client.session_transaction() as sess:
+            assert '_flashes' not in sess
+        assert 'Flash once' not in authenticated_client.get('/memo/').get_data(as_text=True)
+
+    def test_overdue_marked_before_streaming(self, app, authenticated_client, test_user):
+        """测试流式渲染前先把到期备忘录标记为过期"""
+        from datetime import datetime, timedelta
+        memo = Memo(title='Overdue', content='content', user_id=test_user.id,
+                    expired_at=datetime.utcnow() - timedelta(days=1))
+        db.session.add(memo)
+        db.session.commit()
+
+        authenticated_client.get('/memo/')
+        db.session.refresh(memo)
+        assert memo.status == MemoStatus.EXPIRED
+
+
+class TestMarkdownRendering:
+    """备忘录Markdown渲染测试"""
+
+    def test_render_is_sanitized_and_cached(self, app):
+        """测试渲染结果经过转义检查并按内容哈希缓存"""
+        from app.utils.markdown import render_markdown, render_cache, content_hash
+        content = '**bold** <script>alert(1)</script> [x](javascript:alert(1))'
+        html = render_markdown(content)
+        assert '<strong>bold</strong>' in html
+        assert '<script' not in html
+        assert 'href="javascript' not in html
+        assert render_cache.get(content_hash(content)) == str(html)
+
+    def test_rendered_html_updated_on_write(self, app, test_user):
+        """测试写入时更新持久化的渲染结果"""
+        memo = Memo(title='Formatted', content='# Heading', user_id=test_user.id)
+        db.session.add(memo)
+        db.session.commit()
+        assert '<h1>Heading</h1>' in memo.rendered_html
+
+        memo.content = '*changed*'
+        db.session.commit()
+        assert memo.rendered_html.strip() == '<p><em>changed</em></p>'
+
+    def test_list_never_renders_synchronously(self, app, authenticated_client, test_user, monkeypatch):
+        """测试列表页只使用已有结果，未命中时先显示纯文本并在后台渲染"""
+        from app.utils import markdown
+        app.config['MARKDOWN_PERSIST'] = False
+        markdown.init_markdown(app)
+        try:
+            memo = Memo(title='Plain', content='**pending render**', user_id=test_user.id)
+            db.session.add(memo)
+            db.session.commit()
+            assert memo.rendered_html is None
+            markdown.render_cache.clear()
+
+            calls = []
+            original = markdown.render_markdown
+            monkeypatch.setattr(markdown, 'render_markdown',
+                                lambda content: calls.append(content) or original(content))
+
+            response = authenticated_client.get('/memo/')
+            assert b'**pending render**' in response.data
+            markdown.wait_for_pending()
+            assert calls == ['**pending render**']
+
+            response = authenticated_client.get('/memo/')
+            assert b'<strong>pending render</strong>' in response.data
+        finally:
+            app.config['MARKDOWN_PERSIST'] = True
+            markdown.init_markdown(app)
+
+    def test_card_shows_preview_only(self, app, authenticated_client, test_user):
+        """测试列表卡片只渲染内容预览，截断时才显示“阅读更多”链接"""
+        long_memo = Memo(title='Long', content='**start** ' + 'word ' * 100 + 'TAIL_MARKER', user_id=test_user.id)
+        short_memo = Memo(title='Short', content='*short*', user_id=test_user.id)
+        db.session.add_all([long_memo, short_memo])
+        db.session.commit()
+        assert 'TAIL_MARKER' not in long_memo.rendered_html
+        assert '<strong>start</strong>' in long_memo.rendered_html
+
+        body = authenticated_client.get('/memo/').get_data(as_text=True)
+        assert 'TAIL_MARKER' not in body
+        assert body.count('Read more...') == 1
+        assert f'href="/memo/{long_memo.id}/edit" class="text-primary' in body
+
+    def test_expiry_does_not_render(self, app, authenticated_client, test_user, monkeypatch):
+        """测试批量标记过期（只改状态）不触发Markdown渲染"""
+        from datetime import datetime, timedelta
+        from app.models import memo as memo_module
+        memo = Memo(title='Overdue', content='**content**', user_id=test_user.id,
+                    expired_at=datetime.utcnow() - timedelta(days=1))
+        db.session.add(memo)
+        db.session.commit()
+        memo.rendered_html = None
+        db.session.commit()
+
+        calls = []
+        monkeypatch.setattr(memo_module, 'render_preview', lambda content: calls.append(content))
+        authenticated_client.get('/memo/')
+        db.session.refresh(memo)
+        assert memo.status == MemoStatus.EXPIRED
+        assert calls == []
+
+    def test_render_queue_is_bounded(self, app, monkeypatch):
+        """测试后台渲染排队数量有上限"""
+        from concurrent.futures import Future
+        from app.utils import markdown
+
+        class StalledExecutor:
+            def submit(self, fn, *args):
+                return Future()
+
+        monkeypatch.setattr(markdown, '_executor', StalledExecutor())
+        monkeypatch.setitem(markdown._settings, 'queue_size', 2)
+        monkeypatch.setattr(markdown, '_pending', {})
+        assert markdown.schedule_render('one') is not None
+        assert markdown.schedule_render('two') is not None
+        assert markdown.schedule_render('one') is not None  # 已在排队的内容不重复提交
+        assert markdown.schedule_render('three') is None
+        assert markdown.pending_count() == 2
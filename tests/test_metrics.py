@@ -0,0 +1,376 @@
+"""
+运行指标、健康检查和诊断工具测试
+"""
+import os
+import threading
+import time
+from sqlalchemy import event
+from app import db
+from app.models import Memo
+from app.services.health_sampler import HealthSampler, get_sampler
+from app.utils.cache import LRUCache
+from app.utils.metrics import MetricsRegistry, MultiProcessStore, http_requests, merge_snapshots, registry
+
+
+class TestMetrics:
+    """计数器、直方图、跨进程合并和Prometheus导出测试"""
+
+    def setup_method(self):
+        registry.reset()
+
+    def test_histogram_buckets_cumulative(self):
+        """测试直方图分桶为累计计数"""
+        local = MetricsRegistry()
+        histogram = local.histogram('test_seconds', 'Test.', ('endpoint',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, 'index')
+        text = local.export()
+        assert 'test_seconds_bucket{endpoint="index",le="0.1"} 2' in text
+        assert 'test_seconds_bucket{endpoint="index",le="1.0"} 3' in text
+        assert 'test_seconds_bucket{endpoint="index",le="+Inf"} 4' in text
+        assert 'test_seconds_count{endpoint="index"} 4' in text
+        assert 'test_seconds_sum{endpoint="index"} 3.65' in text
+
+    def test_counter_across_threads(self):
+        """测试各线程分别记录、导出时合并（包括已结束的线程）"""
+        local = MetricsRegistry()
+        counter = local.counter('test_total', 'Test.', ('kind',))
+
+        def work():
+            for _ in range(1000):
+                counter.inc('a')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc('b')
+        assert 'test_total{kind="a"} 4000' in local.export()
+        # 已结束线程的分片已并入，不再单独保留
+        assert len(local._shards) == 1
+        assert 'test_total{kind="a"} 4000' in local.export()
+
+    def test_label_escaping(self):
+        """测试标签值转义"""
+        local = MetricsRegistry()
+        local.counter('test_total', 'Test.', ('path',)).inc('a"b\\c\n')
+        assert 'test_total{path="a\\"b\\\\c\\n"} 1' in local.export()
+
+    def test_merge_snapshots(self, tmp_path):
+        """测试合并其他进程写入的快照文件"""
+        http_requests.inc('index.index', 'GET', '200')
+        store = MultiProcessStore(str(tmp_path))
+        store.flush()
+        # 模拟另一个worker的快照
+        other = tmp_path / 'metrics-99999999.json'
+        other.write_text((tmp_path / os.path.basename(store.path)).read_text())
+        snapshot = store.collect()
+        text = registry.export(snapshot)
+        assert 'memo_http_requests_total{endpoint="index.index",method="GET",status="200"} 2' in text
+        assert merge_snapshots([{}, snapshot]) == snapshot
+
+    def test_dead_process_merged_into_aggregate(self, tmp_path):
+        """测试已退出worker的快照并入合计文件后删除，计数不丢失也不重复"""
+        http_requests.inc('index.index', 'GET', '200')
+        store = MultiProcessStore(str(tmp_path))
+        store.flush()
+        snapshot = (tmp_path / os.path.basename(store.path)).read_text()
+        for pid in (99999998, 99999999):
+            (tmp_path / f'metrics-{pid}.json').write_text(snapshot)
+            store.mark_process_dead(pid)
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            os.path.basename(store.path), MultiProcessStore.AGGREGATE_FILE]
+        text = registry.export(store.collect())
+        assert 'memo_http_requests_total{endpoint="index.index",method="GET",status="200"} 3' in text
+
+        store.clear()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_lru_cache_hit_miss(self):
+        """测试LRU缓存记录命中和未命中"""
+        cache = LRUCache(name='test')
+        cache.get('x')
+        cache.set('x', 1)
+        cache.get('x')
+        cache.get('x')
+        text = registry.export()
+        assert 'memo_cache_requests_total{cache="test",result="hit"} 2' in text
+        assert 'memo_cache_requests_total{cache="test",result="miss"} 1' in text
+
+    def test_metrics_endpoint(self, client):
+        """测试/health/metrics输出请求、数据库和业务指标"""
+        client.get('/')
+        client.get('/no-such-page')
+        response = client.get('/health/metrics')
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        text = response.get_data(as_text=True)
+        assert 'memo_http_requests_total{endpoint="index.index",method="GET",status="200"} 1' in text
+        assert 'memo_http_requests_total{endpoint="unmatched",method="GET",status="404"} 1' in text
+        assert 'memo_http_request_duration_seconds_count{endpoint="index.index"} 1' in text
+        assert 'memo_db_query_duration_seconds_count{operation="SELECT"}' in text
+        assert '# TYPE memo_memos gauge' in text
+        assert 'memo_recent_users_7d 0' in text
+
+    def test_metrics_json_format(self, client):
+        """测试?format=json返回原有的业务统计"""
+        data = client.get('/health/metrics?format=json').get_json()
+        assert data['recent_users_7d'] == 0
+        assert data['memo_status_distribution'] == {}
+
+
+class TestHealthSampler:
+    """健康检查采样测试"""
+
+    def test_liveness_does_not_query(self, app, client):
+        """测试存活检查不访问数据库"""
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = client.get('/health/live')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'alive'
+        assert statements == []
+
+    def test_detailed_returns_snapshot(self, app, client, test_user):
+        """测试详细检查在采样间隔内复用快照"""
+        app.config['HEALTH_SAMPLE_INTERVAL'] = 60
+        data = client.get('/health/detailed').get_json()
+        assert data['status'] == 'healthy'
+        assert data['metrics']['users_count'] == 1
+        assert data['metrics']['memos_count'] == 0
+
+        db.session.add(Memo(title='T', content='C', user_id=test_user.id))
+        db.session.commit()
+        # 快照未过期，计数不变
+        assert client.get('/health/detailed').get_json()['metrics']['memos_count'] == 0
+        get_sampler(app).sample_once()
+        assert client.get('/health/detailed').get_json()['metrics']['memos_count'] == 1
+
+    def test_stale_snapshot_unhealthy(self, app, client):
+        """测试快照长时间未更新时返回503"""
+        sampler = get_sampler(app)
+        sampler.sample_once()
+        sampler.snapshot.sampled_at -= 3600
+        app.config['HEALTH_SAMPLE_INTERVAL'] = 10000
+        sampler.interval = 10000
+        response = client.get('/health/detailed')
+        assert response.status_code == 503
+        assert response.get_json()['error'] == 'health sample is stale'
+
+    def test_background_sampler_refreshes(self, app):
+        """测试后台线程按间隔刷新快照"""
+        sampler = HealthSampler(app, interval=0.01, background=True)
+        try:
+            first = sampler.latest()
+            deadline = time.time() + 2
+            while sampler.snapshot is first and time.time() < deadline:
+                time.sleep(0.01)
+            assert sampler.snapshot is not first
+            assert sampler._thread.is_alive()
+        finally:
+            sampler.stop()
+        assert not sampler._thread.is_alive()
+
+
+class TestProfiler:
+    """按需请求分析测试"""
+
+    def _enable(self, tmp_path, **options):
+        from app import create_app
+        from app.utils.profiler import init_profiler
+        app = create_app('testing')
+        app.config.update(PROFILER_ENABLED=True, PROFILER_DIR=str(tmp_path), **options)
+        init_profiler(app)
+        return app
+
+    def test_disabled_registers_nothing(self, app):
+        """测试未启用时不注册钩子"""
+        from app.utils.profiler import init_profiler
+        before = sum(len(funcs) for funcs in app.before_request_funcs.values())
+        init_profiler(app)
+        assert sum(len(funcs) for funcs in app.before_request_funcs.values()) == before
+
+    def test_signed_token_profiles_request(self, tmp_path):
+        """测试带有效令牌的请求生成折叠栈文件，无效令牌不分析"""
+        from app.utils.diagnostics import make_diagnostics_token
+        from app.utils.profiler import PROFILE_HEADER
+        app = self._enable(tmp_path)
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            client.get('/', headers={PROFILE_HEADER: 'forged'})
+            assert os.listdir(tmp_path) == []
+
+            client.get('/', headers={PROFILE_HEADER: make_diagnostics_token(app)})
+            files = os.listdir(tmp_path)
+            assert len(files) == 1
+            assert '-index.index-uanon-' in files[0] and files[0].endswith('.folded')
+            lines = (tmp_path / files[0]).read_text().splitlines()
+            # 每行为 "根;...;叶 次数"
+            assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+            db.session.remove()
+            db.drop_all()
+
+    def test_sampled_cprofile(self, tmp_path):
+        """测试按比例抽样并输出pstats文件"""
+        import pstats
+        app = self._enable(tmp_path, PROFILER_MODE='cprofile', PROFILER_SAMPLE_RATE=2)
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            for _ in range(4):
+                client.get('/health/live')
+            files = sorted(os.listdir(tmp_path))
+            assert len(files) == 2
+            assert files[0].endswith('.prof')
+            stats = pstats.Stats(str(tmp_path / files[0]))
+            assert any(name == 'liveness_check' for _, _, name in stats.stats)
+            db.session.remove()
+            db.drop_all()
+
+
+class TestTracing:
+    """请求追踪测试"""
+
+    def _enable(self, app, **options):
+        from app.utils.tracing import init_tracing
+        app.config.update(TRACING_ENABLED=True, **options)
+        init_tracing(app)
+
+    def teardown_method(self):
+        from app.utils.tracing import tracer
+        tracer.configure(False)
+
+    def test_disabled_records_nothing(self, app, authenticated_client, test_memo):
+        """测试未启用时不记录trace"""
+        from app.utils.tracing import tracer
+        authenticated_client.get(f'/memo/{test_memo.id}/edit')
+        assert not tracer.enabled
+        assert len(tracer.traces) == 0
+
+    def test_edit_trace_spans(self, app, authenticated_client, test_memo):
+        """测试memo.edit的trace包含服务方法、SQL和模板渲染span"""
+        from app.utils.diagnostics import DIAGNOSTICS_HEADER, make_diagnostics_token
+        self._enable(app)
+        authenticated_client.get(f'/memo/{test_memo.id}/edit', headers={'X-Request-ID': 'edit-1'})
+
+        response = authenticated_client.get(
+            '/health/traces?endpoint=memo.edit',
+            headers={DIAGNOSTICS_HEADER: make_diagnostics_token(app)}
+        )
+        assert response.status_code == 200
+        trace = response.get_json()['traces'][0]
+        assert trace['trace_id'] == 'edit-1'
+        assert trace['name'] == 'memo.edit'
+        assert trace['attributes']['user_id'] == str(test_memo.user_id)
+        summary = trace['summary']
+        assert summary['MemoService.get_memo_by_id']['count'] == 1
+        assert summary['render']['count'] >= 1
+        assert summary['sql']['count'] >= 1
+
+        # SQL span的父span是服务方法或请求根span
+        spans = {item['id']: item for item in trace['spans']}
+        service = next(item for item in trace['spans'] if item['name'] == 'MemoService.get_memo_by_id')
+        assert spans[service['parent']]['name'] == 'memo.edit'
+        assert any(item['parent'] == service['id'] and item['name'] == 'sql' for item in trace['spans'])
+
+    def test_traces_requires_token(self, app, client):
+        """测试没有诊断令牌时返回404"""
+        self._enable(app)
+        assert client.get('/health/traces').status_code == 404
+        assert client.get('/health/traces', headers={'X-Diagnostics-Token': 'forged'}).status_code == 404
+
+    def test_span_outside_request_is_noop(self, app):
+        """测试请求之外不记录span"""
+        from app.utils.tracing import span, tracer
+        self._enable(app)
+        with span('orphan') as orphan:
+            assert orphan is None
+        assert len(tracer.traces) == 0
+
+    def test_file_export(self, app, client, tmp_path):
+        """测试trace按行写入JSON文件"""
+        import json
+        path = tmp_path / 'traces.jsonl'
+        self._enable(app, TRACING_FILE=str(path))
+        client.get('/health/live')
+        client.get('/health/')
+        lines = path.read_text().splitlines()
+        assert [json.loads(line)['name'] for line in lines] == ['health.liveness_check', 'health.health_check']
+
+
+class TestMemoryDiagnostics:
+    """内存诊断端点测试"""
+
+    def _headers(self, app):
+        from app.utils.diagnostics import DIAGNOSTICS_HEADER, make_diagnostics_token
+        return {DIAGNOSTICS_HEADER: make_diagnostics_token(app)}
+
+    def teardown_method(self):
+        from app.utils import memory
+        memory.stop_tracing()
+
+    def test_requires_token(self, client):
+        """测试没有诊断令牌时返回404"""
+        assert client.get('/health/memory').status_code == 404
+        assert client.post('/health/memory/tracemalloc').status_code == 404
+
+    def test_cache_report_groups_by_prefix(self, app, client, test_user, test_memo):
+        """测试SimpleCache按函数名分组统计条目数和近似大小"""
+        from app.utils.cache import cache
+        cache.clear()
+        try:
+            cache.set(f'get_memo_by_id:{test_memo.id}', test_memo)
+            cache.set('get_memo_by_id:999', None)
+            cache.set('get_user_memos:1:10', ['x' * 1000])
+            data = client.get('/health/memory?objects=5', headers=self._headers(app)).get_json()
+        finally:
+            cache.clear()
+        groups = data['caches']['simple_cache']
+        assert groups['get_memo_by_id']['entries'] == 2
+        assert groups['get_user_memos']['approx_bytes'] > 1000
+        assert data['caches']['memo_card']['max_entries'] == app.config['MEMO_CARD_CACHE_SIZE']
+        assert len(data['gc']['generations']) == 3
+        assert len(data['gc']['object_types']) == 5
+        assert data['tracemalloc'] == {'tracing': False}
+
+    def test_tracemalloc_diff(self, app, client):
+        """测试开始跟踪、保存基准并查看增长"""
+        headers = self._headers(app)
+        assert client.get('/health/memory/diff', headers=headers).status_code == 409
+
+        response = client.post('/health/memory/tracemalloc?frames=2', headers=headers)
+        assert response.get_json()['tracemalloc']['frames'] == 2
+        assert client.post('/health/memory/snapshot', headers=headers).status_code == 200
+
+        leak = [bytearray(1024) for _ in range(1000)]
+        data = client.get('/health/memory/diff?limit=5', headers=headers).get_json()
+        assert data['stats'][0]['size_diff'] >= 1000 * 1024
+        assert 'test_metrics.py' in data['stats'][0]['location']
+        assert client.get('/health/memory/diff?group=bogus', headers=headers).status_code == 400
+
+        response = client.delete('/health/memory/tracemalloc', headers=headers)
+        assert response.get_json() == {'changed': True, 'tracemalloc': {'tracing': False}}
+        del leak
+
+    def test_approximate_size(self):
+        """测试近似大小计算共享对象只计一次、跳过私有属性"""
+        from app.utils.memory import approximate_size
+
+        class Holder:
+            def __init__(self):
+                self.data = 'x' * 10000
+                self._private = 'y' * 10000
+
+        shared = 'z' * 10000
+        assert approximate_size([shared, shared]) < 2 * 10000
+        assert 10000 < approximate_size(Holder()) < 20000
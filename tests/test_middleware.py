@@ -0,0 +1,197 @@
+"""
+WSGI中间件测试
+"""
+import gzip
+import os
+import re
+import pytest
+from app.middleware.compression import GzipMiddleware, accepts_gzip, precompress_static
+from app.middleware.security import SecurityHeadersMiddleware
+from app.utils.assets import build_assets, init_assets, load_manifest
+
+
+class TestGzipMiddleware:
+    """响应压缩测试"""
+
+    def test_accepts_gzip(self):
+        """测试Accept-Encoding解析"""
+        assert accepts_gzip('gzip, deflate, br')
+        assert accepts_gzip('br;q=1.0, gzip;q=0.8')
+        assert not accepts_gzip('gzip;q=0')
+        assert not accepts_gzip('identity')
+        assert not accepts_gzip(None)
+
+    def test_html_compressed_when_accepted(self, app, authenticated_client, test_memo):
+        """测试列表页在客户端支持时被压缩"""
+        app.config['MEMO_LIST_STREAMING'] = False
+        response = authenticated_client.get('/memo/', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert b'Test Memo' in gzip.decompress(response.data)
+        assert int(response.headers['Content-Length']) == len(response.data)
+
+    def test_streamed_list_compressed(self, authenticated_client, test_memo):
+        """测试流式渲染的列表页按块压缩（无Content-Length）"""
+        response = authenticated_client.get('/memo/', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        assert b'Test Memo' in gzip.decompress(response.data)
+
+    def test_not_compressed_without_accept_encoding(self, authenticated_client, test_memo):
+        """测试客户端不支持时不压缩但带Vary"""
+        response = authenticated_client.get('/memo/')
+        assert 'Content-Encoding' not in response.headers
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert b'Test Memo' in response.data
+
+    def test_small_response_not_compressed(self, client):
+        """测试小于阈值的响应不压缩"""
+        response = client.get('/health/', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+    def test_streaming_response_compressed_per_chunk(self):
+        """测试无Content-Length的流式响应逐块压缩"""
+        def streaming_app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/html; charset=utf-8')])
+            return iter([b'<p>first</p>', b'<p>second</p>'])
+
+        middleware = GzipMiddleware(streaming_app)
+        captured = {}
+
+        def start_response(status, headers, exc_info=None):
+            captured['headers'] = dict(headers)
+
+        chunks = list(middleware({'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT_ENCODING': 'gzip'}, start_response))
+        assert captured['headers']['Content-Encoding'] == 'gzip'
+        assert len(chunks) == 3
+        assert gzip.decompress(b''.join(chunks)) == b'<p>first</p><p>second</p>'
+
+    def test_precompressed_static_served(self, app, client, tmp_path):
+        """测试静态文件优先发送预压缩副本"""
+        app.static_folder = str(tmp_path)
+        (tmp_path / 'app.js').write_text('console.log("memo");\n' * 100)
+
+        results = precompress_static(str(tmp_path))
+        assert results[0][0] == 'app.js'
+        assert os.path.exists(tmp_path / 'app.js.gz')
+
+        response = client.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype in ('text/javascript', 'application/javascript')
+        assert gzip.decompress(response.data).startswith(b'console.log')
+        response.close()
+
+        response = client.get('/static/app.js')
+        assert 'Content-Encoding' not in response.headers
+        assert response.data.startswith(b'console.log')
+        response.close()
+
+
+class TestAssetManifest:
+    """带指纹静态资源测试"""
+
+    def _build(self, tmp_path):
+        (tmp_path / 'css').mkdir()
+        (tmp_path / 'css' / 'style.css').write_text('/* comment */\nbody {\n    color: red;\n}\n')
+        (tmp_path / 'js').mkdir()
+        (tmp_path / 'js' / 'main.js').write_text('// comment\nfunction hello() {\n    return 1;\n}\n')
+        return build_assets(str(tmp_path))
+
+    def test_build_minifies_and_fingerprints(self, tmp_path):
+        """测试构建生成压缩后的指纹文件和清单"""
+        manifest = self._build(tmp_path)
+        assert set(manifest) == {'css/style.css', 'js/main.js'}
+        hashed = manifest['css/style.css']
+        assert hashed.startswith('dist/css/style.') and hashed.endswith('.css')
+        assert (tmp_path / hashed).read_text() == 'body{color:red}'
+        assert load_manifest(str(tmp_path)) == manifest
+
+        # 内容不变时指纹不变，构建输出目录不会被再次处理
+        assert build_assets(str(tmp_path)) == manifest
+
+    def test_asset_url_and_immutable_caching(self, app, client, tmp_path):
+        """测试asset_url解析为指纹文件且以immutable缓存发送"""
+        app.static_folder = str(tmp_path)
+        manifest = self._build(tmp_path)
+        init_assets(app)
+
+        with app.test_request_context():
+            url = app.jinja_env.globals['asset_url']('js/main.js')
+        assert url == '/static/' + manifest['js/main.js']
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == 31536000
+        assert not response.cache_control.no_cache
+        response.close()
+
+        response = client.get('/static/js/main.js')
+        assert not response.cache_control.immutable
+        response.close()
+
+    def test_missing_manifest_falls_back_to_source(self, app, tmp_path):
+        """测试没有清单时引用源文件"""
+        app.static_folder = str(tmp_path)
+        init_assets(app)
+        with app.test_request_context():
+            assert app.jinja_env.globals['asset_url']('css/style.css') == '/static/css/style.css'
+
+
+class TestSecurityHeaders:
+    """安全响应头中间件测试"""
+
+    def test_headers_on_every_response(self, client):
+        """测试普通响应和静态文件都带有安全头"""
+        for path in ('/health/', '/static/css/style.css'):
+            response = client.get(path)
+            assert response.headers['X-Content-Type-Options'] == 'nosniff'
+            assert "frame-ancestors 'none'" in response.headers['Content-Security-Policy']
+            assert 'Strict-Transport-Security' not in response.headers
+            response.close()
+
+    def test_replaces_headers_set_by_view(self, app, client):
+        """测试视图已设置的同名头（不区分大小写）被替换，不会重复发送"""
+        def view():
+            return 'ok', {'X-Frame-Options': 'ALLOW-FROM https://example.com',
+                          'content-security-policy': "default-src *"}
+        app.add_url_rule('/test-own-headers', 'test_own_headers', view)
+
+        response = client.get('/test-own-headers')
+        assert response.headers.getlist('X-Frame-Options') == ['SAMEORIGIN']
+        [policy] = response.headers.getlist('Content-Security-Policy')
+        assert "frame-ancestors 'none'" in policy
+
+    def test_hsts_only_over_https(self, client):
+        """测试HSTS只在HTTPS请求中发送"""
+        response = client.get('/health/', base_url='https://localhost')
+        assert response.headers['Strict-Transport-Security'].startswith('max-age=31536000')
+
+    def test_header_list_built_once(self, app):
+        """测试响应头列表在创建时生成并在请求间复用"""
+        middleware = app.wsgi_app
+        assert isinstance(middleware, SecurityHeadersMiddleware)
+        assert any(name == 'Content-Security-Policy' for name, _ in middleware.http_headers)
+        assert len(middleware.https_headers) == len(middleware.http_headers) + 1
+
+    def test_nonce_mode(self, app, authenticated_client, test_memo):
+        """测试nonce模式：CSP不含'unsafe-inline'且与页面中的nonce一致，304不发送CSP"""
+        app.config['CSP_NONCE_ENABLED'] = True
+        app.wsgi_app = SecurityHeadersMiddleware(
+            app.wsgi_app.app, app.config['SECURITY_HEADERS'], app.config['CSP_DIRECTIVES'], nonce=True
+        )
+
+        first = authenticated_client.get('/memo/')
+        policy = first.headers['Content-Security-Policy']
+        script_src = next(part for part in policy.split(';') if part.strip().startswith('script-src'))
+        assert "'unsafe-inline'" not in script_src
+        nonce = re.search(r"'nonce-([^']+)'", script_src).group(1)
+        assert f'<script nonce="{nonce}">'.encode() in first.data
+
+        second = authenticated_client.get('/memo/')
+        assert second.headers['Content-Security-Policy'] != policy
+
+        cached = authenticated_client.get('/memo/', headers={'If-None-Match': first.headers['ETag']})
+        assert cached.status_code == 304
+        assert 'Content-Security-Policy' not in cached.headers
+        assert cached.headers['X-Content-Type-Options'] == 'nosniff'
@@ -0,0 +1,75 @@
+"""
+数据库迁移测试
+"""
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade
+from app import db
+from app.cli import MIGRATIONS_DIR, init_migrate
+from app.models.memo import ChangeSequence, Memo
+
+
+@pytest.fixture
+def empty_db(app):
+    """没有任何表的数据库"""
+    init_migrate(app)
+    db.drop_all()
+    db.session.execute(db.text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+    return app
+
+
+def current_revision():
+    with db.engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+class TestMigrations:
+    """数据库迁移测试"""
+
+    def test_migrations_match_models(self, empty_db, runner):
+        """从空数据库升级后的表结构与模型一致"""
+        result = runner.invoke(args=['upgrade-db'])
+        assert result.exit_code == 0, result.output
+
+        with db.engine.connect() as connection:
+            context = MigrationContext.configure(connection, opts={'render_as_batch': True})
+            assert compare_metadata(context, db.metadata) == []
+
+    def test_upgrade_legacy_database(self, empty_db, runner):
+        """引入迁移之前创建的数据库：补充新列和新表，并回填变更序列号"""
+        upgrade(directory=MIGRATIONS_DIR, revision='7f1c7d202a7c')
+        db.session.execute(db.text('DROP TABLE alembic_version'))
+        db.session.execute(db.text(
+            "INSERT INTO users (id, oauth_provider, oauth_user_id, username) VALUES (1, 'github', '1', 'old')"
+        ))
+        for memo_id in (1, 2, 3):
+            db.session.execute(db.text(
+                "INSERT INTO memos (id, title, content, status, user_id) "
+                f"VALUES ({memo_id}, 'Old memo', 'content', 'pending', 1)"
+            ))
+        db.session.commit()
+
+        result = runner.invoke(args=['upgrade-db'])
+        assert result.exit_code == 0, result.output
+        assert 'Stamped existing database as revision 7f1c7d202a7c' in result.output
+
+        assert sorted(seq for (seq,) in db.session.query(Memo.change_seq)) == [1, 2, 3]
+        assert db.session.get(ChangeSequence, 1).value == 3
+        memo = Memo(title='New memo', content='content', user_id=1)
+        db.session.add(memo)
+        db.session.commit()
+        assert memo.change_seq == 4
+
+    def test_init_db_stamps_head(self, empty_db, runner):
+        """init-db 建表后标记为最新版本，之后的 upgrade-db 不重复执行迁移"""
+        result = runner.invoke(args=['init-db'])
+        assert result.exit_code == 0, result.output
+        head = current_revision()
+        assert head is not None
+
+        result = runner.invoke(args=['upgrade-db'])
+        assert result.exit_code == 0, result.output
+        assert 'Stamped' not in result.output
+        assert current_revision() == head
@@ -0,0 +1,124 @@
+"""
+路由查询预算测试
+
+每个路由在100条备忘录的数据集上执行的SQL语句数不得超过 query_budgets.json 中的预算，
+用于发现模板中的查询、列表页的N+1等回归。路由的查询次数有意变化时同步修改预算文件。
+"""
+import json
+import os
+import re
+import pytest
+from app import db
+from app.models.memo import Memo, MemoStatus
+from app.utils import memory
+from app.utils.dataset import generate_dataset
+from app.utils.diagnostics import DIAGNOSTICS_HEADER, make_diagnostics_token
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+with open(BUDGET_FILE, encoding='utf-8') as f:
+    BUDGETS = json.load(f)
+
+# 每个路由的请求：键为 "方法 端点"，值根据数据集返回 (路径, 请求参数)
+CASES = {
+    'GET index.index': lambda d: ('/', {}),
+    'GET auth.login': lambda d: ('/auth/login', {}),
+    'GET auth.github_login': lambda d: ('/auth/login/github', {}),
+    'GET auth.github_callback': lambda d: ('/auth/github/callback', {}),
+    'GET auth.logout': lambda d: ('/auth/logout', {}),
+    'GET auth.test_login': lambda d: (f'/auth/test-login/{d["user_id"]}', {}),
+    'GET user.profile': lambda d: ('/user/profile', {}),
+    'GET memo.list': lambda d: ('/memo/', {}),
+    'GET memo.create': lambda d: ('/memo/create', {}),
+    'POST memo.create': lambda d: ('/memo/create', {'data': {
+        'title': 'Budget memo', 'content': 'Some content', 'status': 'pending', 'no_expiry': 'y',
+    }}),
+    'GET memo.edit': lambda d: (f'/memo/{d["memo_id"]}/edit', {}),
+    'POST memo.edit': lambda d: (f'/memo/{d["memo_id"]}/edit', {'data': {
+        'title': 'Edited', 'content': 'Edited content', 'status': 'pending', 'no_expiry': 'y',
+    }}),
+    'POST memo.delete': lambda d: (f'/memo/{d["memo_id"]}/delete', {'data': {'csrf_token': d['csrf_token']}}),
+    'POST memo.change_status': lambda d: (f'/memo/{d["memo_id"]}/status', {'data': {
+        'csrf_token': d['csrf_token'], 'new_status': 'in_progress',
+    }}),
+    'GET health.health_check': lambda d: ('/health/', {}),
+    'GET health.liveness_check': lambda d: ('/health/live', {}),
+    'GET health.detailed_health_check': lambda d: ('/health/detailed', {}),
+    'GET health.metrics': lambda d: ('/health/metrics', {}),
+    'GET health.traces': lambda d: ('/health/traces', {'headers': d['diagnostics']}),
+    'GET health.memory_report': lambda d: ('/health/memory', {'headers': d['diagnostics']}),
+    'POST health.memory_tracing': lambda d: ('/health/memory/tracemalloc', {'headers': d['diagnostics']}),
+    'DELETE health.memory_tracing': lambda d: ('/health/memory/tracemalloc', {'headers': d['diagnostics']}),
+    'POST health.memory_snapshot': lambda d: ('/health/memory/snapshot', {'headers': d['diagnostics']}),
+    'GET health.memory_diff': lambda d: ('/health/memory/diff', {'headers': d['diagnostics']}),
+    'POST memo_api.batch': lambda d: ('/api/batch', {'json': {'operations': [
+        {'action': 'create', 'title': 'Batch', 'content': 'batch content'},
+        {'action': 'status', 'id': d['memo_id'], 'status': 'in_progress'},
+        {'action': 'update', 'id': d['memo_id'], 'title': 'Batch renamed'},
+    ]}}),
+    'GET memo_api.memo_changes': lambda d: ('/api/memos/changes', {}),
+    'GET memo_api.memo_stream': lambda d: ('/api/memos/stream', {}),
+    'GET set_language': lambda d: ('/set_language/en', {}),
+}
+
+
+@pytest.fixture
+def dataset(app, client):
+    """100条备忘录的数据集，客户端以其所属用户登录"""
+    app.config['TEST_AUTH_ENABLED'] = True
+    app.config['SSE_MAX_STREAM_SECONDS'] = 0.01
+    user_ids, _ = generate_dataset(1, 100, seed=48)
+    user_id = user_ids[0]
+    memo_id = db.session.execute(
+        db.select(Memo.id).where(Memo.user_id == user_id, Memo.status == MemoStatus.PENDING)
+        .order_by(Memo.id).limit(1)
+    ).scalar_one()
+
+    client.get(f'/auth/test-login/{user_id}')
+    # 状态变更路由总是校验CSRF令牌，从卡片的表单中取一个
+    csrf_token = re.search(r'name="csrf_token" value="([^"]+)"', client.get('/memo/').get_data(as_text=True))
+    yield {
+        'user_id': user_id,
+        'memo_id': memo_id,
+        'csrf_token': csrf_token.group(1) if csrf_token else '',
+        'diagnostics': {DIAGNOSTICS_HEADER: make_diagnostics_token(app)},
+    }
+    memory.stop_tracing()
+
+
+def rule_keys(app):
+    """应用中所有路由的 "方法 端点"（不含静态文件）"""
+    keys = set()
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        for method in rule.methods - {'HEAD', 'OPTIONS'}:
+            keys.add(f'{method} {rule.endpoint}')
+    return keys
+
+
+class TestQueryBudget:
+    """路由查询预算测试"""
+
+    def test_every_route_has_budget(self, app):
+        """每个路由都有请求用例和预算"""
+        keys = rule_keys(app)
+        assert keys - CASES.keys() == set()
+        assert keys - BUDGETS.keys() == set()
+        assert BUDGETS.keys() - keys == set(), '预算文件中有已不存在的路由'
+
+    @pytest.mark.parametrize('key', sorted(CASES))
+    def test_route_within_budget(self, app, client, dataset, count_queries, key):
+        """路由的SQL语句数不超过预算"""
+        method, _ = key.split(' ', 1)
+        path, kwargs = CASES[key](dataset)
+        # 在新的应用上下文中请求：会话和g（已加载的用户）都不沿用测试中的对象
+        with app.app_context(), count_queries() as queries:
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()  # 流式响应在读取时才执行查询
+
+        assert response.status_code < 500
+        assert queries.count <= BUDGETS[key], (
+            f'{key} executed {queries.count} statements (budget {BUDGETS[key]}):\n'
+            + '\n'.join(queries.statements)
+        )
@@ -0,0 +1,47 @@
+"""
+启动（延迟初始化）测试
+"""
+import json
+import os
+import subprocess
+import sys
+from app import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestStartup:
+    """应用启动测试"""
+
+    def test_heavy_modules_not_imported(self):
+        """create_app不导入只在特定请求中使用的依赖"""
+        code = (
+            'import json, sys\n'
+            'from app import create_app\n'
+            'create_app("testing")\n'
+            'print(json.dumps([m for m in ("authlib", "requests", "psutil", "markdown_it", "alembic") if m in sys.modules]))\n'
+        )
+        env = dict(os.environ, SECRET_KEY='test-secret', LOG_LEVEL='WARNING')
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=ROOT, env=env, check=True)
+        assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+    def test_oauth_client_created_on_first_use(self, app, client):
+        """OAuth客户端在首次登录请求时创建"""
+        assert app.extensions['memo_oauth'] is None
+        client.get('/auth/login/github')
+        assert app.extensions['memo_oauth'] is not None
+
+    def test_tables_not_created_on_boot(self):
+        """启动时不建表"""
+        from app import create_app
+        app = create_app('testing')
+        with app.app_context():
+            assert db.inspect(db.engine).get_table_names() == []
+
+    def test_init_db_command(self, app, runner):
+        """flask init-db 创建数据库表"""
+        db.drop_all()
+        result = runner.invoke(args=['init-db'])
+        assert result.exit_code == 0, result.output
+        assert 'memos' in db.inspect(db.engine).get_table_names()
@@ -0,0 +1,39 @@
+"""
+模板编译缓存测试
+"""
+import os
+from app.utils.templating import init_template_cache, precompile_templates
+
+
+class TestTemplateCache:
+    """模板字节码缓存和预编译测试"""
+
+    def test_precompile_all_templates(self, app):
+        """测试预编译覆盖全部页面模板"""
+        count, _ = precompile_templates(app)
+        names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+        assert count == len(names)
+        assert 'base.html' in names and 'memo/list.html' in names
+
+    def test_bytecode_cache_written_and_reused(self, app, tmp_path):
+        """测试字节码写入缓存目录并可由新环境复用"""
+        app.config['TEMPLATE_BYTECODE_CACHE'] = True
+        app.config['TEMPLATE_BYTECODE_CACHE_DIR'] = str(tmp_path)
+        cache = init_template_cache(app)
+        precompile_templates(app)
+        files = os.listdir(tmp_path)
+        assert len(files) == len(app.jinja_env.list_templates(filter_func=lambda n: n.endswith('.html')))
+
+        # 新环境从缓存加载时不再调用编译
+        env = app.jinja_env.overlay()
+        env.cache = {}
+        env.bytecode_cache = cache
+        compiled = []
+        original_compile = env.compile
+        env.compile = lambda *args, **kwargs: compiled.append(args) or original_compile(*args, **kwargs)
+        env.get_template('memo/list.html')
+        assert compiled == []
+
+    def test_disabled_in_testing_config(self, app):
+        """测试未启用时不设置字节码缓存"""
+        assert init_template_cache(app) is None
@@ -0,0 +1,114 @@
+"""
+多进程部署（fork钩子、gunicorn配置）测试
+"""
+import gc
+import logging
+import logging.handlers
+import os
+import runpy
+import time
+from app import db
+from app.utils import logging_config
+from app.utils.metrics import http_requests, registry
+from app.utils.worker import after_fork, before_fork
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestWorkerHooks:
+    """fork钩子测试"""
+
+    def test_metrics_dir_hooks(self, app, tmp_path, monkeypatch):
+        """主进程启动时清空指标目录，worker退出后合并它的快照"""
+        from app.utils.metrics import MultiProcessStore
+        from app.utils.worker import after_worker_exit, before_start
+        store = MultiProcessStore(str(tmp_path))
+        monkeypatch.setitem(app.extensions, 'metrics_store', store)
+        (tmp_path / 'metrics-1.json').write_text('{"counters": {}, "histograms": {}}')
+        (tmp_path / MultiProcessStore.AGGREGATE_FILE).write_text('{"counters": {}, "histograms": {}}')
+
+        before_start(app)
+        assert list(tmp_path.iterdir()) == []
+
+        (tmp_path / 'metrics-2.json').write_text('{"counters": {}, "histograms": {}}')
+        after_worker_exit(app, 2)
+        assert [path.name for path in tmp_path.iterdir()] == [MultiProcessStore.AGGREGATE_FILE]
+
+    def test_fork_hooks_dispose_engines(self, app, monkeypatch):
+        """fork前关闭连接池并冻结gc；fork后只丢弃继承的连接"""
+        calls = []
+        monkeypatch.setattr(type(db.engine), 'dispose', lambda engine, close=True: calls.append(close))
+        try:
+            before_fork(app)
+            assert gc.get_freeze_count() > 0
+        finally:
+            gc.unfreeze()
+        after_fork(app)
+        assert calls == [True, False]
+
+    def test_after_fork_resets_process_state(self, app):
+        """fork后重建日志线程、清空指标"""
+        http_requests.inc('index.index', 'GET', '200')
+        old_listener = logging_config._listener
+
+        after_fork(app)
+
+        listener = logging_config._listener
+        assert listener is not old_listener
+        assert listener._thread.is_alive()
+        for _, handler in logging_config._queue_handlers:
+            assert handler.queue is listener.queue
+        assert registry.snapshot()['counters'] == {}
+
+        # 重建后的队列仍然输出记录
+        records = []
+        capture = logging.Handler()
+        capture.emit = records.append
+        handlers = listener.handlers
+        listener.handlers = handlers + (capture,)
+        try:
+            app.logger.warning('after fork')
+            deadline = time.monotonic() + 2
+            while not records and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            listener.handlers = handlers
+        assert [record.getMessage() for record in records] == ['after fork']
+
+    def test_gunicorn_config(self):
+        """gunicorn配置预加载应用并注册fork钩子"""
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+        assert config['preload_app'] is True
+        assert config['workers'] >= 1 and config['threads'] >= 1
+        assert callable(config['pre_fork']) and callable(config['post_fork'])
+        assert callable(config['on_starting']) and callable(config['child_exit'])
+
+    def test_gunicorn_workers_for_database(self, monkeypatch):
+        """SQLite默认只用少量worker，服务器数据库按CPU核数"""
+        monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+        monkeypatch.delenv('DATABASE_URL', raising=False)
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+        assert config['workers'] == 2
+
+        monkeypatch.setenv('DATABASE_URL', 'postgresql://memo@db/memo')
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+        assert config['workers'] == os.cpu_count() * 2 + 1
+
+    def test_gunicorn_uses_watched_log_files(self, app, tmp_path, monkeypatch):
+        """gunicorn下多个worker共用日志文件，不在进程内轮转"""
+        monkeypatch.delenv('LOG_FILE_HANDLER', raising=False)
+        config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+        assert config['raw_env'] == ['LOG_FILE_HANDLER=watched']
+
+        monkeypatch.setitem(app.config, 'LOG_FILES', True)
+        monkeypatch.setitem(app.config, 'LOG_DIR', str(tmp_path))
+        monkeypatch.setitem(app.config, 'LOG_FILE_HANDLER', 'watched')
+        try:
+            logging_config.setup_logging(app)
+            file_handlers = [handler for handler in logging_config._listener.handlers
+                             if isinstance(handler, logging.FileHandler)]
+            assert len(file_handlers) == 2
+            assert all(isinstance(handler, logging.handlers.WatchedFileHandler) for handler in file_handlers)
+        finally:
+            monkeypatch.setitem(app.config, 'LOG_FILES', False)
+            logging_config.setup_logging(app)
@@ -0,0 +1,11 @@
+"""
+备忘录网站 - WSGI入口文件（生产环境）
+
+gunicorn wsgi:application    （配置见 gunicorn.conf.py）
+"""
+from app import create_app
+import os
+
+# 从环境变量获取配置名称，默认为production
+config_name = os.environ.get('FLASK_ENV', 'production')
+application = create_app(config_name)